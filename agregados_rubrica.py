@@ -0,0 +1,194 @@
+"""
+agregados_rubrica.py - Promedios de la rúbrica materializados e incrementales
+
+Mantiene en la tabla 'agregados_rubrica' de tres_raya.db, para cada
+dimensión de la rúbrica, el número de puntajes, su suma y la suma de sus
+cuadrados en tres ámbitos:
+
+    global   todas las evaluaciones (clave "")
+    modelo   por modelo evaluado
+    partida  por match_id
+
+Con esos tres valores la media y la desviación típica salen en O(1), sin
+recorrer evaluaciones.json en cada petición.
+
+Las cifras se actualizan de forma incremental: la tabla 'agregados_estado'
+guarda cuántas evaluaciones del almacén ya se sumaron, y sincronizar() solo
+lee las añadidas después, en la misma transacción que actualiza los
+totales (BEGIN IMMEDIATE), de modo que varios workers nunca suman dos veces
+la misma evaluación. app.py sincroniza después de cada escritura.
+
+Los puntajes se leen de 'evaluacion' (o del antiguo 'rubrica') y las
+claves heredadas con corchetes ("[Factualidad") se normalizan.
+
+USO:
+    $ python agregados_rubrica.py reconstruir
+    Borra los agregados y los recalcula desde cero.
+"""
+
+import math  # Importa math para la desviación típica
+import os  # Importa os para identificar el almacén por su ruta
+import sys  # Importa sys para leer argumentos de línea de comandos
+
+from almacen_evaluaciones import AlmacenEvaluaciones
+from db_handler import DB_PATH, conexion  # Pool de conexiones compartido con el resto de la aplicación
+from evaluacion_rubrica import DIMENSIONES
+
+ESQUEMA = '''
+CREATE TABLE IF NOT EXISTS agregados_rubrica (
+    ambito TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    conteo INTEGER NOT NULL,
+    suma REAL NOT NULL,
+    suma_cuadrados REAL NOT NULL,
+    PRIMARY KEY (ambito, clave, dimension)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agregados_estado (
+    almacen TEXT PRIMARY KEY,
+    procesadas INTEGER NOT NULL
+);
+'''
+
+_SUMAR = '''
+    INSERT INTO agregados_rubrica (ambito, clave, dimension, conteo, suma, suma_cuadrados)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (ambito, clave, dimension) DO UPDATE SET
+        conteo = conteo + excluded.conteo,
+        suma = suma + excluded.suma,
+        suma_cuadrados = suma_cuadrados + excluded.suma_cuadrados
+'''
+
+_DIMENSIONES = {dim.lower(): dim for dim in DIMENSIONES}  # Nombre en minúsculas -> nombre canónico
+
+
+def normalizar_dimension(nombre):
+    """Nombre canónico de una dimensión ("[Factualidad" -> "Factualidad"), o None si no es de la rúbrica."""
+    return _DIMENSIONES.get(str(nombre).strip().strip("[]").strip().lower())
+
+
+def puntajes(evaluacion):
+    """Puntajes numéricos por dimensión de una evaluación guardada: {dimensión: valor}."""
+    if not isinstance(evaluacion, dict):
+        return {}
+    rubrica = evaluacion.get("evaluacion")
+    if not isinstance(rubrica, dict):
+        rubrica = evaluacion.get("rubrica")  # Nombre usado por versiones anteriores
+    if not isinstance(rubrica, dict):
+        return {}
+    resultado = {}
+    for nombre, valor in rubrica.items():
+        dim = normalizar_dimension(nombre)
+        try:
+            if dim is not None and valor is not None:
+                resultado[dim] = float(valor)
+        except (TypeError, ValueError):
+            pass  # Ignora valores que no sean numéricos
+    return resultado
+
+
+def ambitos(evaluacion):
+    """Pares (ámbito, clave) a los que suma una evaluación."""
+    yield "global", ""
+    if evaluacion.get("modelo") is not None:
+        yield "modelo", str(evaluacion["modelo"])
+    if evaluacion.get("match_id") is not None:
+        yield "partida", str(evaluacion["match_id"])
+
+
+def acumular(evaluaciones):
+    """Suma un conjunto de evaluaciones: {(ámbito, clave, dimensión): [conteo, suma, suma_cuadrados]}."""
+    totales = {}
+    for ev in evaluaciones:
+        valores = puntajes(ev)
+        if not valores:
+            continue
+        for ambito, clave in ambitos(ev):
+            for dim, valor in valores.items():
+                total = totales.setdefault((ambito, clave, dim), [0, 0.0, 0.0])
+                total[0] += 1
+                total[1] += valor
+                total[2] += valor * valor
+    return totales
+
+
+def estadistica(conteo, suma, suma_cuadrados):
+    """Media y desviación típica (poblacional) a partir de los totales."""
+    if not conteo:
+        return {"conteo": 0, "media": 0, "desviacion": 0}
+    media = suma / conteo
+    varianza = max(suma_cuadrados / conteo - media * media, 0.0)  # max() evita -0.0000001 por redondeo
+    return {"conteo": conteo, "media": round(media, 2), "desviacion": round(math.sqrt(varianza), 2)}
+
+
+class AgregadosRubrica:
+    """Totales por dimensión de las evaluaciones de un AlmacenEvaluaciones, guardados en SQLite."""
+
+    def __init__(self, almacen, db_path=DB_PATH):
+        self.almacen = almacen
+        self.db_path = db_path
+        self.clave_almacen = os.path.abspath(almacen.registro.ruta)
+        with conexion(self.db_path) as conn:
+            conn.executescript(ESQUEMA)
+
+    def _procesadas(self, conn):
+        fila = conn.execute('SELECT procesadas FROM agregados_estado WHERE almacen = ?',
+                            (self.clave_almacen,)).fetchone()
+        return fila[0] if fila else 0
+
+    def sincronizar(self):
+        """Suma las evaluaciones guardadas desde la última sincronización. Devuelve cuántas sumó."""
+        total = len(self.almacen)
+        with conexion(self.db_path) as conn:
+            if self._procesadas(conn) >= total:
+                return 0  # Caso habitual en lecturas: nada nuevo, ninguna escritura
+            conn.execute('BEGIN IMMEDIATE')  # Otro worker que sincronice a la vez espera aquí
+            try:
+                desde = self._procesadas(conn)  # Releído dentro de la transacción
+                nuevas = [ev for _, ev in self.almacen.registro.enumerar(desde)][:total - desde]
+                conn.executemany(_SUMAR, [clave + tuple(valores) for clave, valores in acumular(nuevas).items()])
+                conn.execute('INSERT OR REPLACE INTO agregados_estado (almacen, procesadas) VALUES (?, ?)',
+                             (self.clave_almacen, desde + len(nuevas)))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return len(nuevas)
+
+    def reconstruir(self):
+        """Borra los agregados y los recalcula desde la primera evaluación del almacén. Devuelve cuántas sumó."""
+        with conexion(self.db_path) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM agregados_rubrica')
+                conn.execute('DELETE FROM agregados_estado WHERE almacen = ?', (self.clave_almacen,))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return self.sincronizar()
+
+    def estadisticas(self, ambito="global", clave=""):
+        """{dimensión: {conteo, media, desviacion}} de un ámbito, con todas las dimensiones de la rúbrica."""
+        self.sincronizar()
+        with conexion(self.db_path) as conn:
+            filas = conn.execute('''
+                SELECT dimension, conteo, suma, suma_cuadrados FROM agregados_rubrica
+                WHERE ambito = ? AND clave = ?
+            ''', (ambito, str(clave))).fetchall()
+        totales = {dim: (conteo, suma, cuadrados) for dim, conteo, suma, cuadrados in filas}
+        return {dim: estadistica(*totales.get(dim, (0, 0.0, 0.0))) for dim in DIMENSIONES}
+
+    def promedios(self, ambito="global", clave=""):
+        """{dimensión: media} de un ámbito (0 si la dimensión no tiene puntajes)."""
+        return {dim: datos["media"] for dim, datos in self.estadisticas(ambito, clave).items()}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "reconstruir":
+        agregados = AgregadosRubrica(AlmacenEvaluaciones())
+        print(f"{agregados.reconstruir()} evaluaciones sumadas a los agregados de la rúbrica")
+        for dim, datos in agregados.estadisticas().items():
+            print(f"  {dim}: media {datos['media']} (σ {datos['desviacion']}, {datos['conteo']} puntajes)")
+    else:
+        print(__doc__)
@@ -0,0 +1,120 @@
+"""
+almacen_evaluaciones.py - Almacén único de evaluaciones de jugadas
+
+Guarda las evaluaciones en evaluaciones.json, que ya tenía una evaluación
+por línea (JSON Lines), mediante registro_jsonl.RegistroJSONL:
+
+    - guardar() añade una evaluación en O(1), sin releer ni reescribir el archivo
+    - guardar_partida() añade todas las evaluaciones de una partida con una sola escritura
+    - buscar() / ultima() consultan por (match_id, jugador, movimiento) con un índice en memoria
+      que solo lee las líneas añadidas desde la última consulta
+    - pagina() pagina por clave (la posición en el registro) con filtros por modelo,
+      jugador y match_id, usando índices por campo: cada página cuesta lo mismo
+      sin importar cuántas evaluaciones haya
+
+Carga, exportación e historial deben leer a través de este módulo.
+"""
+
+import json  # Importa json para normalizar movimientos en las claves del índice
+import threading  # Importa threading para proteger el índice compartido
+from bisect import bisect_right  # Para saltar a la posición del cursor dentro de un índice por campo
+
+from registro_jsonl import RegistroJSONL
+
+RUTA_EVALUACIONES = "evaluaciones.json"  # Una evaluación por línea (JSON Lines)
+CAMPOS_FILTRO = ("modelo", "jugador", "match_id")  # Campos con índice para filtrar el historial
+
+
+def clave_evaluacion(match_id, jugador, movimiento):
+    """Clave del índice: match_id como texto y el movimiento serializado ('["mark", "1", "2"]')."""
+    if not isinstance(movimiento, str):
+        movimiento = json.dumps(movimiento, ensure_ascii=False)
+    return (str(match_id), jugador, movimiento)
+
+
+class AlmacenEvaluaciones:
+    """Evaluaciones en un registro de solo anexado con índice por (match_id, jugador, movimiento)."""
+
+    def __init__(self, ruta=RUTA_EVALUACIONES):
+        self.registro = RegistroJSONL(ruta)
+        self._bloqueo = threading.Lock()
+        self._indice = {}  # clave -> posiciones en el registro, en orden de escritura
+        self._por_campo = {campo: {} for campo in CAMPOS_FILTRO}  # campo -> valor (texto) -> posiciones
+        self._indexados = 0  # Registros ya incorporados al índice
+
+    def __len__(self):
+        return len(self.registro)
+
+    def _actualizar_indice(self):
+        """Incorpora al índice las evaluaciones añadidas (también por otros procesos)."""
+        with self._bloqueo:
+            if self._indexados == len(self.registro):
+                return
+            for posicion, ev in self.registro.enumerar(self._indexados):
+                if isinstance(ev, dict):
+                    clave = clave_evaluacion(ev.get("match_id"), ev.get("jugador"), ev.get("movimiento"))
+                    self._indice.setdefault(clave, []).append(posicion)
+                    for campo, valores in self._por_campo.items():
+                        valores.setdefault(str(ev.get(campo)), []).append(posicion)
+                self._indexados = posicion + 1
+
+    def guardar(self, evaluacion):
+        """Añade una evaluación y devuelve su posición en el registro."""
+        return self.registro.agregar(evaluacion)
+
+    def guardar_partida(self, evaluaciones):
+        """Añade todas las evaluaciones de una partida con una sola escritura."""
+        return self.registro.agregar_lote(evaluaciones)
+
+    def todas(self):
+        """Lista de todas las evaluaciones en orden de escritura."""
+        return self.registro.todos()
+
+    def ultimas(self, cantidad):
+        """Las últimas 'cantidad' evaluaciones, leídas directamente desde el final del registro."""
+        return [ev for _, ev in self.registro.enumerar(max(len(self.registro) - cantidad, 0))]
+
+    def buscar(self, match_id, jugador, movimiento):
+        """Todas las evaluaciones de una jugada, de la más antigua a la más reciente."""
+        self._actualizar_indice()
+        posiciones = self._indice.get(clave_evaluacion(match_id, jugador, movimiento), [])
+        return [self.registro.leer(posicion) for posicion in posiciones]
+
+    def ultima(self, match_id, jugador, movimiento):
+        """La evaluación más reciente de una jugada, o None si no se ha evaluado."""
+        self._actualizar_indice()
+        posiciones = self._indice.get(clave_evaluacion(match_id, jugador, movimiento))
+        return self.registro.leer(posiciones[-1]) if posiciones else None
+
+    def pagina(self, despues_de=-1, limite=50, **filtros):
+        """
+        Devuelve (evaluaciones, siguiente): hasta 'limite' pares (posición,
+        evaluación) posteriores a la posición 'despues_de' que cumplen los
+        filtros (modelo=, jugador=, match_id=; se comparan como texto), y el
+        cursor de la página siguiente (None si no hay más).
+        """
+        self._actualizar_indice()
+        despues_de = max(despues_de, -1)  # Posiciones negativas contarían desde el final del registro
+        filtros = {campo: str(valor) for campo, valor in filtros.items() if valor not in (None, "")}
+        if filtros:
+            # Se recorre el índice más corto y se comprueban los demás filtros en cada evaluación
+            candidatas = min((self._por_campo[campo].get(valor, []) for campo, valor in filtros.items()), key=len)
+            candidatas = candidatas[bisect_right(candidatas, despues_de):]
+        else:
+            candidatas = range(despues_de + 1, self._indexados)
+        resultado = []
+        for posicion in candidatas:
+            ev = self.registro.leer(posicion)
+            if all(str(ev.get(campo)) == valor for campo, valor in filtros.items()):
+                resultado.append((posicion, ev))
+                if len(resultado) > limite:  # Una de más indica que hay otra página
+                    break
+        siguiente = resultado[limite - 1][0] if len(resultado) > limite else None
+        return resultado[:limite], siguiente
+
+    def exportar_json(self):
+        """Genera la exportación como un arreglo JSON, por partes, sin cargar todo en memoria."""
+        yield "[\n"
+        for posicion, ev in self.registro.enumerar():
+            yield (",\n" if posicion else "") + json.dumps(ev, indent=2, ensure_ascii=False)
+        yield "\n]\n"
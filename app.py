@@ -20,7 +20,6 @@ REQUISITOS:
     - Python 3.9+
     - Flask
     - Flask-SQLAlchemy
-    - Matplotlib
     - NumPy
 
 EJECUCIÓN:
@@ -29,53 +28,59 @@ EJECUCIÓN:
     $ flask --app app.py run
 """
 
-# --- Configuración de librerías y entorno para uso sin GUI ---
-import matplotlib
-matplotlib.use('Agg')  # Configura matplotlib para usar backend sin interfaz gráfica, útil en servidores o scripts
-import matplotlib.pyplot as plt  # Importa módulo para generación de gráficos
-import numpy as np  # Importa NumPy para operaciones numéricas y matrices
+# --- Librerías base ---
 import os  # Importa módulo para manejo de sistema operativo y archivos
 import json  # Importa módulo para manejo de datos JSON
 from datetime import datetime  # Importa clase para manejo de fechas y horas
 ############
 
-RUTA_JUGADAS = 'jugadas.json'  # Cambia si quieres otra ruta
+from registro_jsonl import RegistroJSONL, anexar, migrar_desde_json  # Registro de jugadas de solo anexado
+from almacen_evaluaciones import AlmacenEvaluaciones  # Almacén único de evaluaciones (JSON Lines indexado)
+from escritura_diferida import ColaLlena, EscrituraDiferida  # Escrituras de cada jugada en un hilo en segundo plano
+
+RUTA_JUGADAS = 'jugadas.jsonl'  # Cambia si quieres otra ruta
+RUTA_JUGADAS_ANTIGUA = 'jugadas.json'  # Formato anterior (arreglo JSON completo), se migra una sola vez
+
+registro_jugadas = RegistroJSONL(RUTA_JUGADAS)  # Una línea por jugada + índice de desplazamientos
+migrar_desde_json(RUTA_JUGADAS_ANTIGUA, registro_jugadas)  # No hace nada si el registro ya tiene jugadas
+almacen_evaluaciones = AlmacenEvaluaciones()  # Todas las lecturas y escrituras de evaluaciones pasan por aquí
+escritura_diferida = EscrituraDiferida()  # /jugar_turno encola aquí el registro y el historial de cada jugada
 
 def obtener_ultima_jugada():
-    if not os.path.exists(RUTA_JUGADAS):
-        return None
-    with open(RUTA_JUGADAS, 'r', encoding='utf-8') as f:
-        jugadas = json.load(f)
-        if not jugadas:
-            return None
-        # Asumo que la última jugada es la última del array
-        return jugadas[-1]
+    # La última jugada es el último registro; se lee en O(1) gracias al índice
+    escritura_diferida.vaciar()  # Antes se escriben las jugadas que aún estén en cola
+    return registro_jugadas.ultimo()
 
 ############
 # --- Flask y componentes de aplicación web ---
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_from_directory
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, send_from_directory, stream_template
 # Importa Flask y funciones para crear app web, manejar plantillas, solicitudes HTTP, respuestas JSON, redirecciones y sesiones
 
 # --- Funciones del juego (lógica central separada) ---
-from juego_ia import buscar_jugada, inicializar_tablero, revisar_ganador, reiniciar_indice, indice_actual
-# Importa funciones clave para lógica del juego: obtener jugada IA, crear tablero, verificar ganador, reiniciar y obtener índice actual
+from juego_ia import inicializar_tablero, jugar_turno as jugar_turno_estado
+# Importa funciones clave para lógica del juego: crear tablero y jugar un turno sobre el estado de una partida
+from evaluacion_rubrica import DIMENSIONES, evaluar_jugada_rubrica  # Rúbrica automática compartida con la reproducción en lote
+from sesiones_juego import crear_almacen, nuevo_id  # Estado de cada partida guardado por identificador
+from codificacion_tablero import TOTAL_CODIGOS, codificar_tablero  # Representación compacta (entero en base 3) del tablero
+from render_tableros import DIRECTORIO_TABLEROS, encolar_tablero, renderizar  # Imágenes SVG de tableros con caché
 
 # --- Base de datos con SQLAlchemy ---
-from db_handler import create_connection  # Función para crear conexión a base de datos SQLite
+from db_handler import conexion, create_tables, opciones_sqlalchemy  # Pool de conexiones compartido a tres_raya.db
+from agregados_rubrica import AgregadosRubrica, acumular, estadistica  # Promedios de la rúbrica precalculados en tres_raya.db
+from cola_evaluaciones import ColaEvaluaciones  # Cola de jugadas pendientes de evaluar en tres_raya.db
+from eventos_juego import CanalEventos, formatear  # Eventos del juego para /eventos (Server-Sent Events)
 from flask_sqlalchemy import SQLAlchemy  # ORM para manejar base de datos desde Flask
 
 # --- Inicialización de Flask y configuración de base de datos ---
 db = SQLAlchemy()  # Crea instancia de SQLAlchemy para manejar base de datos
 app = Flask(__name__)  # Crea instancia de la aplicación Flask
+escritura_diferida.logger = app.logger  # Los fallos de escritura diferida se informan en el log de la aplicación
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///evaluaciones.db'  # Define la ruta y tipo de base de datos SQLite
+# Misma base de datos (db_handler.DB_PATH) y misma configuración de conexión que el resto de la aplicación
+app.config['SQLALCHEMY_DATABASE_URI'], app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones_sqlalchemy()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False  # Desactiva seguimiento de cambios para mejorar rendimiento
 db.init_app(app)  # Inicializa la base de datos con la app Flask
 
-# Crear todas las tablas definidas en modelos si no existen aún
-with app.app_context():
-    db.create_all()
-
 # --- Modelo de datos SQLAlchemy para evaluaciones ---
 class Evaluacion(db.Model):
     __tablename__ = 'evaluaciones' # <--- ¡IMPORTANTE! Define el nombre de la tabla explícitamente
@@ -103,25 +108,22 @@ class Evaluacion(db.Model):
     # No necesitamos FOREIGN KEY aquí si db_handler.py ya la maneja o si Jugada no es un modelo SQLAlchemy
     # Si Jugada también se convierte en un modelo SQLAlchemy, entonces sí se puede definir aquí.
 
-# --- Rúbrica de evaluación automática: debe coincidir con la del frontend JS ---
-DIMENSIONES = [
-    "Comprensión de Reglas",
-    "Validez y Legalidad",
-    "Razonamiento Estratégico",
-    "Factualidad",
-    "Coherencia Explicativa",
-    "Claridad Lingüística",
-    "Adaptabilidad"
-]  # Lista de dimensiones utilizadas para evaluar automáticamente las jugadas
 
 # --- Clave secreta para gestionar sesiones de usuario ---
-app.secret_key = os.urandom(24)  # Genera una clave secreta aleatoria para proteger sesiones en Flask
+# Todos los workers deben compartir la clave (SECRET_KEY) para aceptar la cookie de sesión de los demás
+app.secret_key = os.environ.get("SECRET_KEY") or os.urandom(24)
+
+# --- Estado del juego por partida (tablero, turno, historial y cursor del dataset) ---
+sesiones = crear_almacen()  # En memoria con LRU o en SQLite según SESIONES_BACKEND
+canal_eventos = CanalEventos()  # Jugadas, ganadores y cambios de partida para los suscriptores de /eventos
 
-# --- Variables globales para el estado del juego (simples mientras no haya múltiples sesiones simultáneas) ---
-tablero = inicializar_tablero()  # Inicializa el tablero vacío
-turno_actual = "x"  # Define que el primer turno es del jugador "x"
-turno_numero = 1  # Contador del número de turno o movimiento
-historial = []  # Lista para almacenar el historial de jugadas
+def partida_actual():
+    # Identificador de la partida: ?partida=<id> en la petición o el guardado en la sesión del navegador
+    partida_id = request.args.get("partida") or session.get("partida_id")
+    if not partida_id:
+        partida_id = nuevo_id()  # Primera visita: se crea una partida nueva
+    session["partida_id"] = partida_id
+    return partida_id
 
 # --- Rutas principales del servidor Flask ---
 ##########################################################################
@@ -145,14 +147,13 @@ def descargar_evaluaciones_json():
     if not session.get("logueado"):
         return redirect(url_for("login")) # Asegura que solo usuarios logueados puedan descargar
 
-    json_filename = 'evaluaciones.json' # <-- ¡CONFIRMA QUE ESTE ES EL NOMBRE DE TU ARCHIVO JSON!
-
-    try:
-        # Asegúrate de que 'os' y 'send_from_directory' estén importados al inicio de app.py
-        import os # Solo si no lo has importado ya al inicio del archivo
-        return send_from_directory(os.getcwd(), json_filename, as_attachment=True)
-    except FileNotFoundError:
-        return f"El archivo {json_filename} no se encontró.", 404
+    # Exporta TODAS las evaluaciones como un arreglo JSON, generado por partes desde el almacén
+    nombre = f"evaluaciones_completas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    return Response(
+        almacen_evaluaciones.exportar_json(),
+        mimetype='application/json',
+        headers={"Content-Disposition": f"attachment; filename={nombre}"}
+    )
 ##########################################################################
 @app.route("/")
 def index():
@@ -162,20 +163,70 @@ def index():
 
 @app.route("/contador_partidas", methods=["GET"])
 def contador_partidas():
-    # Devuelve el índice actual de partidas jugadas en formato JSON
-    return jsonify({"partidas": indice_actual})
+    # Devuelve el número de partidas jugadas en esta sesión en formato JSON
+    estado_partida = sesiones.leer(partida_actual())
+    return jsonify({"partidas": estado_partida["partidas"] if estado_partida else 0})
 
 @app.route("/estado", methods=["GET"])
 def estado():
-    # Proporciona el estado actual del tablero y el jugador que tiene el turno
-    return jsonify({"tablero": tablero, "turno": turno_actual})
+    # Proporciona el estado actual del tablero, su código compacto y el jugador que tiene el turno
+    partida_id = partida_actual()
+    return jsonify(estado_publico(partida_id, sesiones.leer(partida_id) or {}))
+
+def estado_publico(partida_id, estado_partida):
+    # Tablero, código, turno y última jugada de una partida, como los devuelve /estado y los envía /eventos
+    tablero = estado_partida.get("tablero") or inicializar_tablero()
+    historial_partida = estado_partida.get("historial") or []
+    ultima = historial_partida[-1] if historial_partida else {}
+    return {
+        "tablero": tablero,
+        "codigo": codificar_tablero(tablero),
+        "turno": estado_partida.get("turno_actual", "x"),
+        "partida": partida_id,
+        "jugador": ultima.get("jugador"),
+        "modelo": ultima.get("modelo"),
+        "movimiento": ultima.get("movimiento"),
+        "ganador": ultima.get("ganador"),
+    }
+
+@app.route("/eventos", methods=["GET"])
+def eventos():
+    # Canal Server-Sent Events de la partida: en lugar de consultar /estado, la página recibe
+    # un evento 'estado' al conectarse y después 'jugada', 'ganador' y 'partida' a medida que ocurren
+    partida_id = partida_actual()
+    try:
+        desde = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        desde = None
+    inicio = []
+    if desde is None or not canal_eventos.disponible(desde):
+        # Primera conexión o reconexión tras perder eventos que ya no están en el búfer: estado completo
+        desde = canal_eventos.ultimo_id
+        inicio = [formatear(desde, "estado", estado_publico(partida_id, sesiones.leer(partida_id) or {}))]
+
+    def flujo():
+        yield from inicio
+        yield from canal_eventos.suscribir(partida_id, desde)
+
+    return Response(flujo(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})  # Sin búfer en proxies
+
+@app.route("/tablero/<int:codigo>.svg", methods=["GET"])
+def imagen_tablero(codigo):
+    # Sirve la imagen del tablero con ese código; si el hilo aún no la dibujó, se dibuja ahora
+    if codigo >= TOTAL_CODIGOS:
+        return jsonify({"error": "Código de tablero fuera de rango."}), 404
+    renderizar(codigo)
+    return send_from_directory(os.path.abspath(DIRECTORIO_TABLEROS), f"{codigo:05d}.svg", mimetype="image/svg+xml")
 
 @app.route("/info_jugada_sesion", methods=["GET"])
 def info_jugada_sesion():
-    # Retorna información de la última jugada almacenada en la sesión del usuario
-    jugador = session.get("turno_actual", "desconocido").upper()  # Obtiene jugador de sesión o "desconocido"
-    modelo = session.get("modelo", "desconocido")  # Obtiene modelo IA de sesión o "desconocido"
-    movimiento = session.get("movimiento", [])  # Obtiene movimiento guardado o lista vacía
+    # Retorna información de la última jugada de la partida de esta sesión (la cookie solo lleva su id)
+    partida_id = partida_actual()
+    ultima = estado_publico(partida_id, sesiones.leer(partida_id) or {})
+    jugador = (ultima["jugador"] or "desconocido").upper()  # Jugador de la última jugada o "desconocido"
+    modelo = ultima["modelo"] or "desconocido"  # Modelo IA de la última jugada o "desconocido"
+    movimiento = ultima["movimiento"] or []  # Movimiento de la última jugada o lista vacía
     return jsonify({
         "jugador": jugador,
         "modelo": modelo,
@@ -184,92 +235,133 @@ def info_jugada_sesion():
 
 @app.route("/reiniciar", methods=["POST"])
 def reiniciar():
-    # Reinicia el estado global del juego, incluyendo tablero, turno y historial
-    global tablero, turno_actual, turno_numero, historial
-    tablero = inicializar_tablero()  # Nuevo tablero vacío
-    turno_actual = "x"  # Primer turno reiniciado a "x"
-    turno_numero = 1  # Número de turno reiniciado
-    historial = []  # Limpia historial de jugadas
-    reiniciar_indice()  # Reinicia contador global de partidas
+    # Reinicia el estado de la partida, incluyendo tablero, turno, historial y cursor del dataset
+    partida_id = partida_actual()
+    with sesiones.transaccion(partida_id) as estado_partida:
+        estado_partida["tablero"] = inicializar_tablero()  # Nuevo tablero vacío
+        estado_partida["turno_actual"] = "x"  # Primer turno reiniciado a "x"
+        estado_partida["turno_numero"] = 1  # Número de turno reiniciado
+        estado_partida["historial"] = []  # Limpia historial de jugadas
+        estado_partida["partida_dataset"] = 0  # El dataset se vuelve a recorrer desde la primera partida
+        estado_partida["paso"] = 0
+        canal_eventos.publicar("partida", estado_publico(partida_id, estado_partida), partida_id)
     return jsonify({"estado": "reiniciado"})  # Confirma reinicio
 
+PLAZAS_POR_TURNO = 2  # Escrituras diferidas de cada jugada: registro e historial
+ESPERA_COLA = 5  # Segundos que un turno espera sitio en la cola de escritura antes de responder 503
+
+def reservar_escrituras(turnos):
+    # Aparta sitio en la cola de escritura diferida antes de abrir la transacción de la partida:
+    # si el disco no da abasto, la espera no retiene el bloqueo de la partida (ni BEGIN IMMEDIATE)
+    return escritura_diferida.reservar(PLAZAS_POR_TURNO * turnos, ESPERA_COLA)
+
+def respuesta_cola_llena():
+    return jsonify({"error": "El servidor está guardando jugadas pendientes; inténtalo de nuevo."}), 503
+
 @app.route("/jugar_turno", methods=["POST"])
 def jugar_turno():
-    # Ejecuta el turno de la IA, realiza jugada, evalúa, guarda y actualiza estado
-    global tablero, turno_actual, turno_numero, historial
-
-    movimiento, razon, modelo = buscar_jugada(tablero, turno_actual)  # Obtiene jugada de IA y razón
-    
+    # Ejecuta el turno de la IA, realiza jugada, evalúa, guarda y actualiza el estado de la partida
+    partida_id = partida_actual()
+    try:
+        reserva = reservar_escrituras(1)
+    except ColaLlena:
+        return respuesta_cola_llena()
+    with reserva, sesiones.transaccion(partida_id) as estado_partida:
+        return jugar_turno_partida(partida_id, estado_partida, reserva)
+
+def jugar_turno_partida(partida_id, estado_partida, reserva):
+    # Juega un turno sobre el estado de una partida (se guarda al terminar la transacción)
+    return jsonify(registrar_turno(partida_id, estado_partida, reserva))  # Devuelve respuesta JSON con datos de la jugada
+
+def registrar_turno(partida_id, estado_partida, reserva):
+    # Juega un turno, lo evalúa y lo guarda; devuelve la jugada (o el error del modelo) como diccionario.
+    # 'reserva' son las plazas ya apartadas en la cola de escritura diferida, así que encolar no espera
+    momento = datetime.now()  # Hora de la jugada para el historial (no la de su escritura diferida)
+    jugada = jugar_turno_estado(estado_partida)  # Busca la jugada, valida y actualiza tablero y turno
+    if "error" in jugada:
+        return jugada  # Movimiento inválido, fuera de rango o celda ocupada
+    jugada["partida"] = partida_id
+
+    # Realiza evaluación automática de la jugada según rúbrica
+    jugada["evaluacion"] = evaluar_jugada_rubrica(jugada)
+
+    estado_partida["historial"].append(jugada)  # Añade jugada al historial de la partida (estado en memoria)
+
+    # El registro global y el historial de texto se escriben en segundo plano, en lotes y en este orden;
+    # la respuesta no espera al disco. Se encolan dentro de la transacción para conservar el orden de
+    # las jugadas de la partida. El estado visible de la partida es el de 'sesiones', no la cookie
+    reserva.encolar("registro", jugada)
+    reserva.encolar("historial", (momento, jugada))
+
+    guardar_imagen_tablero(estado_partida["tablero"])  # Encola la imagen visual del tablero para análisis
+
+    # Avisa a las páginas suscritas a /eventos de esta partida
+    canal_eventos.publicar("jugada", jugada, partida_id)
+    if jugada["ganador"]:
+        canal_eventos.publicar("ganador", {"ganador": jugada["ganador"], "tablero": jugada["tablero"]}, partida_id)
+
+    return jugada
+
+MAXIMO_TURNOS_LOTE = 9  # Un tablero de 3x3 no admite más jugadas
+
+@app.route("/jugar_turnos", methods=["POST"])
+def jugar_turnos():
+    # Juega varios turnos en una sola petición: ?turnos=N (por defecto hasta que la partida termine).
+    # Con ?flujo=1 responde en NDJSON (una línea por jugada y una final) para que la página las anime
     try:
-        fila = int(movimiento[1]) - 1  # Convierte coordenada fila a índice 0-based
-        col = int(movimiento[2]) - 1  # Convierte coordenada columna a índice 0-based
-    except (IndexError, ValueError):
-        # Maneja errores si formato de movimiento es inválido
-        return jsonify({"error": "Movimiento inválido.", "tablero": tablero})
-
-    if not (0 <= fila < 3 and 0 <= col < 3):
-        # Verifica que las coordenadas estén dentro del tablero
-        return jsonify({"error": "Coordenadas fuera de rango.", "tablero": tablero})
-
-    if tablero[fila][col] == "b":  # Verifica que la celda esté vacía (b = blank)
-        tablero[fila][col] = turno_actual  # Coloca la marca del jugador actual
-        ganador = revisar_ganador(tablero)  # Comprueba si hay ganador tras movimiento
-
-        # Construye diccionario con información completa de la jugada
-        jugada = {
-            "jugador": turno_actual,
-            "movimiento": movimiento,
-            "razon": razon,
-            "modelo": modelo,
-            "ganador": ganador,
-            "tablero": [row[:] for row in tablero],  # Copia profunda del tablero actual
-            "evaluada": False,
-            "match_id": turno_numero
+        turnos = max(1, min(int(request.values.get("turnos", MAXIMO_TURNOS_LOTE)), MAXIMO_TURNOS_LOTE))
+    except ValueError:
+        turnos = MAXIMO_TURNOS_LOTE
+    partida_id = partida_actual()
+
+    # Los turnos se juegan antes de responder, en una sola transacción, para que el estado guardado
+    # de la partida sea ya el final cuando la página lo consulte
+    jugadas, error = [], None
+    try:
+        reserva = reservar_escrituras(turnos)  # Las plazas que no se usen se devuelven al terminar
+    except ColaLlena:
+        return respuesta_cola_llena()
+    with reserva, sesiones.transaccion(partida_id) as estado_partida:
+        historial_partida = estado_partida["historial"]
+        for _ in range(turnos):
+            if historial_partida and historial_partida[-1]["ganador"]:
+                break  # Ganador o empate: la partida terminó (también si ya había terminado antes)
+            jugada = registrar_turno(partida_id, estado_partida, reserva)
+            if "error" in jugada:
+                error = jugada["error"]
+                break
+            jugadas.append(jugada)
+        resumen = {
+            "tablero": estado_partida["tablero"],
+            "turno": estado_partida["turno_actual"],
+            "ganador": historial_partida[-1]["ganador"] if historial_partida else None,
+            "error": error,
+            "partida": partida_id,
         }
 
-        # Realiza evaluación automática de la jugada según rúbrica
-        jugada["evaluacion"] = evaluar_jugada_rubrica(jugada)
-
-        historial.append(jugada)  # Añade jugada al historial en memoria
-        guardar_jugada_en_archivo(jugada)  # Guarda jugada en archivo de texto para registro
+    if request.values.get("flujo") != "1":
+        return jsonify({"jugadas": jugadas, **resumen})
 
-        # Actualiza archivo JSON global de jugadas con la nueva jugada
-        jugadas = cargar_jugadas_desde_archivo()
-        jugadas.append(jugada)
-        guardar_jugadas_en_archivo(jugadas)
+    def lineas():
+        for jugada in jugadas:
+            yield json.dumps(jugada, ensure_ascii=False) + "\n"
+        yield json.dumps({"fin": True, **resumen}, ensure_ascii=False) + "\n"
 
-        # Actualiza la sesión con datos actuales del juego
-        session["tablero"] = tablero
-        session["turno_actual"] = turno_actual
-        session["movimiento"] = movimiento
-        session["razon"] = razon
-        session["modelo"] = modelo
-
-        guardar_imagen_tablero(tablero, turno_numero)  # Guarda imagen visual del tablero para análisis
-        turno_numero += 1  # Incrementa contador de turno
-
-        if not ganador:
-            # Cambia turno entre jugadores "x" y "o"
-            turno_actual = "o" if turno_actual == "x" else "x"
-
-        return jsonify(jugada)  # Devuelve respuesta JSON con datos de la jugada
-    else:
-        # Maneja caso de jugada inválida si la celda ya está ocupada
-        return jsonify({
-            "error": f"Jugada ilegal detectada por el modelo ({turno_actual}). Movimiento: {movimiento}",
-            "tablero": tablero
-        })
+    return Response(lineas(), mimetype="application/x-ndjson")
 
 @app.route("/siguiente_partida", methods=["POST"])
 def siguiente_partida():
-    global tablero, turno_actual, turno_numero, historial, indice_actual
-
-    indice_actual += 1  # Incrementa contador global de partidas jugadas
-    
-    tablero = inicializar_tablero()  # Reinicia tablero vacío
-    turno_actual = "x"  # Reinicia turno a jugador "x"
-    turno_numero = 1  # Reinicia contador de turnos
-    historial = []  # Limpia historial de jugadas
+    # Empieza otra partida en la misma sesión, reproduciendo la siguiente partida del dataset
+    partida_id = partida_actual()
+    with sesiones.transaccion(partida_id) as estado_partida:
+        estado_partida["partidas"] += 1  # Incrementa contador de partidas jugadas
+        estado_partida["partida_dataset"] += 1  # Siguiente id_match del dataset, en O(1)
+        estado_partida["paso"] = 0
+        estado_partida["tablero"] = inicializar_tablero()  # Reinicia tablero vacío
+        estado_partida["turno_actual"] = "x"  # Reinicia turno a jugador "x"
+        estado_partida["turno_numero"] = 1  # Reinicia contador de turnos
+        estado_partida["historial"] = []  # Limpia historial de jugadas
+        canal_eventos.publicar("partida", estado_publico(partida_id, estado_partida), partida_id)
 
     return jsonify({"ok": True, "mensaje": "Partida reiniciada y siguiente jugada preparada."})  # Confirma reinicio
 
@@ -277,8 +369,10 @@ def siguiente_partida():
 def verificar():
     # Reconstruye el tablero paso a paso desde el historial para validar consistencia
     reconstruido = [["b"] * 3 for _ in range(3)]  # Inicializa tablero vacío para reconstrucción
-    
-    for jugada in historial:
+    estado_partida = sesiones.leer(partida_actual()) or {}
+    tablero = estado_partida.get("tablero") or inicializar_tablero()
+
+    for jugada in estado_partida.get("historial", []):
         jugador = jugada.get("jugador")
         movimiento = jugada.get("movimiento")
         if not movimiento or len(movimiento) < 3:
@@ -311,123 +405,76 @@ def verificar():
 
 ### FUNCIONES AUXILIARES ###
 
+def linea_historial(jugada, momento):
+    # Línea del historial de texto con la fecha en que se jugó y detalles de la jugada
+    return (f"[{momento:%Y-%m-%d %H:%M:%S}] Jugador: {jugada['jugador'].upper()}, "
+            f"Movimiento: {jugada['movimiento']}, "
+            f"Razón: {jugada['razon']}, "
+            f"Ganador: {jugada['ganador']}\n")
+
 def guardar_jugada_en_archivo(jugada):
     # Registra jugada con fecha y detalles en un archivo de texto para auditoría
+    guardar_jugadas_en_archivo([(datetime.now(), jugada)])
+
+def guardar_jugadas_en_archivo(entradas):
+    # Añade varias jugadas (momento, jugada) al historial de texto con una sola escritura, entera o nada
     ruta = "historial_jugadas.txt"
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(ruta, "a", encoding="utf-8") as f:
-        f.write(f"[{now}] Jugador: {jugada['jugador'].upper()}, "
-                f"Movimiento: {jugada['movimiento']}, "
-                f"Razón: {jugada['razon']}, "
-                f"Ganador: {jugada['ganador']}\n")
-
-def guardar_imagen_tablero(tablero, turno):
-    # Guarda una imagen PNG que representa el tablero actual con marcas de jugadores visibles
-    if not os.path.exists("tableros"):
-        os.makedirs("tableros")  # Crea carpeta para guardar imágenes si no existe
-
-    fig, ax = plt.subplots(figsize=(3, 3))  # Crea figura y ejes para dibujo
-    ax.set_xticks(np.arange(3))  # Configura ticks en eje x
-    ax.set_yticks(np.arange(3))  # Configura ticks en eje y
-    ax.set_xticklabels([])  # Oculta etiquetas eje x
-    ax.set_yticklabels([])  # Oculta etiquetas eje y
-    ax.grid(True)  # Muestra cuadrícula para simular tablero
-
-    for i in range(3):
-        for j in range(3):
-            cell = tablero[i][j]
-            if cell != "b":  # Si la celda no está vacía
-                ax.text(j, 2 - i, cell.upper(), ha="center", va="center", fontsize=28,
-                        color="#e74c3c" if cell == "x" else "#2980b9")  # Dibuja "X" rojo o "O" azul en celda
-
-    plt.tight_layout()  # Ajusta layout para evitar recortes
-    nombre = f"tableros/turno_{turno:02d}.png"  # Define nombre de archivo con número de turno
-    plt.savefig(nombre)  # Guarda imagen en archivo PNG
-    plt.close()  # Cierra figura para liberar memoria
-
-def evaluar_jugada_rubrica(jugada):
-    # Evalúa la jugada automáticamente basándose en palabras clave en la explicación de la jugada
-    razon = str(jugada.get("razon", "")).lower()  # Obtiene texto de razón en minúsculas
-    return {
-        "Comprensión de Reglas": 3 if "legal" in razon or "válido" in razon else 2,
-        "Validez y Legalidad": 3 if "válido" in razon else 2,
-        "Razonamiento Estratégico": 3 if "bloquear" in razon or "ganar" in razon else 2,
-        "Factualidad": 3 if "tablero" in razon or "posición" in razon else 2,
-        "Coherencia Explicativa": 3 if "porque" in razon or "ya que" in razon else 2,
-        "Claridad Lingüística": 3 if len(razon) > 15 else 2,
-        "Adaptabilidad": 3 if "respuesta" in razon or "ajusté" in razon else 2
-    }  # Retorna diccionario con puntajes para cada dimensión
+    anexar(ruta, "".join(linea_historial(jugada, momento) for momento, jugada in entradas).encode("utf-8"))
+
+def guardar_imagen_tablero(tablero):
+    # Encola el dibujo SVG del tablero en el hilo de render_tableros (no bloquea la petición)
+    # y devuelve la ruta de la imagen, que se nombra por el código del tablero
+    return encolar_tablero(tablero)
 
 def cargar_jugadas_desde_archivo():
-    # Carga lista de jugadas desde archivo JSON si existe, retorna lista vacía si no
-    if os.path.exists("jugadas.json"):
-        with open("jugadas.json", "r") as f:
-            return json.load(f)  # Carga contenido JSON como lista de jugadas
-    return []  # Retorna lista vacía si no existe archivo
+    # Carga lista de jugadas del registro (con sus evaluaciones aplicadas); la posición en la lista es su índice
+    escritura_diferida.vaciar()  # Incluye las jugadas que aún estén en cola
+    return registro_jugadas.todos()
+
+def guardar_jugada_en_registro(jugada):
+    # Añade una jugada al final del registro en O(1) y devuelve su índice
+    return registro_jugadas.agregar(jugada)
+
+def actualizar_jugada_en_archivo(indice, cambios):
+    # Registra cambios parciales (p. ej. la evaluación) de una jugada sin reescribir el registro
+    registro_jugadas.actualizar(indice, cambios)
 
-def guardar_jugadas_en_archivo(jugadas):
-    # Guarda lista completa de jugadas en archivo JSON con indentación para legibilidad
-    with open("jugadas.json", "w") as f:
-        json.dump(jugadas, f, indent=2)
+# Destinos de la escritura diferida: cada lote de jugadas se escribe con una sola operación por archivo
+escritura_diferida.destino("registro", registro_jugadas.agregar_lote)
+escritura_diferida.destino("historial", guardar_jugadas_en_archivo)
 
 def cargar_evaluaciones_desde_archivo():
-    # Lee archivo de evaluaciones JSON donde cada línea es un JSON independiente
-    evaluaciones = []
-    try:
-        with open("evaluaciones.json", "r", encoding="utf-8") as f:
-            for linea in f:
-                ev = json.loads(linea)  # Convierte línea JSON a diccionario
-                print(type(ev))  # Debug: imprime tipo de objeto (debe ser dict)
-                evaluaciones.append(ev)
-    except FileNotFoundError:
-        pass  # Si archivo no existe, simplemente retorna lista vacía
-    return evaluaciones
+    # Lee todas las evaluaciones (una por línea) a través del almacén
+    return almacen_evaluaciones.todas()
 
 def guardar_evaluacion_en_archivo(evaluacion):
-    # Carga evaluaciones previas, añade una nueva y guarda todas en archivo JSON
-try:
-        # Cargar evaluaciones existentes
-        if os.path.exists("evaluaciones.json"):
-            with open("evaluaciones.json", "r", encoding="utf-8") as f:
-                try:
-                    evaluaciones = json.load(f)
-                    if not isinstance(evaluaciones, list):
-                        evaluaciones = []
-                except json.JSONDecodeError:
-                    evaluaciones = []
-        else:
-            evaluaciones = []
-        
-        # Agregar nueva evaluación
-        evaluaciones.append(evaluacion)
-        
-        # Guardar todas las evaluaciones
-        with open("evaluaciones.json", "w", encoding="utf-8") as f:
-            json.dump(evaluaciones, f, indent=2, ensure_ascii=False)
+    # Añade una evaluación al final del almacén (O(1), no reescribe el archivo)
+    try:
+        almacen_evaluaciones.guardar(evaluacion)
+        agregados_rubrica.sincronizar()  # Suma sus puntajes a los promedios precalculados
     except Exception as e:
         print(f"Error al guardar evaluación: {e}")
 
 def guardar_evaluaciones_completas(match_id, jugadas):
-    """Guarda todas las evaluaciones de una partida en el archivo JSON"""
-    evaluaciones_partida = [j for j in jugadas if j.get("match_id") == match_id]
-    
-    for ev in evaluaciones_partida:
-        if ev.get("evaluada", False):
+    """Guarda todas las evaluaciones de una partida en el almacén con una sola escritura"""
+    evaluaciones_partida = []
+    for ev in jugadas:
+        if ev.get("match_id") == match_id and ev.get("evaluada", False):
             # Asegurarse de que la evaluación tenga todos los campos necesarios
             ev.setdefault("evaluacion", {})
             ev.setdefault("razon", "No evaluada por el usuario")
             ev.setdefault("fecha_evaluacion", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            
-            # Guardar cada evaluación individualmente
-            guardar_evaluacion_en_archivo(ev)
+            evaluaciones_partida.append(ev)
+
+    try:
+        almacen_evaluaciones.guardar_partida(evaluaciones_partida)
+        agregados_rubrica.sincronizar()  # Suma los puntajes de la partida a los promedios precalculados
+    except Exception as e:
+        print(f"Error al guardar evaluaciones de la partida {match_id}: {e}")
 def obtener_jugadas():
     # Obtiene todas las jugadas almacenadas en la base de datos SQLite
-    conn = create_connection()  # Abre conexión a base de datos
-    c = conn.cursor()  # Crea cursor para ejecutar consultas
-    c.execute('SELECT * FROM jugadas')  # Consulta todas las filas de la tabla jugadas
-    jugadas = c.fetchall()  # Recupera resultados de la consulta
-    conn.close()  # Cierra conexión
-    return jugadas  # Retorna lista de jugadas
+    with conexion() as conn:  # Toma una conexión del pool y la devuelve al terminar
+        return conn.execute('SELECT * FROM jugadas').fetchall()  # Retorna todas las filas de la tabla jugadas
 #############################################################################################################
 def insertar_evaluacion_bd(match_id, movimiento, evaluacion_rubrica, razon, jugador, modelo, dimensiones_eval):
    
@@ -493,6 +540,14 @@ class Jugada(db.Model):
     evaluada = db.Column(db.Boolean, default=False)  # Indica si la jugada fue evaluada manualmente
     fecha_evaluacion = db.Column(db.String(50), nullable=True)  # Fecha en que se evaluó
 
+# Crear las tablas una vez definidos todos los modelos (antes se llamaba antes de Evaluacion y no creaba nada)
+with conexion() as conn:
+    create_tables(conn)  # Tablas de db_handler y columnas que faltan en 'evaluaciones'
+with app.app_context():
+    db.create_all()
+agregados_rubrica = AgregadosRubrica(almacen_evaluaciones)  # Suma, conteo y suma de cuadrados por dimensión, modelo y partida
+cola_evaluaciones = ColaEvaluaciones(registro_jugadas)  # Jugadas pendientes de evaluar, con asignación por revisor
+
 def insertar_jugada_bd(jugada):
     # Inserta una jugada en la base de datos si no existe previamente para evitar duplicados
     existente = Jugada.query.filter_by(match_id=str(jugada['match_id']),
@@ -579,59 +634,43 @@ def insertar_o_actualizar_evaluacion_bd(jugada):
 @app.route("/evaluar", methods=["GET", "POST"])
 def evaluar():
 
-    # Load all stored plays from a local JSON file
-    jugadas = cargar_jugadas_desde_archivo()
-
-    # Get all unique match_ids and sort them ascendingly
-    match_ids = sorted(set(j['match_id'] for j in jugadas))
-    siguiente_match_id = None
-    
-    # Find the first match_id that has plays pending evaluation
-    for mid in match_ids:
-        if any(not j.get("evaluada", False) for j in jugadas if j['match_id'] == mid):
-            siguiente_match_id = mid
-            break
-
-    # If there are no pending plays, return an informative message
-    if siguiente_match_id is None:
-        return "No hay jugadas pendientes para evaluar."
-
-    # Filter all plays from the selected match
-    jugadas_del_match = [j for j in jugadas if j['match_id'] == siguiente_match_id]
-    # From those, filter only the ones that have not yet been evaluated
-    jugadas_no_evaluadas = [j for j in jugadas_del_match if not j.get("evaluada", False)]
-
-    # If there are no unevaluated plays left, redirect to reload the page
-    if not jugadas_no_evaluadas:
-        return redirect(url_for("evaluar"))
-
-    # Select the first unevaluated play to display in the form
-    jugada_actual = jugadas_no_evaluadas[0]
+    # Each browser session is one reviewer; the queue never hands the same play to two reviewers
+    revisor = session.get("revisor") or nuevo_id()
+    session["revisor"] = revisor
 
     if request.method == "POST":
+        # The form says which play it evaluates; older forms without it use the reviewer's assigned play
+        try:
+            indice = int(request.form["indice"])
+        except (KeyError, ValueError):
+            indice = cola_evaluaciones.tomar(revisor)
+        if indice is None:
+            return "No hay jugadas pendientes para evaluar."
+
         # Get the reason written by the evaluator from the form
         razon = request.form.get('razon', '')
         rubrica = {}
         # Iterate through the form fields to extract the score for each dimension
         for key in request.form:
             if key.startswith("rubrica[") and key.endswith("]"):
-                dim = key[7:-1]  # Extract the name of the evaluated dimension
+                dim = key[8:-1]  # Extract the name of the evaluated dimension ("rubrica[" has 8 characters)
                 rubrica[dim] = int(request.form.get(key))
 
-        # Update the current play in the list with the evaluation and reason
-        for j in jugadas:
-            if j['match_id'] == jugada_actual['match_id'] and j['movimiento'] == jugada_actual['movimiento']:
-                j['evaluacion'] = rubrica
-                j['razon'] = razon
-                j['evaluada'] = True
-                break
+        # Mark the play as evaluated in the queue; if another reviewer already did, keep the first evaluation
+        if not cola_evaluaciones.completar(indice):
+            return redirect(url_for("evaluar"))
 
-        # If all plays in the match have already been evaluated, save the final file with complete evaluations
-        if all(j.get("evaluada", False) for j in jugadas_del_match):
-            guardar_evaluaciones_completas(siguiente_match_id, jugadas_del_match)
+        # Save the change to the plays log (appended to the sidecar file, not a full rewrite)
+        jugada_actual = registro_jugadas.leer(indice)
+        cambios = {'evaluacion': rubrica, 'razon': razon, 'evaluada': True}
+        jugada_actual.update(cambios)
+        actualizar_jugada_en_archivo(indice, cambios)
 
-        # Save changes to the main plays file
-        guardar_jugadas_en_archivo(jugadas)
+        # Once every evaluation of the match is written, exactly one reviewer claims it and saves the final file
+        match_id = jugada_actual['match_id']
+        if cola_evaluaciones.registrar_escrita(indice):
+            jugadas_del_match = [registro_jugadas.leer(i) for i in cola_evaluaciones.jugadas_partida(match_id)]
+            guardar_evaluaciones_completas(match_id, jugadas_del_match)
 
         # Try to save the evaluation to the database, handling errors if they occur
         try:
@@ -642,7 +681,7 @@ def evaluar():
                 razon=razon,
                 jugador=jugada_actual['jugador'],
                 modelo=jugada_actual['modelo'],
-                dimensiones_eval=DIMENSIONES_PARA_EVALUACION
+                dimensiones_eval=DIMENSIONES
             )
         except Exception as e:
             print(f"Error guardando evaluación en BD: {e}")
@@ -650,6 +689,12 @@ def evaluar():
         # Redirect to evaluate the next pending play
         return redirect(url_for("evaluar"))
 
+    # Next pending play (first match with pending plays, first pending play of it), reserved for this reviewer
+    indice = cola_evaluaciones.tomar(revisor)
+    if indice is None:
+        return "No hay jugadas pendientes para evaluar."
+    jugada_actual = registro_jugadas.leer(indice)
+
     # Define dimensions for displaying in the template (from your second definition)
     dimensiones = [
         ("Comprensión de Reglas", "Evalúa si la jugada cumple las reglas básicas."),
@@ -661,71 +706,97 @@ def evaluar():
         ("Adaptabilidad", "Capacidad de adaptarse a jugadas previas."),
     ]
 
-    # Render the HTML evaluation template passing the current play, dimensions, and the enumerate function
-    return render_template("evaluar.html", jugada=jugada_actual, dimensiones=dimensiones, enumerate=enumerate) 
+    # Render the HTML evaluation template passing the current play, its position in the log, dimensions, and the enumerate function
+    return render_template("evaluar.html", jugada=jugada_actual, indice=indice, dimensiones=dimensiones, enumerate=enumerate) 
 ####
 
 
-@app.route("/evaluaciones_historial")
-def evaluaciones_historial():
-    # Define las dimensiones evaluadas para mostrar en la página de historial
-    dimensiones = [
-        "Comprensión de Reglas",
-        "Validez y Legalidad",
-        "Razonamiento Estratégico",
-        "Factualidad",
-        "Coherencia Explicativa",
-        "Claridad Lingüística",
-        "Adaptabilidad",
-    ]
+HISTORIAL_POR_PAGINA = 50  # Evaluaciones por página del historial (y por defecto en /api/evaluaciones)
+HISTORIAL_MAXIMO_PAGINA = 500  # Tope de evaluaciones que se pueden pedir de una vez
+
+def preparar_evaluacion_historial(posicion, ev):
+    # Convierte una evaluación guardada en la fila que muestran el historial y /api/evaluaciones
+    ev = dict(ev)
+    ev["id"] = posicion  # Posición en el almacén: sirve de cursor para la página siguiente
+    ev.setdefault("evaluacion", "")
+    ev.setdefault("tablero", "")
+    ev.setdefault("razon", "")
+    ev.setdefault("movimiento", "")
+    ev.setdefault("jugador", "")
+    ev.setdefault("modelo", "")
+    ev.setdefault("timestamp", ev.get("fecha_evaluacion") or "")
+
+    # Convierte movimientos tipo "mark" a un formato legible para mostrar
+    if (isinstance(ev["movimiento"], list) and len(ev["movimiento"]) >= 3
+            and ev["movimiento"][0] == "mark"):
+        fila = ev["movimiento"][1]
+        columna = ev["movimiento"][2]
+        ev["movimiento_legible"] = f"Marcar fila {fila}, columna {columna}"
+    else:
+        ev["movimiento_legible"] = str(ev["movimiento"])
 
-    # Define valores de promedio de ejemplo para cada dimensión (se puede obtener dinámicamente)
-    promedios = {
-        "Comprensión de Reglas": 2.5,
-        "Validez y Legalidad": 2.2,
-        "Razonamiento Estratégico": 1.8,
-        "Factualidad": 2.7,
-        "Coherencia Explicativa": 2.3,
-        "Claridad Lingüística": 2.9,
-        "Adaptabilidad": 2.0,
-    }
+    # Formatea la razón para mostrarla como texto continuo, ya sea lista o string
+    if isinstance(ev["razon"], list):
+        ev["razon_texto"] = "\n".join(map(str, ev["razon"]))
+    elif isinstance(ev["razon"], str):
+        ev["razon_texto"] = ev["razon"]
+    else:
+        ev["razon_texto"] = ""
 
-    # Carga evaluaciones desde archivo JSON local
-    evaluaciones = cargar_evaluaciones_desde_archivo()
-
-    # Normaliza y prepara los datos para facilitar su visualización en la plantilla
-    for ev in evaluaciones:
-        ev.setdefault("evaluacion", "")
-        ev.setdefault("tablero", "")
-        ev.setdefault("razon", "")
-        ev.setdefault("movimiento", "")
-        ev.setdefault("jugador", "")
-        ev.setdefault("modelo", "")
-        ev.setdefault("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-
-        # Convierte movimientos tipo "mark" a un formato legible para mostrar
-        if (isinstance(ev["movimiento"], list) and len(ev["movimiento"]) >= 3
-                and ev["movimiento"][0] == "mark"):
-            fila = ev["movimiento"][1]
-            columna = ev["movimiento"][2]
-            ev["movimiento_legible"] = f"Marcar fila {fila}, columna {columna}"
-        else:
-            ev["movimiento_legible"] = str(ev["movimiento"])
+    # La evaluación puede ser una etiqueta ("Buena") o los puntajes de la rúbrica
+    if isinstance(ev["evaluacion"], dict):
+        ev["evaluacion_texto"] = ", ".join(f"{dim.lstrip('[')}: {valor}" for dim, valor in ev["evaluacion"].items())
+    else:
+        ev["evaluacion_texto"] = str(ev["evaluacion"])
+    return ev
 
-        # Formatea la razón para mostrarla como texto continuo, ya sea lista o string
-        if isinstance(ev["razon"], list):
-            ev["razon_texto"] = "\n".join(ev["razon"])
-        elif isinstance(ev["razon"], str):
-            ev["razon_texto"] = ev["razon"]
-        else:
-            ev["razon_texto"] = ""
+def pagina_historial(argumentos):
+    # Lee cursor, tamaño y filtros de la petición y devuelve (evaluaciones preparadas, siguiente cursor)
+    try:
+        despues_de = max(int(argumentos.get("despues_de", -1)), -1)  # Un cursor negativo equivale al inicio
+        limite = max(1, min(int(argumentos.get("limite", HISTORIAL_POR_PAGINA)), HISTORIAL_MAXIMO_PAGINA))
+    except ValueError:
+        despues_de, limite = -1, HISTORIAL_POR_PAGINA
+    evaluaciones, siguiente = almacen_evaluaciones.pagina(
+        despues_de, limite,
+        modelo=argumentos.get("modelo"),
+        jugador=argumentos.get("jugador"),
+        match_id=argumentos.get("match_id"),
+    )
+    return [preparar_evaluacion_historial(posicion, ev) for posicion, ev in evaluaciones], siguiente
+
+@app.route("/api/evaluaciones")
+def api_evaluaciones():
+    # Página de evaluaciones en JSON: ?despues_de=<cursor>&limite=N&modelo=&jugador=&match_id=
+    evaluaciones, siguiente = pagina_historial(request.args)
+    return jsonify({"evaluaciones": evaluaciones, "siguiente": siguiente})
+
+def ambito_agregados(argumentos):
+    # Elige qué promedios mostrar según los filtros: partida, modelo o todas las evaluaciones
+    if argumentos.get("match_id"):
+        return "partida", argumentos["match_id"]
+    if argumentos.get("modelo"):
+        return "modelo", argumentos["modelo"]
+    return "global", ""
+
+@app.route("/api/agregados")
+def api_agregados():
+    # Conteo, media y desviación por dimensión: ?match_id= o ?modelo= (sin filtros, todas las evaluaciones)
+    ambito, clave = ambito_agregados(request.args)
+    return jsonify({"ambito": ambito, "clave": clave, "dimensiones": agregados_rubrica.estadisticas(ambito, clave)})
 
-        # Mantiene el tablero en formato lista para facilitar su uso en la plantilla
-        if isinstance(ev["tablero"], list):
-            ev["tablero"] = ev["tablero"]
+@app.route("/evaluaciones_historial")
+def evaluaciones_historial():
+    # Promedios por dimensión del modelo o partida filtrados (o de todas las evaluaciones), ya precalculados
+    promedios = agregados_rubrica.promedios(*ambito_agregados(request.args))
 
-    # Renderiza la plantilla HTML con los datos procesados para el historial de evaluaciones
-    return render_template("evaluaciones_historial.html", evaluaciones=evaluaciones, dimensiones=dimensiones, promedios=promedios)
+    # Solo la primera página (con los filtros de la URL); historial.js pide las siguientes a /api/evaluaciones
+    evaluaciones, siguiente = pagina_historial(request.args)
+    filtros = {campo: request.args.get(campo, "") for campo in ("modelo", "jugador", "match_id")}
+
+    # La plantilla se envía por partes a medida que se genera, sin esperar a la tabla completa
+    return stream_template("evaluaciones_historial.html", evaluaciones=evaluaciones, siguiente=siguiente,
+                           filtros=filtros, dimensiones=DIMENSIONES, promedios=promedios)
 
 
 @app.route("/rubrica")
@@ -780,27 +851,9 @@ def ver_rubrica():
 
 @app.route('/guardar_evaluacion', methods=['POST'])
 def guardar_evaluacion():
-    # [Mantener código existente para obtener datos...]
-    
-    # Crear objeto de evaluación COMPLETO
-    evaluacion_completa = {
-        "match_id": match_id,
-        "jugador": jugador,
-        "modelo": modelo,
-        "movimiento": movimiento,
-        "evaluacion": rubrica,
-        "razon": razon,
-        "evaluada": True,
-        "fecha_evaluacion": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "tablero": session.get("tablero", []),
-        "timestamp": datetime.now().timestamp()  # Campo nuevo para identificación única
-    }
-    
-    # Guardar usando la función modificada
-    guardar_evaluacion_en_archivo(evaluacion_completa)  # <-- Cambio clave aquí
-    
-    # [Mantener el resto del código...]
-    return redirect(url_for("descargar_evaluaciones_json"))
+    # El formulario de evaluar.html envía aquí la rúbrica de la jugada pendiente; se procesa igual
+    # que un POST a /evaluar (marca la jugada, guarda la partida completa en el almacén y en la BD)
+    return evaluar()
 
 @app.route("/siguiente_jugada", methods=["POST"])
 def siguiente_jugada():
@@ -811,156 +864,33 @@ def siguiente_jugada():
 # Funciones auxiliares para manejo de evaluaciones y estadísticas para gráficos
 
 def cargar_evaluaciones():
-    # Intenta cargar evaluaciones guardadas desde archivo JSON local
+    # Carga las evaluaciones guardadas a través del almacén
     try:
-        with open("evaluaciones.json", "r", encoding="utf-8") as f:
-            evaluaciones = json.load(f)
-        return evaluaciones
+        return almacen_evaluaciones.todas()
     except Exception:
-        # Si ocurre un error o no existe el archivo, retorna lista vacía
+        # Si ocurre un error al leer el almacén, retorna lista vacía
         return []
 
 def calcular_promedios(evaluaciones):
-    # Inicializa acumuladores y contadores para cada dimensión de la rúbrica
-    suma_por_dim = {dim: 0 for dim in DIMENSIONES}
-    conteo_por_dim = {dim: 0 for dim in DIMENSIONES}
-
-    # Recorre cada evaluación para sumar las puntuaciones por dimensión
-    for ev in evaluaciones:
-        rubrica = ev.get('rubrica', {})
-        for dim in DIMENSIONES:
-            valor = rubrica.get(dim)
-            if valor is not None:
-                try:
-                    v = int(valor)
-                    suma_por_dim[dim] += v
-                    conteo_por_dim[dim] += 1
-                except ValueError:
-                    # Ignora valores que no sean numéricos
-                    pass
-
-    # Calcula el promedio para cada dimensión, asignando 0 si no hay evaluaciones
-    promedios = {}
-    for dim in DIMENSIONES:
-        if conteo_por_dim[dim] > 0:
-            promedios[dim] = round(suma_por_dim[dim] / conteo_por_dim[dim], 2)
-        else:
-            promedios[dim] = 0
-
-    return promedios
+    # Promedio por dimensión de una lista cualquiera de evaluaciones (0 si la dimensión no tiene puntajes).
+    # Lee los puntajes de 'evaluacion' y normaliza las claves antiguas ("[Factualidad"), igual que los agregados
+    totales = acumular(evaluaciones)
+    return {dim: estadistica(*totales.get(("global", "", dim), (0, 0.0, 0.0)))["media"] for dim in DIMENSIONES}
 
 
 @app.route("/grafico_radar")
 def grafico_radar():
-    # Carga evaluaciones almacenadas para generar estadísticas
-    evaluaciones = cargar_evaluaciones()
-    # Calcula promedios por dimensión para mostrar en gráfico radar
-    promedios = calcular_promedios(evaluaciones)
+    # Promedios por dimensión precalculados (?modelo= o ?match_id= para uno solo), sin leer las evaluaciones
+    promedios = agregados_rubrica.promedios(*ambito_agregados(request.args))
     # Renderiza la plantilla con las dimensiones y los promedios calculados
     return render_template("grafico_radar.html", dimensiones=DIMENSIONES, promedios=promedios)
-from flask import send_file
-import io
 ######################################################################################################
-from flask import make_response
-
-@app.route("/descargar_evaluaciones_json")
-def descargar_evaluaciones_json():
-    if not session.get("logueado"):
-        return redirect(url_for("login"))
-
-    archivo = 'evaluaciones.json'
-    
-    try:
-        # Verificar existencia
-        if not os.path.exists(archivo):
-            return "No hay evaluaciones registradas", 404
-        
-        # Leer contenido directamente (ya está en formato correcto)
-        return send_from_directory(
-            os.getcwd(),
-            archivo,
-            as_attachment=True,
-            mimetype='application/json'
-        )
-    except Exception as e:
-        return f"Error al descargar: {str(e)}", 500
-        
-def guardar_evaluacion_en_archivo(evaluacion):
-    """Guarda evaluaciones en formato acumulativo (no sobrescribe)"""
-    archivo = 'evaluaciones.json'
-    evaluaciones = []
-    
-    # Cargar existentes si el archivo existe
-    if os.path.exists(archivo):
-        try:
-            with open(archivo, 'r', encoding='utf-8') as f:
-                evaluaciones = json.load(f)
-                if not isinstance(evaluaciones, list):
-                    evaluaciones = []  # Resetear si no es lista
-        except:
-            evaluaciones = []
-    
-    # Agregar nueva evaluación
-    evaluaciones.append(evaluacion)
-    
-    # Guardar todas
-    with open(archivo, 'w', encoding='utf-8') as f:
-        json.dump(evaluaciones, f, indent=2, ensure_ascii=False)
-        
-@app.route('/descargar_evaluaciones_json')
-def descargar_evaluaciones_json():
-    if not session.get("logueado"):
-        return redirect(url_for("login"))
-
-    try:
-        # Cargar TODAS las evaluaciones acumuladas
-        evaluaciones = []
-        if os.path.exists("evaluaciones.json"):
-            with open("evaluaciones.json", "r", encoding="utf-8") as f:
-                evaluaciones = json.load(f)
-        
-        # Crear un archivo temporal con nombre único
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        temp_filename = f"evaluaciones_completas_{timestamp}.json"
-        temp_path = os.path.join(os.getcwd(), temp_filename)
-        
-        # Guardar todas las evaluaciones en el temporal
-        with open(temp_path, "w", encoding="utf-8") as f:
-            json.dump(evaluaciones, f, indent=2, ensure_ascii=False)
-        
-        # Enviar el archivo y luego eliminarlo
-        response = send_from_directory(
-            directory=os.getcwd(),
-            path=temp_filename,
-            as_attachment=True,
-            mimetype='application/json'
-        )
-        
-        # Programar eliminación del archivo después del envío
-        @response.call_on_close
-        def remove_file():
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-                
-        return response
-        
-    except Exception as e:
-        return f"Error al generar el archivo: {str(e)}", 500
-###########
 @app.route("/debug_evaluaciones")
 def debug_evaluaciones():
-    """Ruta para verificar el contenido actual del archivo"""
-    if not os.path.exists('evaluaciones.json'):
-        return "Archivo no existe aún"
-    
-    with open('evaluaciones.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+    """Ruta para verificar el contenido actual del almacén de evaluaciones"""
     return jsonify({
-        "total_evaluaciones": len(data),
-        "ultimas_3": data[-3:] if len(data) > 3 else data
+        "total_evaluaciones": len(almacen_evaluaciones),
+        "ultimas_3": almacen_evaluaciones.ultimas(3)
     })
 ###########
 
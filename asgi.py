@@ -0,0 +1,335 @@
+"""
+asgi.py - Modo de servicio asíncrono (ASGI) de la aplicación
+
+Con gunicorn cada petición ocupa un hilo o un proceso mientras espera al
+disco, a SQLite o a que llegue el siguiente evento de /eventos, de modo
+que unas decenas de páginas abiertas bastan para agotar los workers. En
+este modo un solo proceso atiende todas las conexiones desde un bucle
+asyncio:
+
+    - /eventos se sirve con corrutinas (CanalEventos.esperar_async): cada
+      página suscrita cuesta una corrutina dormida, no un hilo
+    - /estado, /api/evaluaciones y /api/agregados son manejadores
+      asíncronos que hacen la lectura de sesiones, del almacén JSON Lines
+      y de SQLite en el ejecutor; leen la partida de la misma cookie de
+      sesión firmada que Flask (y la crean si no existe)
+    - las demás rutas (turnos, /evaluar, plantillas) se ejecutan en la
+      aplicación Flask dentro del ejecutor, también su escritura de
+      archivos, imágenes y commits de SQLite; el bucle sigue aceptando
+      peticiones mientras tanto y las respuestas por partes (NDJSON del
+      historial o de /jugar_turnos) se envían trozo a trozo
+
+El ejecutor es un ThreadPoolExecutor de HILOS_EJECUTOR hilos: acota cuánto
+trabajo bloqueante corre a la vez sin limitar las peticiones en curso.
+
+Al detenerse, uvicorn espera a que se cierren las conexiones antes del
+'lifespan.shutdown'. Por eso, con la primera señal (SIGTERM o SIGINT) se
+cierran las suscripciones a /eventos y empieza a vaciarse la escritura
+diferida; además cada suscripción dura como mucho DURACION_CONEXION y
+--timeout-graceful-shutdown acota la espera de las demás conexiones.
+
+USO:
+    $ uvicorn asgi:aplicacion --host 0.0.0.0 --port 8000 --timeout-graceful-shutdown 20
+    (la misma SECRET_KEY en todos los procesos, como con gunicorn)
+
+    $ python prueba_carga.py -h    compara este modo con el síncrono
+"""
+
+import asyncio  # Importa asyncio para el bucle de eventos
+import contextvars  # Importa contextvars para que cada respuesta conserve el contexto de su petición
+import io  # Importa io para el cuerpo de la petición WSGI
+import json  # Importa json para las respuestas de los manejadores asíncronos
+import os  # Importa os para el tamaño del ejecutor
+import signal  # Importa signal para enterarse de que el servidor se detiene
+import sys  # Importa sys para wsgi.errors
+import threading  # Importa threading para vaciar la escritura diferida sin detener el bucle
+from concurrent.futures import ThreadPoolExecutor  # Hilos para el disco y SQLite
+from functools import partial  # Para pasar argumentos al ejecutor
+from http.cookies import SimpleCookie  # Para leer la cookie de sesión de Flask
+from urllib.parse import parse_qsl  # Para leer los parámetros de la URL
+
+from app import (agregados_rubrica, ambito_agregados, app, canal_eventos, escritura_diferida, estado_publico,
+                 formatear, pagina_historial, sesiones)
+from eventos_juego import DURACION_CONEXION, LATIDO
+from sesiones_juego import nuevo_id
+
+HILOS_EJECUTOR = int(os.environ.get("HILOS_EJECUTOR", 32))  # Trabajo bloqueante simultáneo como máximo
+
+ejecutor = ThreadPoolExecutor(max_workers=HILOS_EJECUTOR, thread_name_prefix="asgi")
+deteniendo = asyncio.Event()  # Se activa con la primera señal de parada: las suscripciones terminan
+
+
+async def en_ejecutor(funcion, *argumentos):
+    """Ejecuta una función bloqueante en el ejecutor sin detener el bucle."""
+    return await asyncio.get_running_loop().run_in_executor(ejecutor, partial(funcion, *argumentos))
+
+
+# --- Peticiones y respuestas ASGI ---
+
+async def leer_cuerpo(receive):
+    """Lee el cuerpo completo de la petición."""
+    partes = []
+    while True:
+        mensaje = await receive()
+        if mensaje["type"] == "http.disconnect":
+            break
+        partes.append(mensaje.get("body", b""))
+        if not mensaje.get("more_body", False):
+            break
+    return b"".join(partes)
+
+
+def cabeceras(scope):
+    """Cabeceras de la petición como diccionario (nombres en minúsculas)."""
+    return {nombre.decode("latin-1"): valor.decode("latin-1") for nombre, valor in scope["headers"]}
+
+
+def argumentos(scope):
+    """Parámetros de la URL como diccionario (el último valor de cada uno)."""
+    return dict(parse_qsl(scope["query_string"].decode("latin-1")))
+
+
+async def responder_json(send, datos, cabeceras_extra=()):
+    cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(cuerpo)).encode()),
+                            *cabeceras_extra]})
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+async def esperar_desconexion(receive):
+    """Termina cuando el cliente cierra la conexión."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def partida_de_sesion(scope):
+    """
+    Devuelve (partida, cookie): la partida de la petición (?partida= o la
+    cookie de sesión de Flask) y, si la sesión no tenía partida, la cabecera
+    Set-Cookie con una nueva, como hace partida_actual() en app.py.
+    """
+    partida = argumentos(scope).get("partida")
+    if partida:
+        return partida, None
+    serializador = app.session_interface.get_signing_serializer(app)
+    nombre = app.config["SESSION_COOKIE_NAME"]
+    cookie = SimpleCookie(cabeceras(scope).get("cookie", ""))
+    datos = {}
+    if nombre in cookie:
+        try:
+            datos = serializador.loads(cookie[nombre].value,
+                                       max_age=int(app.permanent_session_lifetime.total_seconds()))
+        except Exception:
+            datos = {}  # Cookie caducada o firmada con otra clave: se empieza una sesión nueva
+    if datos.get("partida_id"):
+        return datos["partida_id"], None
+    datos["partida_id"] = nuevo_id()
+    nueva = f"{nombre}={serializador.dumps(datos)}; HttpOnly; Path={app.session_interface.get_cookie_path(app)}"
+    return datos["partida_id"], (b"set-cookie", nueva.encode("latin-1"))
+
+
+# --- Manejadores asíncronos ---
+
+async def estado(scope, receive, send):
+    partida, cookie = partida_de_sesion(scope)
+    estado_partida = await en_ejecutor(sesiones.leer, partida)  # Con SESIONES_BACKEND=sqlite lee del disco
+    await responder_json(send, estado_publico(partida, estado_partida or {}), [cookie] if cookie else [])
+
+
+async def eventos(scope, receive, send):
+    partida, cookie = partida_de_sesion(scope)
+    try:
+        desde = int(cabeceras(scope).get("last-event-id", ""))
+    except ValueError:
+        desde = None
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream; charset=utf-8"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+        *([cookie] if cookie else []),
+    ]})
+    inicio = "retry: 3000\n\n"  # Milisegundos que espera EventSource antes de reconectar
+    if desde is None or not canal_eventos.disponible(desde):
+        desde = canal_eventos.ultimo_id
+        estado_partida = await en_ejecutor(sesiones.leer, partida)
+        inicio += formatear(desde, "estado", estado_publico(partida, estado_partida or {}))
+    await send({"type": "http.response.body", "body": inicio.encode("utf-8"), "more_body": True})
+
+    # La corrutina duerme hasta el próximo evento, el próximo latido, el cierre de la conexión o la
+    # parada del servidor; tras DURACION_CONEXION cierra la respuesta y EventSource se reconecta
+    bucle = asyncio.get_running_loop()
+    limite = bucle.time() + DURACION_CONEXION
+    desconexion = asyncio.ensure_future(esperar_desconexion(receive))
+    parada = asyncio.ensure_future(deteniendo.wait())
+    try:
+        while True:
+            restante = limite - bucle.time()
+            if restante <= 0 or parada.done():
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+            espera = asyncio.ensure_future(canal_eventos.esperar_async(desde, partida, min(LATIDO, restante)))
+            await asyncio.wait((espera, desconexion, parada), return_when=asyncio.FIRST_COMPLETED)
+            if desconexion.done():
+                espera.cancel()
+                return
+            if not espera.done():
+                espera.cancel()
+                continue  # Parada del servidor: se cierra la respuesta en la siguiente vuelta
+            nuevos, desde = espera.result()
+            texto = "".join(formatear(*evento) for evento in nuevos) or ": latido\n\n"
+            await send({"type": "http.response.body", "body": texto.encode("utf-8"), "more_body": True})
+    finally:
+        desconexion.cancel()
+        parada.cancel()
+
+
+async def api_evaluaciones(scope, receive, send):
+    evaluaciones, siguiente = await en_ejecutor(pagina_historial, argumentos(scope))
+    await responder_json(send, {"evaluaciones": evaluaciones, "siguiente": siguiente})
+
+
+async def api_agregados(scope, receive, send):
+    ambito, clave = ambito_agregados(argumentos(scope))
+    dimensiones = await en_ejecutor(agregados_rubrica.estadisticas, ambito, clave)
+    await responder_json(send, {"ambito": ambito, "clave": clave, "dimensiones": dimensiones})
+
+
+# Rutas con manejador asíncrono; las demás las atiende Flask en el ejecutor
+RUTAS = {
+    ("GET", "/estado"): estado,
+    ("GET", "/eventos"): eventos,
+    ("GET", "/api/evaluaciones"): api_evaluaciones,
+    ("GET", "/api/agregados"): api_agregados,
+}
+
+
+# --- Resto de rutas: aplicación Flask en el ejecutor ---
+
+def entorno_wsgi(scope, cuerpo):
+    """Diccionario environ de WSGI equivalente a la petición ASGI."""
+    servidor = scope.get("server") or ("localhost", 80)
+    cliente = scope.get("client") or ("", 0)
+    entorno = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),  # WSGI usa cadenas latin-1
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": servidor[0],
+        "SERVER_PORT": str(servidor[1]),
+        "REMOTE_ADDR": cliente[0],
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "CONTENT_LENGTH": str(len(cuerpo)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(cuerpo),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for nombre, valor in cabeceras(scope).items():
+        clave = nombre.upper().replace("-", "_")
+        if clave == "CONTENT_TYPE":
+            entorno["CONTENT_TYPE"] = valor
+        elif clave != "CONTENT_LENGTH":
+            entorno[f"HTTP_{clave}"] = valor
+    return entorno
+
+
+def _cerrar(respuesta):
+    if hasattr(respuesta, "close"):
+        respuesta.close()  # Cierra el contexto de la petición de Flask
+
+
+def _iniciar_wsgi(entorno):
+    """
+    Llama a Flask y devuelve (estado, cabeceras, trozos, pendiente). Las
+    respuestas con Content-Length se leen enteras en la misma llamada
+    (pendiente es None); las que se envían por partes devuelven el primer
+    trozo y pendiente = (iterador, respuesta) para leer el resto.
+    """
+    inicio = {}
+
+    def start_response(estado, cabeceras_respuesta, exc_info=None):
+        inicio["estado"], inicio["cabeceras"] = estado, cabeceras_respuesta
+
+    respuesta = app(entorno, start_response)
+    iterador = iter(respuesta)
+    primero = next(iterador, b"")  # Con respuestas por partes, start_response llega con el primer trozo
+    if any(nombre.lower() == "content-length" for nombre, _ in inicio["cabeceras"]):
+        trozos = [primero, *iterador]
+        _cerrar(respuesta)
+        return inicio["estado"], inicio["cabeceras"], b"".join(trozos), None
+    return inicio["estado"], inicio["cabeceras"], primero, (iterador, respuesta)
+
+
+async def flask_en_ejecutor(scope, receive, send):
+    cuerpo = await leer_cuerpo(receive)
+    # Cada paso de la respuesta puede ir a un hilo distinto del ejecutor: todos corren en el mismo contexto,
+    # el de esta petición, para que stream_with_context/stream_template encuentren la petición de Flask
+    contexto = contextvars.copy_context()
+    estado, cabeceras_respuesta, trozo, pendiente = await en_ejecutor(contexto.run, _iniciar_wsgi,
+                                                                      entorno_wsgi(scope, cuerpo))
+    await send({"type": "http.response.start", "status": int(estado.split(" ", 1)[0]),
+                "headers": [(n.lower().encode("latin-1"), v.encode("latin-1")) for n, v in cabeceras_respuesta]})
+    if pendiente is None:
+        await send({"type": "http.response.body", "body": trozo})  # Una sola ida al ejecutor
+        return
+    iterador, respuesta = pendiente
+    try:
+        while trozo is not None:
+            siguiente = await en_ejecutor(contexto.run, next, iterador, None)  # Cada trozo se genera en el ejecutor
+            if trozo or siguiente is None:
+                await send({"type": "http.response.body", "body": trozo, "more_body": siguiente is not None})
+            trozo = siguiente
+    finally:
+        await en_ejecutor(contexto.run, _cerrar, respuesta)
+
+
+# --- Aplicación ASGI ---
+
+def avisar_detencion(bucle):
+    """
+    Encadena a los manejadores de SIGTERM y SIGINT del servidor uno que, en
+    cuanto empieza la parada, cierra las suscripciones a /eventos y empieza a
+    vaciar la escritura diferida (mientras aún haya conexiones abiertas).
+    """
+    def vaciar():
+        escritura_diferida.vaciar()
+        print("✓ Escritura diferida vaciada")
+
+    for senal in (signal.SIGTERM, signal.SIGINT):
+        anterior = signal.getsignal(senal)
+
+        def manejador(numero, marco, anterior=anterior):
+            bucle.call_soon_threadsafe(deteniendo.set)
+            threading.Thread(target=vaciar, name="vaciar_al_detener", daemon=True).start()
+            if callable(anterior):
+                anterior(numero, marco)  # El servidor sigue con su parada ordenada
+
+        try:
+            signal.signal(senal, manejador)
+        except ValueError:
+            return  # Fuera del hilo principal no se pueden instalar manejadores
+
+
+
+async def aplicacion(scope, receive, send):
+    """Punto de entrada ASGI (uvicorn asgi:aplicacion)."""
+    if scope["type"] == "lifespan":
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "lifespan.startup":
+                avisar_detencion(asyncio.get_running_loop())
+                await send({"type": "lifespan.startup.complete"})
+            elif mensaje["type"] == "lifespan.shutdown":
+                ejecutor.shutdown(wait=True)  # Termina las escrituras en curso antes de salir
+                escritura_diferida.vaciar()  # Y las jugadas que aún estén en la cola de escritura diferida
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    manejador = RUTAS.get((scope["method"], scope["path"]), flask_en_ejecutor)
+    await manejador(scope, receive, send)
@@ -0,0 +1,267 @@
+"""
+cache_dataset.py - Caché binaria y columnar de dataset1.csv
+
+Compila una sola vez el CSV a un directorio de archivos .npy que se abren
+con memoria mapeada (np.load(mmap_mode='r')), de modo que cada arranque
+evita leer el CSV y ejecutar ast.literal_eval, y los distintos workers de
+gunicorn comparten las mismas páginas del sistema operativo.
+
+Columnas guardadas (una fila por jugada, en el orden del CSV):
+    codigo_post     tablero después de la jugada (codificacion_tablero)
+    codigo_previo   tablero antes de la jugada, -1 si la fila no se puede procesar
+    movimiento      id del texto de 'move' (los textos van en meta.json)
+    jugador         id de 'player'
+    modelo          id de 'model'
+    partida         id de 'id_match'
+    valid, win      enteros (-1 si faltan)
+    timestamp       milisegundos desde epoch (-1 si falta)
+    execution_time  segundos (NaN si falta)
+    razon_offsets   posiciones de cada 'reason' dentro de razones (UTF-8)
+
+La caché se invalida por el mtime y el tamaño del CSV y, si estos cambian,
+por su hash SHA-256 (un 'touch' sin cambios no obliga a recompilar).
+
+USO:
+    $ python cache_dataset.py [dataset1.csv]
+"""
+
+import ast  # Importa ast para leer los movimientos del CSV durante la compilación
+import csv  # Importa csv para leer el dataset fila a fila
+import hashlib  # Importa hashlib para calcular el hash del archivo fuente
+import json  # Importa json para los metadatos de la caché
+import os  # Importa os para rutas, mtime y reemplazos atómicos
+import shutil  # Importa shutil para borrar cachés antiguas
+import sys  # Importa sys para leer argumentos de línea de comandos
+import time  # Importa time para medir la compilación
+from datetime import datetime  # Importa datetime para convertir los timestamps ISO
+
+import numpy as np  # Importa NumPy para guardar y mapear las columnas
+
+from codificacion_tablero import codificar_texto_dataset, quitar_jugada
+
+try:
+    import fcntl  # Bloqueo entre procesos (solo POSIX) para que un único worker compile la caché
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+VERSION = 1  # Cambia si se modifica el formato de la caché
+COLUMNAS = {
+    "codigo_post": np.int16,
+    "codigo_previo": np.int16,
+    "movimiento": np.int32,
+    "jugador": np.int16,
+    "modelo": np.int32,
+    "partida": np.int32,
+    "valid": np.int8,
+    "win": np.int8,
+    "timestamp": np.int64,
+    "execution_time": np.float64,
+}
+
+
+def ruta_cache(ruta_csv):
+    """Directorio de la caché asociado a un CSV (p. ej. dataset1.csv -> dataset1.cache)."""
+    return os.path.splitext(ruta_csv)[0] + ".cache"
+
+
+def _hash_archivo(ruta):
+    """SHA-256 del archivo, leído por bloques."""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _entero(texto, defecto=-1):
+    """Convierte un campo numérico del CSV en entero, con valor por defecto si falta."""
+    try:
+        return int(float(texto))
+    except (TypeError, ValueError):
+        return defecto
+
+
+def _milisegundos(texto):
+    """Convierte un timestamp ISO 8601 (p. ej. 2025-03-07T01:58:35.398Z) en milisegundos desde epoch."""
+    try:
+        return int(datetime.fromisoformat(texto.replace("Z", "+00:00")).timestamp() * 1000)
+    except (AttributeError, ValueError):
+        return -1
+
+
+class _Internador:
+    """Asigna ids enteros consecutivos a textos repetidos."""
+
+    def __init__(self):
+        self.ids = {}
+        self.textos = []
+
+    def __call__(self, texto):
+        identificador = self.ids.get(texto)
+        if identificador is None:
+            identificador = self.ids[texto] = len(self.textos)
+            self.textos.append(texto)
+        return identificador
+
+
+def compilar(ruta_csv, directorio=None):
+    """Lee el CSV una vez y escribe la caché de forma atómica. Devuelve los metadatos."""
+    directorio = directorio or ruta_cache(ruta_csv)
+    estado = os.stat(ruta_csv)
+    columnas = {nombre: [] for nombre in COLUMNAS}
+    movimientos, jugadores, modelos, partidas = _Internador(), _Internador(), _Internador(), _Internador()
+    movimientos_leidos = {}  # Texto de 'move' -> lista, para no repetir ast.literal_eval
+    razones, offsets, total_bytes = [], [0], 0
+
+    with open(ruta_csv, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            board, move, jugador = fila["board"] or "", fila["move"] or "", fila["player"] or ""
+            codigo_post = codificar_texto_dataset(board)
+            try:
+                if move not in movimientos_leidos:
+                    movimientos_leidos[move] = ast.literal_eval(move)
+                codigo_previo = quitar_jugada(codigo_post, movimientos_leidos[move], jugador)
+            except Exception:
+                codigo_previo = -1  # Igual que en juego_ia: la fila no se puede usar como jugada
+            columnas["codigo_post"].append(codigo_post)
+            columnas["codigo_previo"].append(codigo_previo)
+            columnas["movimiento"].append(movimientos(move))
+            columnas["jugador"].append(jugadores(jugador))
+            columnas["modelo"].append(modelos(fila["model"] or ""))
+            columnas["partida"].append(partidas(fila["id_match"] or ""))
+            columnas["valid"].append(_entero(fila["valid"]))
+            columnas["win"].append(_entero(fila["win"]))
+            columnas["timestamp"].append(_milisegundos(fila["timestamp"]))
+            try:
+                columnas["execution_time"].append(float(fila["execution_time"]))
+            except (TypeError, ValueError):
+                columnas["execution_time"].append(float("nan"))
+            razon = (fila["reason"] or "").encode("utf-8")
+            razones.append(razon)
+            total_bytes += len(razon)
+            offsets.append(total_bytes)
+
+    temporal = f"{directorio}.tmp-{os.getpid()}"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+    for nombre, tipo in COLUMNAS.items():
+        np.save(os.path.join(temporal, f"{nombre}.npy"), np.array(columnas[nombre], dtype=tipo))
+    np.save(os.path.join(temporal, "razon_offsets.npy"), np.array(offsets, dtype=np.int64))
+    np.save(os.path.join(temporal, "razones.npy"), np.frombuffer(b"".join(razones), dtype=np.uint8))
+    meta = {
+        "version": VERSION,
+        "fuente": {
+            "mtime_ns": estado.st_mtime_ns,
+            "tamano": estado.st_size,
+            "sha256": _hash_archivo(ruta_csv),
+        },
+        "filas": len(offsets) - 1,
+        "movimientos": movimientos.textos,
+        "jugadores": jugadores.textos,
+        "modelos": modelos.textos,
+        "partidas": partidas.textos,
+    }
+    with open(os.path.join(temporal, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # Sustituye la caché anterior: primero se aparta y luego se mueve la nueva a su lugar
+    if os.path.exists(directorio):
+        antigua = f"{directorio}.old-{os.getpid()}"
+        os.replace(directorio, antigua)
+        shutil.rmtree(antigua, ignore_errors=True)
+    os.replace(temporal, directorio)
+    return meta
+
+
+def _leer_meta(directorio):
+    """Devuelve los metadatos de la caché o None si no existe o está dañada."""
+    try:
+        with open(os.path.join(directorio, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == VERSION else None
+
+
+def _vigente(ruta_csv, directorio, meta):
+    """Comprueba si la caché corresponde al CSV actual (mtime/tamaño y, si cambiaron, hash)."""
+    if meta is None:
+        return False
+    estado = os.stat(ruta_csv)
+    fuente = meta["fuente"]
+    if fuente["mtime_ns"] == estado.st_mtime_ns and fuente["tamano"] == estado.st_size:
+        return True
+    if fuente["tamano"] != estado.st_size or fuente["sha256"] != _hash_archivo(ruta_csv):
+        return False
+    # Mismo contenido con otro mtime: se actualizan los metadatos y la caché sigue siendo válida
+    fuente["mtime_ns"] = estado.st_mtime_ns
+    temporal = os.path.join(directorio, f"meta.json.tmp-{os.getpid()}")
+    try:
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temporal, os.path.join(directorio, "meta.json"))
+    except OSError:
+        pass  # Directorio de solo lectura: se volverá a comprobar el hash en el próximo arranque
+    return True
+
+
+class DatasetCompilado:
+    """Vista de solo lectura de la caché con las columnas mapeadas en memoria."""
+
+    def __init__(self, directorio, meta):
+        self.directorio = directorio
+        self.meta = meta
+        self.movimientos = meta["movimientos"]
+        self.jugadores = meta["jugadores"]
+        self.modelos = meta["modelos"]
+        self.partidas = meta["partidas"]
+        for nombre in list(COLUMNAS) + ["razon_offsets", "razones"]:
+            setattr(self, nombre, np.load(os.path.join(directorio, f"{nombre}.npy"), mmap_mode="r"))
+
+    def __len__(self):
+        return self.meta["filas"]
+
+    def razon(self, posicion):
+        """Texto de 'reason' de una fila."""
+        inicio, fin = int(self.razon_offsets[posicion]), int(self.razon_offsets[posicion + 1])
+        return bytes(self.razones[inicio:fin]).decode("utf-8")
+
+    def fila(self, posicion):
+        """Reconstruye una fila con los mismos campos que el CSV (move como texto)."""
+        return {
+            "id_match": self.partidas[int(self.partida[posicion])],
+            "move": self.movimientos[int(self.movimiento[posicion])],
+            "player": self.jugadores[int(self.jugador[posicion])],
+            "model": self.modelos[int(self.modelo[posicion])],
+            "reason": self.razon(posicion),
+            "valid": int(self.valid[posicion]),
+            "win": int(self.win[posicion]),
+            "timestamp": int(self.timestamp[posicion]),
+            "execution_time": float(self.execution_time[posicion]),
+        }
+
+
+def cargar(ruta_csv, directorio=None):
+    """Abre la caché del CSV, compilándola antes si falta o está desactualizada."""
+    directorio = directorio or ruta_cache(ruta_csv)
+    meta = _leer_meta(directorio)
+    if not _vigente(ruta_csv, directorio, meta):
+        bloqueo = open(f"{directorio}.lock", "w") if fcntl else None
+        try:
+            if bloqueo:
+                fcntl.flock(bloqueo, fcntl.LOCK_EX)  # Otro worker puede estar compilando ahora mismo
+            meta = _leer_meta(directorio)
+            if not _vigente(ruta_csv, directorio, meta):
+                meta = compilar(ruta_csv, directorio)
+        finally:
+            if bloqueo:
+                bloqueo.close()  # Cerrar el archivo libera el bloqueo
+    return DatasetCompilado(directorio, meta)
+
+
+if __name__ == "__main__":
+    ruta = sys.argv[1] if len(sys.argv) > 1 else "dataset1.csv"
+    inicio = time.perf_counter()
+    meta = compilar(ruta)
+    print(f"Caché de {meta['filas']} filas escrita en {ruta_cache(ruta)} "
+          f"en {time.perf_counter() - inicio:.2f} s")
@@ -0,0 +1,155 @@
+"""
+codificacion_tablero.py - Representación compacta de tableros de Tres en Raya
+
+Cada tablero se codifica como un entero en base 3 (0 <= codigo < 3**9):
+la celda (fila, columna) ocupa la posición fila * 3 + columna y vale
+0 = vacía ("b"), 1 = "x", 2 = "o". El tablero vacío es el código 0.
+
+Incluye conversiones rápidas desde y hacia todos los formatos usados en
+el proyecto: matriz 3x3 de "x"/"o"/"b" (juego_ia, app y /estado), lista de
+celdas del dataset (['cell', '1', '2', 'b']), el texto de esa lista tal
+como se guarda en dataset1.csv y en la columna 'board' de tres_raya.db, y
+un par de bitboards de 9 bits (uno por jugador).
+"""
+
+import re  # Importa expresiones regulares para leer tableros en texto sin ast.literal_eval
+
+SIMBOLOS = ("b", "x", "o")  # Símbolo de cada valor de celda (0, 1, 2)
+VALORES = {"b": 0, "x": 1, "o": 2}  # Valor numérico de cada símbolo
+POTENCIAS = tuple(3 ** i for i in range(9))  # Peso de cada celda dentro del código
+TOTAL_CODIGOS = 3 ** 9  # Cantidad de códigos posibles (19683)
+TABLERO_VACIO = 0  # Código del tablero sin marcas
+# Las 8 líneas ganadoras (3 filas, 3 columnas y 2 diagonales) como posiciones de celda
+LINEAS = ((0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6))
+
+# Reconoce cada celda del formato del dataset, p. ej. ['cell', '1', '2', 'b']
+_PATRON_CELDA = re.compile(r"\[\s*['\"]cell['\"]\s*,\s*['\"]?([1-3])['\"]?\s*,\s*['\"]?([1-3])['\"]?\s*,\s*['\"]([xob])['\"]\s*\]")
+# Reconoce un movimiento bien formado, p. ej. ['mark', '1', '3']
+_PATRON_MOVIMIENTO = re.compile(r"^\s*\[\s*['\"]mark['\"]\s*,\s*['\"]?([1-3])['\"]?\s*,\s*['\"]?([1-3])['\"]?\s*\]\s*$")
+
+
+def codificar_tablero(tablero):
+    """Convierte una matriz 3x3 de "x"/"o"/"b" en su código entero."""
+    codigo = 0
+    try:
+        for f in range(3):
+            for c in range(3):
+                codigo += VALORES[tablero[f][c]] * POTENCIAS[f * 3 + c]  # Suma el aporte de cada celda
+    except KeyError as e:
+        raise ValueError(f"Valor de celda desconocido: {e.args[0]!r}") from None
+    return codigo
+
+
+def decodificar_tablero(codigo):
+    """Convierte un código entero en una matriz 3x3 nueva de "x"/"o"/"b"."""
+    celdas = celdas_de_codigo(codigo)
+    return [list(celdas[f * 3:f * 3 + 3]) for f in range(3)]  # Agrupa las 9 celdas en filas
+
+
+def celdas_de_codigo(codigo):
+    """Devuelve una tupla plana con los 9 símbolos del tablero, en orden fila por fila."""
+    if not 0 <= codigo < TOTAL_CODIGOS:
+        raise ValueError(f"Código de tablero fuera de rango: {codigo}")
+    celdas = []
+    for _ in range(9):
+        codigo, valor = divmod(codigo, 3)  # Extrae el dígito en base 3 de la celda actual
+        celdas.append(SIMBOLOS[valor])
+    return tuple(celdas)
+
+
+def codificar_celdas_dataset(lista_celdas):
+    """Convierte la lista de celdas del dataset (['cell', fila, col, valor], ...) en su código."""
+    codigo = 0
+    for celda in lista_celdas:
+        if celda[0] == "cell":
+            f, c = int(celda[1]) - 1, int(celda[2]) - 1  # Ajusta fila y columna a base 0
+            if not (0 <= f < 3 and 0 <= c < 3) or celda[3] not in VALORES:
+                raise ValueError(f"Celda inválida en el dataset: {celda!r}")
+            posicion = f * 3 + c
+            codigo += (VALORES[celda[3]] - valor_en(codigo, posicion)) * POTENCIAS[posicion]  # La última asignación gana
+    return codigo
+
+
+def codificar_texto_dataset(texto):
+    """Lee el texto de un tablero del dataset o de la columna 'board' de la BD sin usar ast.literal_eval."""
+    codigo = 0
+    for fila, columna, valor in _PATRON_CELDA.findall(texto):
+        posicion = (int(fila) - 1) * 3 + int(columna) - 1
+        codigo += (VALORES[valor] - valor_en(codigo, posicion)) * POTENCIAS[posicion]  # La última asignación gana
+    return codigo
+
+
+def celdas_dataset_desde_codigo(codigo):
+    """Genera la lista de celdas en el formato del dataset (orden canónico fila por fila)."""
+    celdas = celdas_de_codigo(codigo)
+    return [["cell", str(p // 3 + 1), str(p % 3 + 1), celdas[p]] for p in range(9)]
+
+
+def celda_de_movimiento(movimiento):
+    """Convierte ['mark', fila, col] (1..3, texto o entero) en el índice de celda 0..8."""
+    if isinstance(movimiento, str):
+        coincidencia = _PATRON_MOVIMIENTO.match(movimiento)  # Acepta también el texto guardado en el CSV/BD
+        if not coincidencia:
+            raise ValueError(f"Movimiento con formato inválido: {movimiento!r}")
+        fila, columna = coincidencia.groups()
+    else:
+        if len(movimiento) < 3 or movimiento[0] != "mark":
+            raise ValueError(f"Movimiento con formato inválido: {movimiento!r}")
+        fila, columna = movimiento[1], movimiento[2]
+    f, c = int(fila) - 1, int(columna) - 1  # Ajusta las coordenadas a base 0
+    if not (0 <= f < 3 and 0 <= c < 3):
+        raise ValueError(f"Movimiento fuera del tablero: {movimiento!r}")
+    return f * 3 + c
+
+
+def valor_en(codigo, posicion):
+    """Devuelve el valor (0, 1 o 2) de la celda 'posicion' dentro del código."""
+    return codigo // POTENCIAS[posicion] % 3
+
+
+def colocar(codigo, posicion, jugador):
+    """Devuelve el código resultante de marcar una celda vacía con el jugador dado."""
+    if valor_en(codigo, posicion):
+        raise ValueError(f"La celda {posicion} ya está ocupada")
+    return codigo + VALORES[jugador] * POTENCIAS[posicion]
+
+
+def quitar_jugada(codigo, movimiento, jugador):
+    """
+    Equivalente a juego_ia.remover_jugada sobre el código: vacía la celda del
+    movimiento si contiene la marca del jugador. Igual que la versión con listas,
+    admite índices negativos y lanza IndexError/ValueError si el movimiento no se puede leer.
+    """
+    fila = int(movimiento[1]) - 1  # Ajusta el índice de fila (base 1 a base 0)
+    col = int(movimiento[2]) - 1  # Ajusta el índice de columna (base 1 a base 0)
+    if not (-3 <= fila < 3 and -3 <= col < 3):
+        raise IndexError("list index out of range")  # Mismo error que la indexación de listas
+    posicion = (fila % 3) * 3 + col % 3  # Admite índices negativos igual que las listas de Python
+    if SIMBOLOS[valor_en(codigo, posicion)] == jugador:
+        codigo -= VALORES[jugador] * POTENCIAS[posicion]  # Si la celda corresponde al jugador, la vacía
+    return codigo
+
+
+def codigo_a_bitboards(codigo):
+    """Convierte un código en dos bitboards de 9 bits: (marcas de "x", marcas de "o")."""
+    bits_x = bits_o = 0
+    for posicion in range(9):
+        codigo, valor = divmod(codigo, 3)
+        if valor == 1:
+            bits_x |= 1 << posicion  # Enciende el bit de la celda ocupada por "x"
+        elif valor == 2:
+            bits_o |= 1 << posicion  # Enciende el bit de la celda ocupada por "o"
+    return bits_x, bits_o
+
+
+def bitboards_a_codigo(bits_x, bits_o):
+    """Convierte un par de bitboards (x, o) en su código en base 3."""
+    if bits_x & bits_o:
+        raise ValueError("Los bitboards de x y o se solapan")
+    codigo = 0
+    for posicion in range(9):
+        if bits_x >> posicion & 1:
+            codigo += POTENCIAS[posicion]
+        elif bits_o >> posicion & 1:
+            codigo += 2 * POTENCIAS[posicion]
+    return codigo
@@ -0,0 +1,205 @@
+"""
+cola_evaluaciones.py - Cola de jugadas pendientes de evaluar
+
+/evaluar necesitaba la primera jugada sin evaluar de la primera partida
+(por match_id) que tuviera alguna pendiente, y para encontrarla cargaba
+todo el registro de jugadas en cada petición. Esta cola guarda en la
+tabla 'cola_evaluaciones' de tres_raya.db una fila por jugada del
+registro:
+
+    indice     posición de la jugada en jugadas.jsonl (registro_jsonl)
+    match_id   partida a la que pertenece
+    evaluada   0 mientras esté pendiente
+    escrita    1 cuando su evaluación ya está escrita en el registro
+    revisor    quién la tiene asignada (None si nadie)
+    vence      momento (time.time()) en que caduca la asignación
+
+El índice parcial idx_cola_pendientes (match_id, indice) WHERE evaluada = 0
+mantiene las pendientes en el orden de /evaluar, de modo que tomar() lee
+solo la primera y completar() actualiza una sola fila.
+
+Varios revisores pueden evaluar a la vez sin recibir la misma jugada:
+tomar() elige y asigna la jugada dentro de una transacción BEGIN IMMEDIATE
+(una sola a la vez en todos los procesos), y la asignación caduca tras
+DURACION_ASIGNACION segundos para que una pestaña abandonada no bloquee la
+jugada. completar() solo cuenta la primera evaluación de cada jugada.
+
+Cuando se escribe la última evaluación de una partida hay que guardar la
+partida completa una sola vez. registrar_escrita() marca la jugada como
+escrita y, en la misma transacción, si ya no queda ninguna de la partida
+sin escribir, reclama la partida en la tabla 'partidas_guardadas' (INSERT
+OR IGNORE): solo el revisor que la reclama la guarda, y para entonces
+todas sus evaluaciones ya se pueden leer del registro.
+
+Las jugadas nuevas del registro se añaden solas: como en
+agregados_rubrica.py, la tabla 'cola_estado' guarda cuántas jugadas ya se
+encolaron y sincronizar() solo lee las siguientes.
+"""
+
+import os  # Importa os para identificar el registro por su ruta
+import sqlite3  # Importa sqlite3 para reconocer la columna ya añadida por otro proceso
+import time  # Importa time para la caducidad de las asignaciones
+
+from db_handler import DB_PATH, conexion  # Pool de conexiones compartido con el resto de la aplicación
+
+DURACION_ASIGNACION = 15 * 60  # Segundos que una jugada queda reservada para el revisor que la tomó
+
+ESQUEMA = '''
+CREATE TABLE IF NOT EXISTS cola_evaluaciones (
+    indice INTEGER PRIMARY KEY,
+    match_id,
+    evaluada INTEGER NOT NULL DEFAULT 0,
+    escrita INTEGER NOT NULL DEFAULT 0,
+    revisor TEXT,
+    vence REAL
+);
+CREATE INDEX IF NOT EXISTS idx_cola_pendientes ON cola_evaluaciones(match_id, indice) WHERE evaluada = 0;
+CREATE INDEX IF NOT EXISTS idx_cola_partida ON cola_evaluaciones(match_id, evaluada);
+CREATE INDEX IF NOT EXISTS idx_cola_revisor ON cola_evaluaciones(revisor) WHERE revisor IS NOT NULL;
+CREATE TABLE IF NOT EXISTS cola_estado (
+    registro TEXT PRIMARY KEY,
+    encoladas INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS partidas_guardadas (
+    match_id PRIMARY KEY
+);
+'''
+
+
+class ColaEvaluaciones:
+    """Jugadas de un RegistroJSONL pendientes de evaluar, en orden de partida, con asignación a revisores."""
+
+    def __init__(self, registro, db_path=DB_PATH, duracion=DURACION_ASIGNACION):
+        self.registro = registro
+        self.db_path = db_path
+        self.duracion = duracion
+        self.clave_registro = os.path.abspath(registro.ruta)
+        with conexion(self.db_path) as conn:
+            conn.executescript(ESQUEMA)
+            columnas = {fila[1] for fila in conn.execute('PRAGMA table_info(cola_evaluaciones)')}
+            if 'escrita' not in columnas:
+                try:
+                    conn.execute('ALTER TABLE cola_evaluaciones ADD COLUMN escrita INTEGER NOT NULL DEFAULT 0')
+                    # Las evaluadas antes de existir la columna ya se escribieron en el registro
+                    conn.execute('UPDATE cola_evaluaciones SET escrita = 1 WHERE evaluada = 1')
+                    conn.commit()
+                except sqlite3.OperationalError as e:
+                    conn.rollback()
+                    if 'duplicate column' not in str(e):
+                        raise  # Solo se ignora que otro proceso que arrancaba a la vez ya la añadiera
+
+    def _encoladas(self, conn):
+        fila = conn.execute('SELECT encoladas FROM cola_estado WHERE registro = ?',
+                            (self.clave_registro,)).fetchone()
+        return fila[0] if fila else 0
+
+    def sincronizar(self):
+        """Encola las jugadas añadidas al registro desde la última vez. Devuelve cuántas leyó."""
+        total = len(self.registro)
+        with conexion(self.db_path) as conn:
+            if self._encoladas(conn) >= total:
+                return 0  # Caso habitual: ninguna jugada nueva, ninguna escritura
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                desde = self._encoladas(conn)  # Releído dentro de la transacción
+                filas = [(indice, j.get('match_id'), int(bool(j.get('evaluada', False))))
+                         for indice, j in self.registro.enumerar(desde) if indice < total]
+                # Una jugada que llega ya evaluada al registro ya tiene su evaluación escrita
+                conn.executemany('INSERT OR IGNORE INTO cola_evaluaciones (indice, match_id, evaluada, escrita) '
+                                 'VALUES (?1, ?2, ?3, ?3)', filas)
+                conn.execute('INSERT OR REPLACE INTO cola_estado (registro, encoladas) VALUES (?, ?)',
+                             (self.clave_registro, desde + len(filas)))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return len(filas)
+
+    def tomar(self, revisor):
+        """
+        Asigna a 'revisor' la siguiente jugada pendiente y devuelve su índice en
+        el registro (None si no queda ninguna). Si el revisor ya tiene una
+        jugada asignada y vigente, devuelve esa misma y renueva el plazo.
+        """
+        self.sincronizar()
+        ahora = time.time()
+        with conexion(self.db_path) as conn:
+            conn.execute('BEGIN IMMEDIATE')  # Otro revisor que tome a la vez espera aquí: nunca reciben la misma
+            try:
+                fila = conn.execute('''
+                    SELECT indice FROM cola_evaluaciones
+                    WHERE revisor = ? AND evaluada = 0 AND vence > ?
+                    ORDER BY match_id, indice LIMIT 1
+                ''', (revisor, ahora)).fetchone()
+                if fila is None:
+                    # Las asignadas a otros revisores son pocas: el recorrido del índice se detiene enseguida
+                    fila = conn.execute('''
+                        SELECT indice FROM cola_evaluaciones INDEXED BY idx_cola_pendientes
+                        WHERE evaluada = 0 AND (revisor IS NULL OR vence <= ?)
+                        ORDER BY match_id, indice LIMIT 1
+                    ''', (ahora,)).fetchone()
+                if fila is not None:
+                    conn.execute('UPDATE cola_evaluaciones SET revisor = ?, vence = ? WHERE indice = ?',
+                                 (revisor, ahora + self.duracion, fila[0]))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return fila[0] if fila else None
+
+    def completar(self, indice):
+        """Marca la jugada como evaluada. Devuelve False si ya lo estaba (otro revisor se adelantó)."""
+        with conexion(self.db_path) as conn:
+            marcada = conn.execute('''
+                UPDATE cola_evaluaciones SET evaluada = 1, revisor = NULL, vence = NULL
+                WHERE indice = ? AND evaluada = 0
+            ''', (indice,)).rowcount
+            conn.commit()
+        return marcada == 1
+
+    def registrar_escrita(self, indice):
+        """
+        Marca como escrita en el registro la evaluación de la jugada. Devuelve
+        True si con ella la partida queda completa y esta llamada la reclamó
+        para guardarla: de todos los revisores, solo uno recibe True por partida.
+        """
+        with conexion(self.db_path) as conn:
+            conn.execute('BEGIN IMMEDIATE')  # Quien escribe a la vez la otra última jugada espera aquí
+            try:
+                conn.execute('UPDATE cola_evaluaciones SET escrita = 1 WHERE indice = ?', (indice,))
+                reclamada = conn.execute('''
+                    INSERT OR IGNORE INTO partidas_guardadas (match_id)
+                    SELECT match_id FROM cola_evaluaciones AS c
+                    WHERE indice = ? AND NOT EXISTS (
+                        SELECT 1 FROM cola_evaluaciones WHERE match_id IS c.match_id AND escrita = 0)
+                ''', (indice,)).rowcount
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return reclamada == 1
+
+    def soltar(self, revisor):
+        """Devuelve a la cola la jugada asignada a 'revisor' sin evaluarla."""
+        with conexion(self.db_path) as conn:
+            conn.execute('UPDATE cola_evaluaciones SET revisor = NULL, vence = NULL WHERE revisor = ? AND evaluada = 0',
+                         (revisor,))
+            conn.commit()
+
+    def partida_completa(self, match_id):
+        """True si ya no quedan jugadas pendientes en la partida."""
+        with conexion(self.db_path) as conn:
+            return conn.execute('SELECT NOT EXISTS (SELECT 1 FROM cola_evaluaciones WHERE match_id = ? AND evaluada = 0)',
+                                (match_id,)).fetchone()[0] == 1
+
+    def jugadas_partida(self, match_id):
+        """Índices en el registro de todas las jugadas de la partida, en orden."""
+        with conexion(self.db_path) as conn:
+            return [fila[0] for fila in conn.execute(
+                'SELECT indice FROM cola_evaluaciones WHERE match_id = ? ORDER BY indice', (match_id,))]
+
+    def pendientes(self):
+        """Número de jugadas sin evaluar."""
+        self.sincronizar()
+        with conexion(self.db_path) as conn:
+            return conn.execute('SELECT COUNT(*) FROM cola_evaluaciones WHERE evaluada = 0').fetchone()[0]
@@ -1,20 +1,142 @@
+"""
+consulta_jugadas.py - Consultas paginadas y filtrables sobre las jugadas
+
+Trabaja sobre el esquema normalizado de migrar_esquema.py (tablas modelos,
+partidas y movimientos). La paginación es por clave (keyset): cada página
+devuelve el cursor 'siguiente' (el id de su última jugada) y la próxima se
+pide con despues_de=siguiente, de modo que la página 1000 cuesta lo mismo
+que la primera. Cada filtro usa un índice que termina en id.
+
+    buscar_movimientos   jugadas filtradas por modelo, jugador, partida, posición, validez o resultado
+    jugadas_en_posicion  qué celda eligió cada modelo en una posición (tablero_previo)
+    resumen_modelos      jugadas, victorias e inválidas por modelo
+    movimientos_partida  jugadas de una partida en orden
+    obtener_jugadas      páginas de la tabla 'jugadas' original
+"""
+
 import sqlite3  # Importa el módulo sqlite3 para interactuar con bases de datos SQLite
+import threading  # Importa threading para preparar cada base de datos una sola vez
+
+from db_handler import DB_PATH, conexion  # Pool de conexiones compartido con app.py e import_csv.py
+from migrar_esquema import crear_esquema
+
+LIMITE_PAGINA = 50  # Jugadas por página por defecto
+LIMITE_MAXIMO = 1000  # Tope de jugadas por página
+
+_COLUMNAS = '''
+    m.id, p.id_match, m.turno, m.jugador, mo.nombre AS modelo, m.tablero, m.tablero_previo,
+    m.celda, m.win, m.valid, m.razon, m.timestamp, m.execution_time
+'''
+_ORIGEN = '''
+    FROM movimientos m
+    JOIN partidas p ON p.id = m.partida_id
+    LEFT JOIN modelos mo ON mo.id = m.modelo_id
+'''
+
+
+_preparadas = set()  # Bases de datos en las que ya se comprobó el esquema normalizado
+_bloqueo = threading.Lock()
+
+
+def _consultar(db_path, sql, parametros=()):
+    """Ejecuta una consulta con una conexión del pool y devuelve las filas como diccionarios."""
+    with conexion(db_path) as conn:
+        if db_path not in _preparadas:
+            with _bloqueo:
+                crear_esquema(conn)  # Una base sin migrar devuelve resultados vacíos en lugar de fallar
+                _preparadas.add(db_path)
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row  # Solo en este cursor: la conexión se comparte
+        return [dict(f) for f in cursor.execute(sql, parametros)]
 
-DB_PATH = 'tres_raya.db'  # Ruta al archivo de base de datos SQLite que contiene las jugadas del juego
 
-def obtener_jugadas(limit=10):  # Define una función para obtener un número limitado de jugadas desde la base de datos
-    conn = sqlite3.connect(DB_PATH)  # Establece una conexión con la base de datos SQLite
-    c = conn.cursor()  # Crea un cursor para ejecutar comandos SQL
+def _limite(limite):
+    """Acota el tamaño de página entre 1 y LIMITE_MAXIMO."""
+    return max(1, min(int(limite), LIMITE_MAXIMO))
 
-    c.execute('''  
-        SELECT id, id_match, board, move, win, player, model, reason, timestamp, valid, execution_time
-        FROM jugadas
-        ORDER BY id ASC  
-        LIMIT ?  
-    ''', (limit,))  # Pasa el valor del límite como parámetro para prevenir inyecciones SQL
 
-    resultados = c.fetchall()  # Recupera todos los resultados de la consulta en una lista de tuplas
-    conn.close()  # Cierra la conexión con la base de datos
+def buscar_movimientos(modelo=None, jugador=None, id_match=None, tablero=None, tablero_previo=None,
+                       valido=None, ganadora=None, despues_de=0, limite=LIMITE_PAGINA, db_path=DB_PATH):
+    """
+    Devuelve (jugadas, siguiente): una página de jugadas (diccionarios) que
+    cumplen todos los filtros indicados, en orden de id, y el cursor para
+    pedir la página siguiente (None si no hay más).
+    """
+    condiciones, parametros = ['m.id > ?'], [despues_de]
+    if modelo is not None:
+        # Subconsulta escalar: SQLite usa el índice (modelo_id, id) en lugar de recorrer modelos
+        condiciones.append('m.modelo_id = (SELECT id FROM modelos WHERE nombre = ?)')
+        parametros.append(modelo)
+    if jugador is not None:
+        condiciones.append('m.jugador = ?')
+        parametros.append(jugador)
+    if id_match is not None:
+        condiciones.append('m.partida_id = (SELECT id FROM partidas WHERE id_match = ?)')
+        parametros.append(id_match)
+    if tablero is not None:
+        condiciones.append('m.tablero = ?')
+        parametros.append(tablero)
+    if tablero_previo is not None:
+        condiciones.append('m.tablero_previo = ?')
+        parametros.append(tablero_previo)
+    if valido is not None:
+        condiciones.append('m.valid = ?')
+        parametros.append(int(valido))
+    if ganadora is not None:
+        condiciones.append('m.win = ?')
+        parametros.append(int(ganadora))
+    limite = _limite(limite)
+    filas = _consultar(
+        db_path, f'SELECT {_COLUMNAS} {_ORIGEN} WHERE {" AND ".join(condiciones)} ORDER BY m.id LIMIT ?',
+        parametros + [limite + 1])  # Una fila de más indica si hay otra página
+    jugadas = filas[:limite]
+    siguiente = jugadas[-1]['id'] if len(filas) > limite else None
+    return jugadas, siguiente
+
+
+def jugadas_en_posicion(tablero_previo, db_path=DB_PATH):
+    """Cuenta, para una posición, cuántas veces cada modelo eligió cada celda: [{modelo, celda, veces, victorias}]."""
+    return _consultar(db_path, '''
+            SELECT mo.nombre AS modelo, m.celda, COUNT(*) AS veces, SUM(m.win = 1) AS victorias
+            FROM movimientos m LEFT JOIN modelos mo ON mo.id = m.modelo_id
+            WHERE m.tablero_previo = ?
+            GROUP BY m.modelo_id, m.celda
+            ORDER BY veces DESC
+        ''', (tablero_previo,))
+
+
+def resumen_modelos(modelo=None, db_path=DB_PATH):
+    """Jugadas, victorias, jugadas inválidas y tiempo medio de cada modelo (o solo del indicado)."""
+    filtro, parametros = ('WHERE modelo_id = (SELECT id FROM modelos WHERE nombre = ?)', (modelo,)) if modelo else ('', ())
+    # Se agrega primero sobre idx_movimientos_resumen y después se añade el nombre del modelo
+    return _consultar(db_path, f'''
+            SELECT mo.nombre AS modelo, r.jugadas, r.victorias, r.invalidas, r.tiempo_medio
+            FROM (
+                SELECT modelo_id, COUNT(*) AS jugadas, SUM(win = 1) AS victorias,
+                       SUM(valid = 0 OR celda IS NULL) AS invalidas, AVG(execution_time) AS tiempo_medio
+                FROM movimientos {filtro}
+                GROUP BY modelo_id
+            ) r JOIN modelos mo ON mo.id = r.modelo_id
+            ORDER BY r.jugadas DESC
+        ''', parametros)
+
+
+def movimientos_partida(id_match, db_path=DB_PATH):
+    """Jugadas de una partida en el orden en que se jugaron."""
+    return _consultar(db_path, f'SELECT {_COLUMNAS} {_ORIGEN} WHERE p.id_match = ? ORDER BY m.turno', (id_match,))
+
+
+def obtener_jugadas(limit=10, despues_de=0, db_path=DB_PATH):  # Obtiene una página de jugadas de la tabla original
+    with conexion(db_path) as conn:  # Toma una conexión del pool en lugar de abrir el archivo
+        c = conn.cursor()  # Crea un cursor para ejecutar comandos SQL
+        c.execute('''
+            SELECT id, id_match, board, move, win, player, model, reason, timestamp, valid, execution_time
+            FROM jugadas
+            WHERE id > ?
+            ORDER BY id ASC
+            LIMIT ?
+        ''', (despues_de, limit))  # Pagina por id: despues_de es el id de la última jugada de la página anterior
+        resultados = c.fetchall()  # Recupera todos los resultados de la consulta en una lista de tuplas
 
     return resultados  # Devuelve la lista de jugadas obtenidas
 
@@ -22,4 +144,5 @@ if __name__ == '__main__':  # Punto de entrada principal del script cuando se ej
     jugadas = obtener_jugadas(5)  # Llama a la función para obtener las primeras 5 jugadas registradas
     for j in jugadas:  # Itera sobre cada jugada obtenida
         print(j)  # Imprime la información de la jugada en la consola
-
+    for resumen in resumen_modelos()[:5]:  # Modelos con más jugadas en el esquema normalizado
+        print(resumen)
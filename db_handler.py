@@ -1,13 +1,160 @@
+"""
+db_handler.py - Capa única de acceso a tres_raya.db
+
+Todas las partes de la aplicación (app.py, import_csv.py, migrar_esquema.py
+y consulta_jugadas.py) usan la misma base de datos, DB_PATH, y las mismas
+conexiones:
+
+    - un pool de conexiones por archivo, seguro entre hilos: cada petición
+      toma una conexión abierta con 'with conexion() as conn' y la devuelve
+      al salir, en lugar de abrir y cerrar el archivo en cada llamada
+    - cada conexión se configura una vez (configurar_conexion): WAL,
+      synchronous=NORMAL, caché de páginas, mmap y espera ante bloqueos
+    - al reutilizar la conexión se reutiliza también su caché de sentencias
+      preparadas (CACHE_SENTENCIAS), así que una consulta repetida no se
+      vuelve a compilar
+    - opciones_sqlalchemy() hace que Flask-SQLAlchemy abra sus conexiones
+      con la misma configuración y sobre el mismo archivo
+
+La ruta se puede cambiar con la variable de entorno TRES_RAYA_DB.
+"""
+
+import os  # Importa os para leer la ruta de la base de datos del entorno
+import queue  # Importa queue para guardar las conexiones libres del pool
 import sqlite3  # Importa el módulo sqlite3 para permitir la conexión y manipulación de bases de datos SQLite
+import threading  # Importa threading para proteger la creación de pools y conexiones
+from contextlib import contextmanager  # Para prestar conexiones con 'with'
+
+DB_PATH = os.environ.get("TRES_RAYA_DB", 'tres_raya.db')  # Define la ruta al archivo de base de datos SQLite que se utilizará
+TAMANO_POOL = 8  # Conexiones abiertas como máximo por archivo
+CACHE_SENTENCIAS = 256  # Sentencias preparadas que conserva cada conexión
+ESPERA_BLOQUEO = 30  # Segundos que una conexión espera a que otra libere la escritura
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",  # Lectores y escritor no se bloquean entre sí
+    "PRAGMA synchronous=NORMAL",  # Con WAL es seguro ante caídas del proceso y mucho más rápido que FULL
+    "PRAGMA cache_size=-16384",  # 16 MB de caché de páginas por conexión
+    "PRAGMA mmap_size=268435456",  # Lee hasta 256 MB del archivo mapeado en memoria, sin copias
+    "PRAGMA temp_store=MEMORY",  # Ordenaciones y tablas temporales en memoria
+)
+
+
+def configurar_conexion(conn):  # Aplica los pragmas comunes a una conexión recién abierta
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def create_connection(ruta=None):  # Función que crea y devuelve una conexión a la base de datos
+    conn = sqlite3.connect(  # Establece la conexión con la base de datos SQLite definida
+        ruta or DB_PATH,
+        timeout=ESPERA_BLOQUEO,
+        check_same_thread=False,  # El pool la presta a distintos hilos, nunca a dos a la vez
+        cached_statements=CACHE_SENTENCIAS,
+    )
+    return configurar_conexion(conn)  # Devuelve el objeto de conexión creado y configurado
+
+
+class PoolConexiones:
+    """Conexiones abiertas a un archivo SQLite que se prestan a un hilo cada vez."""
+
+    def __init__(self, ruta, tamano=TAMANO_POOL):
+        self.ruta = ruta
+        self.tamano = tamano
+        self._libres = queue.LifoQueue()  # La última devuelta es la primera prestada: su caché está caliente
+        self._abiertas = 0
+        self._bloqueo = threading.Lock()
+
+    def _tomar(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._bloqueo:
+            if self._abiertas < self.tamano:
+                self._abiertas += 1
+                crear = True
+            else:
+                crear = False
+        if not crear:
+            return self._libres.get()  # Pool lleno: espera a que otro hilo devuelva una conexión
+        try:
+            return create_connection(self.ruta)
+        except BaseException:
+            with self._bloqueo:
+                self._abiertas -= 1
+            raise
 
-DB_PATH = 'tres_raya.db'  # Define la ruta al archivo de base de datos SQLite que se utilizará
+    def _devolver(self, conn):
+        if conn.in_transaction:
+            conn.rollback()  # Una transacción sin confirmar no pasa al siguiente usuario
+        self._libres.put(conn)
 
-def create_connection():  # Función que crea y devuelve una conexión a la base de datos
-    conn = sqlite3.connect(DB_PATH)  # Establece la conexión con la base de datos SQLite definida
-    return conn  # Devuelve el objeto de conexión creado
+    @contextmanager
+    def conexion(self):
+        """Presta una conexión; al salir del 'with' vuelve al pool."""
+        conn = self._tomar()
+        try:
+            yield conn
+        finally:
+            self._devolver(conn)
 
-def create_tables():  # Función que crea las tablas necesarias en la base de datos si no existen
-    conn = create_connection()  # Llama a la función para establecer la conexión a la base de datos
+    def cerrar(self):
+        """Cierra las conexiones libres del pool."""
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+            with self._bloqueo:
+                self._abiertas -= 1
+
+
+_pools = {}  # Ruta absoluta -> PoolConexiones
+_bloqueo_pools = threading.Lock()
+
+
+def obtener_pool(ruta=None):
+    """Pool compartido de un archivo (DB_PATH por defecto); se crea la primera vez."""
+    clave = os.path.abspath(ruta or DB_PATH)
+    with _bloqueo_pools:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = _pools[clave] = PoolConexiones(clave)
+        return pool
+
+
+def conexion(ruta=None):
+    """Atajo: 'with conexion() as conn' presta una conexión del pool de la base de datos."""
+    return obtener_pool(ruta).conexion()
+
+
+def opciones_sqlalchemy(ruta=None):
+    """URI y opciones del motor para que Flask-SQLAlchemy use el mismo archivo y la misma configuración."""
+    from sqlalchemy.pool import QueuePool  # Solo lo necesita app.py
+
+    ruta = os.path.abspath(ruta or DB_PATH)
+    return f"sqlite:///{ruta}", {
+        "creator": lambda: create_connection(ruta),  # Mismos pragmas que el resto de la aplicación
+        "poolclass": QueuePool,  # Con archivos SQLite, SQLAlchemy 1.4 abriría una conexión por sesión
+        "pool_size": TAMANO_POOL,
+    }
+
+
+# Columnas que app.py (modelo Evaluacion) usa y que las bases creadas antes no tienen
+COLUMNAS_EVALUACIONES = (
+    ("match_id", "TEXT"),
+    ("jugador", "TEXT"),
+    ("modelo", "TEXT"),
+    ("movimiento", "TEXT"),
+)
+
+
+def create_tables(conn=None):  # Función que crea las tablas necesarias en la base de datos si no existen
+    propia = conn is None  # Solo se cierra la conexión si la abre esta función
+    if propia:
+        conn = create_connection()  # Llama a la función para establecer la conexión a la base de datos
     c = conn.cursor()  # Crea un cursor para ejecutar sentencias SQL
 
     # Crea la tabla 'jugadas' si no existe, utilizada para almacenar los movimientos del juego
@@ -29,12 +176,16 @@ def create_tables():  # Función que crea las tablas necesarias en la base de da
     ''')
 
     # Crea la tabla 'evaluaciones' si no existe, utilizada para almacenar evaluaciones humanas de las jugadas
-    
+
     c.execute('''
     CREATE TABLE IF NOT EXISTS evaluaciones (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         jugada_id INTEGER NOT NULL,
         usuario TEXT,
+        match_id TEXT,
+        jugador TEXT,
+        modelo TEXT,
+        movimiento TEXT,
         criterio_1 INTEGER,
         criterio_2 INTEGER,
         criterio_3 INTEGER,
@@ -48,9 +199,20 @@ def create_tables():  # Función que crea las tablas necesarias en la base de da
     )
     ''')
 
+    # Las bases creadas con la versión anterior de la tabla no tienen las columnas de la partida
+    existentes = {fila[1] for fila in c.execute('PRAGMA table_info(evaluaciones)')}
+    for nombre, tipo in COLUMNAS_EVALUACIONES:
+        if nombre not in existentes:
+            try:
+                c.execute(f'ALTER TABLE evaluaciones ADD COLUMN {nombre} {tipo}')
+            except sqlite3.OperationalError as e:
+                if 'duplicate column' not in str(e):
+                    raise  # Solo se ignora que otro proceso que arrancaba a la vez ya la añadiera
+    c.execute('CREATE INDEX IF NOT EXISTS idx_evaluaciones_jugada ON evaluaciones(match_id, jugador, movimiento)')
 
     conn.commit()  # Guarda los cambios realizados en la base de datos
-    conn.close()  # Cierra la conexión con la base de datos
+    if propia:
+        conn.close()  # Cierra la conexión con la base de datos
 
 # Punto de entrada principal del script
 # Llama a la función para crear las tablas solo una vez al ejecutar este archivo directamente
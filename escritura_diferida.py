@@ -0,0 +1,159 @@
+"""
+escritura_diferida.py - Escritura diferida (write-behind) de los efectos de cada jugada
+
+/jugar_turno escribía en disco dentro de la petición: una línea en
+historial_jugadas.txt y otra en el registro jugadas.jsonl (con su índice y
+su bloqueo entre procesos). Con EscrituraDiferida la petición solo encola
+la jugada y responde; un hilo en segundo plano la escribe después,
+agrupando en una sola escritura todas las pendientes de cada destino.
+
+    - cada destino (nombre -> función que escribe una lista de elementos)
+      se registra una vez con destino()
+    - la cola es acotada (CAPACIDAD plazas): reservar() aparta sitio antes
+      de empezar (p. ej. antes de abrir la transacción de la partida) y, si
+      el disco no da abasto, espera a que lo haya o lanza ColaLlena; así la
+      espera nunca ocurre con un bloqueo tomado
+    - el orden se conserva: cada destino recibe sus elementos en el orden
+      en que se encolaron, y dentro de un lote los destinos se escriben en
+      el orden en que aparecieron (app.py encola primero el registro, de
+      modo que el historial de texto nunca muestra una jugada que aún no
+      esté en jugadas.jsonl)
+    - si un destino falla (disco lleno, bloqueo, error de E/S) el lote se
+      reintenta con espera creciente hasta que se escribe: nada se descarta
+      y vaciar() no termina mientras quede algo sin escribir
+    - vaciar() espera a que todo lo encolado esté escrito; se llama al
+      salir del proceso (atexit) y antes de leer lo que se acaba de escribir
+
+Los destinos deben escribir cada lote entero o nada (como
+registro_jsonl.anexar), para que un reintento no duplique líneas. Si el
+proceso muere de forma abrupta (kill -9) se pierden como mucho las jugadas
+aún en la cola; lo ya escrito queda completo y en orden.
+"""
+
+import atexit  # Importa atexit para vaciar la cola al terminar el proceso
+import logging  # Importa logging para informar de los fallos de escritura
+import queue  # Importa queue para la cola de escrituras
+import threading  # Importa threading para el hilo de escritura y las plazas de la cola
+import time  # Importa time para medir la espera de reservar() y de los reintentos
+
+CAPACIDAD = 10000  # Elementos en cola como máximo antes de frenar a quien encola
+LOTE = 500  # Elementos que el hilo escribe como máximo de una vez
+PRIMER_REINTENTO = 0.1  # Segundos antes de reintentar un lote que falló (se duplica en cada fallo)
+REINTENTO_MAXIMO = 30  # Segundos de espera máxima entre reintentos
+
+
+class ColaLlena(Exception):
+    """La cola no tuvo sitio libre en el plazo indicado."""
+
+
+class Reserva:
+    """Plazas apartadas en la cola; las que no se usen se devuelven al salir del 'with'."""
+
+    def __init__(self, escritura, plazas):
+        self._escritura = escritura
+        self.plazas = plazas
+
+    def encolar(self, nombre, elemento):
+        """Encola en una plaza ya reservada: nunca espera."""
+        if self.plazas <= 0:
+            raise RuntimeError("No quedan plazas en la reserva")
+        self.plazas -= 1
+        self._escritura._poner(nombre, elemento)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._escritura._liberar(self.plazas)
+        self.plazas = 0
+
+
+class EscrituraDiferida:
+    """Cola acotada de escrituras que un hilo en segundo plano agrupa y ejecuta en orden."""
+
+    def __init__(self, capacidad=CAPACIDAD, lote=LOTE, logger=None):
+        self.lote = lote
+        self.logger = logger or logging.getLogger(__name__)
+        self._cola = queue.Queue()  # Sin límite propio: lo acotan las plazas
+        self._plazas = threading.Semaphore(capacidad)
+        self._destinos = {}
+        self._bloqueo = threading.Lock()
+        self._hilo = None
+        atexit.register(self.vaciar)
+
+    def destino(self, nombre, escribir):
+        """Registra la función que escribe una lista de elementos del destino 'nombre'."""
+        self._destinos[nombre] = escribir
+
+    def reservar(self, plazas, espera=None):
+        """
+        Aparta 'plazas' sitios en la cola y devuelve una Reserva. Espera a que
+        los haya como mucho 'espera' segundos (sin límite si es None) y, si no,
+        lanza ColaLlena sin quedarse ninguno.
+        """
+        limite = None if espera is None else time.monotonic() + espera
+        for tomadas in range(plazas):
+            restante = None if limite is None else max(limite - time.monotonic(), 0)
+            if not self._plazas.acquire(timeout=restante):
+                self._liberar(tomadas)
+                raise ColaLlena(f"Sin sitio en la cola de escritura tras {espera} s")
+        return Reserva(self, plazas)
+
+    def encolar(self, nombre, elemento):
+        """Añade un elemento para escribir en el destino 'nombre'; espera si la cola está llena."""
+        self._plazas.acquire()
+        self._poner(nombre, elemento)
+
+    def vaciar(self):
+        """Bloquea hasta que todo lo encolado esté escrito."""
+        self._cola.join()
+
+    def pendientes(self):
+        return self._cola.unfinished_tasks
+
+    def _poner(self, nombre, elemento):
+        if self._hilo is None:
+            with self._bloqueo:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._trabajador, name="escritura_diferida", daemon=True)
+                    self._hilo.start()
+        self._cola.put((nombre, elemento))
+
+    def _liberar(self, plazas):
+        for _ in range(plazas):
+            self._plazas.release()
+
+    def _trabajador(self):
+        while True:
+            tomados = [self._cola.get()]  # Espera al primero sin consumir CPU
+            while len(tomados) < self.lote:
+                try:
+                    tomados.append(self._cola.get_nowait())  # Y se lleva los que ya estén esperando
+                except queue.Empty:
+                    break
+            self._escribir(tomados)
+            for _ in tomados:
+                self._cola.task_done()
+            self._liberar(len(tomados))
+
+    def _escribir(self, tomados):
+        # Una escritura por destino con sus elementos en orden; los destinos en orden de aparición
+        grupos = {}
+        for nombre, elemento in tomados:
+            grupos.setdefault(nombre, []).append(elemento)
+        for nombre, elementos in grupos.items():
+            self._escribir_destino(nombre, elementos)
+
+    def _escribir_destino(self, nombre, elementos):
+        # Reintenta hasta que el lote se escribe: un fallo pasajero no pierde jugadas, y mientras
+        # tanto la cola se llena y frena a quien encola en lugar de descartar
+        espera = PRIMER_REINTENTO
+        while True:
+            try:
+                self._destinos[nombre](elementos)
+                return
+            except Exception:
+                self.logger.exception("No se pudieron escribir %d elementos en '%s'; reintento en %.1f s",
+                                      len(elementos), nombre, espera)
+                time.sleep(espera)
+                espera = min(espera * 2, REINTENTO_MAXIMO)
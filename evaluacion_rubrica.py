@@ -0,0 +1,137 @@
+"""
+evaluacion_rubrica.py - Evaluación automática de jugadas según la rúbrica
+
+Compartido por app.py (cada /jugar_turno) y reproduccion_lote.py (reproducción
+sin HTTP), para que ambos produzcan exactamente las mismas evaluaciones.
+
+Cada dimensión vale 3 si la razón de la jugada contiene alguna de sus
+palabras clave (en español o en inglés: las razones del dataset están en
+inglés) y 2 si no; "Claridad Lingüística" vale 3 si la razón tiene más de
+15 caracteres. Todas las palabras clave forman una sola expresión regular,
+así que cada razón se recorre una sola vez, y los puntajes de cada razón
+se guardan en una caché (lru_cache, por el hash del texto).
+
+evaluar_razones() puntúa una columna entera (Series de pandas, arreglo de
+NumPy o lista): evalúa una sola vez cada razón distinta y reparte los
+puntajes con un índice de NumPy, de modo que el costo depende de las
+razones distintas y no de las filas.
+
+USO:
+    $ python evaluacion_rubrica.py dataset1.csv [--columna reason]
+"""
+
+import re  # Importa re para la expresión regular con todas las palabras clave
+import sys  # Importa sys para los argumentos de línea de comandos
+import time  # Importa time para medir el rendimiento del modo en lote
+from functools import lru_cache  # Caché de puntajes por razón
+
+# --- Rúbrica de evaluación automática: debe coincidir con la del frontend JS ---
+DIMENSIONES = [
+    "Comprensión de Reglas",
+    "Validez y Legalidad",
+    "Razonamiento Estratégico",
+    "Factualidad",
+    "Coherencia Explicativa",
+    "Claridad Lingüística",
+    "Adaptabilidad"
+]  # Lista de dimensiones utilizadas para evaluar automáticamente las jugadas
+
+# Palabras clave de cada dimensión (en minúsculas); basta con que aparezca una, también dentro de otra palabra
+PALABRAS_CLAVE = {
+    "Comprensión de Reglas": ("legal", "válido", "regla", "valid", "rule", "allowed"),
+    "Validez y Legalidad": ("válido", "libre", "valid", "empty", "available"),
+    "Razonamiento Estratégico": ("bloquear", "ganar", "block", "win", "threat", "fork", "strateg"),
+    "Factualidad": ("tablero", "posición", "board", "position", "row", "column", "diagonal"),
+    "Coherencia Explicativa": ("porque", "ya que", "because", "since", "so that"),
+    "Adaptabilidad": ("respuesta", "ajusté", "respond", "response", "counter", "adapt"),
+}
+LONGITUD_CLARA = 15  # Caracteres a partir de los cuales la razón cuenta como clara
+TAMANO_CACHE = 1 << 16  # Razones distintas cuyos puntajes se conservan
+
+
+def _alternativas(palabras):
+    # Expresión en forma de trie: las palabras que comparten prefijo lo comparten en la expresión, así que
+    # en cada posición el motor descarta casi todas mirando un carácter en lugar de probarlas una a una
+    ramas = {}
+    for palabra in palabras:
+        ramas.setdefault(palabra[:1], []).append(palabra[1:])
+    termina = ramas.pop("", None) is not None
+    partes = [re.escape(letra) + _alternativas(restos) for letra, restos in sorted(ramas.items())]
+    if not partes:
+        return ""  # Fin de una palabra que no continúa
+    if termina:
+        partes.append("")  # La palabra puede acabar aquí, pero antes se prueban las más largas
+    return "(?:" + "|".join(partes) + ")"
+
+
+def _compilar(palabras_clave):
+    # Una sola expresión con todas las palabras, probada en cada posición del texto (lookahead, sin consumirlo).
+    # En cada posición gana la palabra más larga, así que cada una suma también las dimensiones de las
+    # palabras que son prefijo suyo ("winning" encontrada implica "win" encontrada en el mismo sitio)
+    dimensiones = {}
+    for dim, palabras in palabras_clave.items():
+        for palabra in palabras:
+            dimensiones.setdefault(palabra, set()).add(dim)
+    palabras = list(dimensiones)
+    patron = re.compile("(?=(" + _alternativas(palabras) + "))")
+    por_palabra = {p: frozenset().union(*(dimensiones[q] for q in palabras if p.startswith(q))) for p in palabras}
+    return patron, por_palabra
+
+
+_PATRON, _DIMENSIONES_PALABRA = _compilar(PALABRAS_CLAVE)
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def puntajes_razon(razon):
+    """Tupla de puntajes (en el orden de DIMENSIONES) de una razón ya en minúsculas."""
+    encontradas = set()
+    for palabra in set(_PATRON.findall(razon)):
+        encontradas |= _DIMENSIONES_PALABRA[palabra]
+    return tuple(
+        (3 if len(razon) > LONGITUD_CLARA else 2) if dim == "Claridad Lingüística"
+        else (3 if dim in encontradas else 2)
+        for dim in DIMENSIONES
+    )
+
+
+def evaluar_jugada_rubrica(jugada):
+    # Evalúa la jugada automáticamente basándose en palabras clave en la explicación de la jugada
+    razon = str(jugada.get("razon", "")).lower()  # Obtiene texto de razón en minúsculas
+    return dict(zip(DIMENSIONES, puntajes_razon(razon)))  # Retorna diccionario con puntajes para cada dimensión
+
+
+def evaluar_razones(razones):
+    """
+    Puntúa una columna de razones de una vez. Devuelve un DataFrame con una
+    columna por dimensión (mismo índice que 'razones' si es una Series) y
+    los mismos puntajes que evaluar_jugada_rubrica daría a cada fila.
+    """
+    import numpy as np  # Solo se cargan al evaluar en lote
+    import pandas as pd
+
+    serie = razones if isinstance(razones, pd.Series) else pd.Series(razones)
+    # Cada razón distinta recibe un código; se evalúa una vez y los puntajes se copian a sus filas
+    try:
+        codigos, distintas = pd.factorize(serie, use_na_sentinel=False)
+    except TypeError:
+        codigos, distintas = pd.factorize(serie.map(str))  # Razones no hashables (p. ej. listas): como texto
+    tabla = np.array([puntajes_razon(str(razon).lower()) for razon in distintas],
+                     dtype=np.int8).reshape(-1, len(DIMENSIONES))
+    return pd.DataFrame(tabla[codigos], index=serie.index, columns=DIMENSIONES)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) in (2, 4) and (len(sys.argv) == 2 or sys.argv[2] == "--columna"):
+        import pandas as pd
+
+        columna = sys.argv[3] if len(sys.argv) == 4 else "reason"
+        razones = pd.read_csv(sys.argv[1], usecols=[columna])[columna]
+        inicio = time.perf_counter()
+        puntajes = evaluar_razones(razones)
+        segundos = time.perf_counter() - inicio
+        print(f"{len(puntajes)} razones evaluadas en {segundos * 1000:.1f} ms "
+              f"({razones.nunique()} distintas)")
+        for dim, media in puntajes.mean().items():
+            print(f"  {dim}: media {media:.2f}")
+    else:
+        print(__doc__)
@@ -0,0 +1,133 @@
+"""
+eventos_juego.py - Canal de eventos del juego para Server-Sent Events
+
+Sustituye el sondeo de /estado y /info_jugada_sesion: el motor publica
+un evento en cada cambio y las páginas lo reciben por /eventos
+(EventSource) con una sola conexión abierta.
+
+    jugada    un turno jugado (la jugada, con el tablero resultante)
+    ganador   la partida terminó (ganador "x", "o" o "empate")
+    partida   la partida se reinició o pasó a la siguiente del dataset
+
+Cada evento lleva un id creciente y la partida a la que pertenece. Los
+últimos CAPACIDAD eventos se guardan en un búfer circular: un cliente que
+se reconecta con la cabecera Last-Event-ID recibe los que se perdió, y si
+ya no están en el búfer recibe de nuevo el estado completo.
+
+Los suscriptores no consumen CPU mientras esperan: duermen en una
+threading.Condition hasta que publicar() los despierta, o hasta que toca
+enviar un latido (comentario SSE) para que los proxies no corten la
+conexión. Cada conexión dura como mucho DURACION_CONEXION segundos: al
+cerrarse, EventSource se reconecta solo y con Last-Event-ID recibe lo que
+se publicó entretanto, así que un servidor síncrono no queda ocupado para
+siempre por una página abierta. En el modo ASGI (asgi.py) los suscriptores son corrutinas que
+esperan un asyncio.Event con esperar_async(), sin ocupar un hilo cada una.
+El canal vive en la memoria del proceso.
+"""
+
+import asyncio  # Importa asyncio para los suscriptores del modo ASGI
+import json  # Importa json para serializar los datos de cada evento
+import threading  # Importa threading para despertar a los suscriptores
+import time  # Importa time para el plazo de espera de cada latido
+from collections import deque  # Búfer circular de los últimos eventos
+from itertools import islice  # Recorre el búfer desde una posición sin copiarlo
+
+CAPACIDAD = 1024  # Eventos que se conservan para los clientes que se reconectan
+LATIDO = 15  # Segundos sin eventos tras los que se envía un comentario para mantener viva la conexión
+DURACION_CONEXION = 5 * 60  # Segundos que se mantiene abierta una suscripción antes de cerrarla
+
+
+def formatear(identificador, tipo, datos):
+    """Texto SSE de un evento."""
+    return f"id: {identificador}\nevent: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+class CanalEventos:
+    """Publicación de eventos por partida y espera de los suscriptores sin sondeo."""
+
+    def __init__(self, capacidad=CAPACIDAD):
+        self._eventos = deque(maxlen=capacidad)  # (id, tipo, partida, datos), ids consecutivos
+        self._ultimo = 0
+        self._condicion = threading.Condition()
+        self._esperas = set()  # (bucle, asyncio.Event) de los suscriptores asíncronos que esperan
+
+    @property
+    def ultimo_id(self):
+        return self._ultimo
+
+    def publicar(self, tipo, datos, partida=None):
+        """Añade un evento (partida=None lo reciben todos) y despierta a los suscriptores. Devuelve su id."""
+        with self._condicion:
+            self._ultimo += 1
+            self._eventos.append((self._ultimo, tipo, partida, datos))
+            self._condicion.notify_all()
+            for bucle, evento in self._esperas:
+                bucle.call_soon_threadsafe(evento.set)  # publicar() puede llamarse desde cualquier hilo
+            return self._ultimo
+
+    def disponible(self, desde):
+        """True si los eventos posteriores a 'desde' siguen en el búfer (se pueden reenviar)."""
+        with self._condicion:
+            primero = self._eventos[0][0] if self._eventos else self._ultimo + 1
+            return primero - 1 <= desde <= self._ultimo
+
+    def _posteriores(self, desde, partida):
+        # Los ids son consecutivos: el evento 'desde + 1' está en la posición desde + 1 - primero
+        if not self._eventos or desde >= self._ultimo:
+            return []
+        inicio = max(desde + 1 - self._eventos[0][0], 0)
+        return [(i, tipo, datos) for i, tipo, p, datos in islice(self._eventos, inicio, None)
+                if p is None or p == partida]
+
+    def esperar(self, desde, partida=None, espera=LATIDO):
+        """
+        Devuelve (eventos, ultimo): los eventos de la partida posteriores a 'desde'
+        y el id hasta el que se revisó. Si no hay ninguno espera hasta 'espera'
+        segundos a que se publique alguno (lista vacía si no llega).
+        """
+        limite = time.monotonic() + espera
+        with self._condicion:
+            while True:
+                eventos = self._posteriores(desde, partida)
+                desde = max(desde, self._ultimo)  # Los eventos de otras partidas también quedan revisados
+                restante = limite - time.monotonic()
+                if eventos or restante <= 0:
+                    return eventos, desde
+                self._condicion.wait(restante)
+
+    async def esperar_async(self, desde, partida=None, espera=LATIDO):
+        """Como esperar(), pero suspende la corrutina en lugar de bloquear el hilo."""
+        bucle = asyncio.get_running_loop()
+        limite = bucle.time() + espera
+        while True:
+            espera_actual = (bucle, asyncio.Event())
+            with self._condicion:
+                eventos = self._posteriores(desde, partida)
+                desde = max(desde, self._ultimo)
+                if eventos:
+                    return eventos, desde
+                self._esperas.add(espera_actual)  # Registrada antes de soltar el bloqueo: no se pierde ningún aviso
+            try:
+                await asyncio.wait_for(espera_actual[1].wait(), limite - bucle.time())
+            except asyncio.TimeoutError:
+                return [], desde
+            finally:
+                with self._condicion:
+                    self._esperas.discard(espera_actual)
+
+    def suscribir(self, partida, desde, espera=LATIDO, duracion=DURACION_CONEXION):
+        """
+        Generador de texto SSE con los eventos de la partida posteriores a
+        'desde'; termina tras 'duracion' segundos (el cliente se reconecta).
+        """
+        yield "retry: 3000\n\n"  # Milisegundos que espera EventSource antes de reconectar
+        limite = time.monotonic() + duracion
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return
+            eventos, desde = self.esperar(desde, partida, min(espera, restante))
+            if not eventos:
+                yield ": latido\n\n"
+            for identificador, tipo, datos in eventos:
+                yield formatear(identificador, tipo, datos)
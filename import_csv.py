@@ -1,75 +1,251 @@
-# Importa el módulo sqlite3 para manejar la base de datos SQLite
-import sqlite3
-# Importa el módulo json para trabajar con archivos JSON
-import json
-
-# Ruta del archivo de base de datos SQLite
-DB_PATH = 'tres_raya.db'
-# Ruta del archivo JSON que contiene las jugadas a importar
+"""
+import_csv.py - Importación masiva de jugadas a tres_raya.db
+
+Importa dataset1.csv y el registro de jugadas de la aplicación
+(jugadas.jsonl o el antiguo jugadas.json) a la tabla 'jugadas':
+
+    - lee cada archivo como un flujo de registros (lectura_flujo), con memoria
+      constante sea cual sea su tamaño
+    - inserta por lotes con executemany dentro de una transacción por lote
+    - guarda en la tabla 'importaciones' hasta dónde se leyó cada archivo,
+      en la misma transacción que el lote: una importación interrumpida
+      continúa donde se quedó y un registro que solo crece (jugadas.jsonl)
+      importa únicamente lo nuevo. En los CSV y JSON es el byte; en el
+      registro de la aplicación (registro_jsonl, con su índice .idx) es el
+      número de registros, que no cambia al compactarlo aunque las líneas
+      cambien de longitud
+    - al terminar copia las jugadas nuevas a las tablas normalizadas (migrar_esquema)
+    - evita duplicados con un índice UNIQUE (id_match, board, move, player) e
+      INSERT OR IGNORE, en lugar de un SELECT por fila
+    - usa el modo WAL y muestra el progreso y la velocidad de importación
+
+Las jugadas guardadas por la aplicación (claves jugador, movimiento, tablero,
+...) se convierten al formato de columnas del dataset.
+
+USO:
+    $ python import_csv.py [archivos ...] [--db tres_raya.db] [--lote 5000] [--desde-cero]
+    Sin archivos importa dataset1.csv y el registro de jugadas.
+    --desde-cero ignora el punto de control y relee los archivos completos.
+"""
+
+import argparse  # Importa argparse para las opciones de línea de comandos
+import os  # Importa os para comprobar qué formato de registro de jugadas existe
+import time  # Importa time para medir la velocidad de importación
+from itertools import islice  # Importa islice para partir el flujo de filas en lotes
+
+from codificacion_tablero import celdas_dataset_desde_codigo, codificar_tablero
+from db_handler import DB_PATH, conexion, create_tables  # Pool de conexiones compartido con app.py
+from lectura_flujo import registros_archivo  # Lectores en flujo de CSV, JSON y JSON Lines
+from migrar_esquema import migrar  # Copia las jugadas nuevas al esquema normalizado
+from registro_jsonl import RegistroJSONL  # Registro de jugadas de la aplicación, leído por índice
+
+# Dataset original de partidas
+CSV_PATH = 'dataset1.csv'
+# Ruta del archivo JSON que contiene las jugadas a importar (formato anterior)
 JSON_PATH = 'jugadas.json'
+# Registro JSON Lines que sustituye a jugadas.json; tiene prioridad si existe
+JSONL_PATH = 'jugadas.jsonl'
+# Filas por lote de executemany (y por transacción)
+TAMANO_LOTE = 5000
+
+# Columnas de la tabla 'jugadas', en el orden de cada fila a insertar
+COLUMNAS = ("id_match", "board", "move", "win", "player", "model", "reason", "timestamp", "valid", "execution_time")
+SQL_INSERTAR = f'''
+    INSERT OR IGNORE INTO jugadas ({", ".join(COLUMNAS)})
+    VALUES ({", ".join("?" for _ in COLUMNAS)})
+'''
+SQL_PUNTO_CONTROL = '''
+    INSERT OR REPLACE INTO importaciones (ruta, posicion, filas, actualizado)
+    VALUES (?, ?, ?, datetime('now'))
+'''
+
+
+def preparar_base(conn):
+    """Amplía la caché, crea la tabla si falta y el índice UNIQUE que evita duplicados (WAL lo activa db_handler)."""
+    conn.execute('PRAGMA cache_size=-65536')  # 64 MB de caché: el índice UNIQUE cabe en memoria al importar
+    create_tables(conn)
+    # Punto de control de cada archivo: byte hasta el que ya se importó
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS importaciones (
+            ruta TEXT PRIMARY KEY,
+            posicion INTEGER NOT NULL,
+            filas INTEGER NOT NULL,
+            actualizado TEXT
+        )
+    ''')
+    # Si ya hay duplicados (importaciones anteriores) se conserva la primera copia de cada jugada.
+    # Las filas con alguna clave NULL nunca chocan en un índice UNIQUE, así que no se tocan.
+    with conn:
+        # Filas vacías que dejaba el importador anterior al leer jugadas con las claves de la aplicación
+        vacias = conn.execute('''
+            DELETE FROM jugadas
+            WHERE id_match IS NULL AND board IS NULL AND move IS NULL AND player IS NULL AND reason IS NULL
+        ''').rowcount
+        borradas = conn.execute('''
+            DELETE FROM jugadas
+            WHERE id_match IS NOT NULL AND board IS NOT NULL AND move IS NOT NULL AND player IS NOT NULL
+              AND id NOT IN (SELECT MIN(id) FROM jugadas GROUP BY id_match, board, move, player)
+        ''').rowcount
+        conn.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_jugadas_unica
+            ON jugadas(id_match, board, move, player)
+        ''')
+    if vacias or borradas:
+        print(f'Se eliminaron {vacias} filas vacías y {borradas} jugadas duplicadas de importaciones anteriores.')
+
+
+def _entero(valor, defecto):
+    """Convierte a entero, con valor por defecto si falta o no es numérico."""
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return defecto
+
+
+def _real(valor, defecto=0.0):
+    """Convierte a número real, con valor por defecto si falta o no es numérico."""
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return defecto
+
+
+def fila_desde_dataset(row):
+    """Convierte una fila con las columnas del dataset en la tupla a insertar."""
+    return (
+        row.get('id_match'),
+        row.get('board'),
+        row.get('move'),
+        _entero(row.get('win'), 0),  # Se convierte a entero, por defecto 0 si no existe
+        row.get('player'),
+        row.get('model'),
+        row.get('reason'),
+        row.get('timestamp'),
+        _entero(row.get('valid'), 1),  # Se convierte a entero, por defecto 1 (válido)
+        _real(row.get('execution_time')),  # Se convierte a float, por defecto 0.0
+    )
+
+
+def fila_desde_jugada(jugada):
+    """Convierte una jugada guardada por la aplicación (jugador, movimiento, tablero...) en la tupla a insertar."""
+    if 'id_match' in jugada or 'board' in jugada:
+        return fila_desde_dataset(jugada)  # Ya tiene las columnas del dataset
+    jugador = jugada.get('jugador')
+    ganador = jugada.get('ganador')
+    try:
+        # Mismo formato de texto que la columna 'board' del dataset, con el jugador que mueve después
+        siguiente = jugador if ganador else {"x": "o", "o": "x"}.get(jugador, jugador)
+        board = str(celdas_dataset_desde_codigo(codificar_tablero(jugada['tablero'])) + [['control', siguiente]])
+    except (KeyError, TypeError, ValueError):
+        board = None
+    movimiento = jugada.get('movimiento')
+    razon = jugada.get('razon')
+    return (
+        str(jugada.get('partida', jugada.get('match_id'))),
+        board,
+        str(movimiento) if movimiento is not None else None,
+        int(bool(ganador) and ganador == jugador),  # 1 si el jugador ganó con esta jugada
+        jugador,
+        jugada.get('modelo'),
+        razon,
+        jugada.get('timestamp', jugada.get('fecha_evaluacion')),
+        0 if isinstance(razon, str) and razon.startswith('Movimiento inválido') else 1,
+        _real(jugada.get('execution_time')),
+    )
+
+
+def fila_desde_registro(ruta, registro):
+    """Convierte un registro leído del archivo en la tupla a insertar según su formato."""
+    return fila_desde_dataset(registro) if ruta.endswith('.csv') else fila_desde_jugada(registro)
+
+
+def es_registro_aplicacion(ruta):
+    """True si el archivo es un registro de registro_jsonl (JSON Lines con índice .idx)."""
+    return ruta.endswith('.jsonl') and os.path.exists(ruta + '.idx')
+
+
+def clave_punto_control(ruta):
+    # El punto de control de un registro cuenta registros, no bytes: se guarda con otra clave para
+    # que uno antiguo en bytes no se interprete como número de registros
+    clave = os.path.abspath(ruta)
+    return clave + '#registros' if es_registro_aplicacion(ruta) else clave
+
+
+def punto_control(conn, ruta, total):
+    """Devuelve (posicion, filas) desde donde continuar la importación de un archivo de tamaño 'total'."""
+    fila = conn.execute('SELECT posicion, filas FROM importaciones WHERE ruta = ?',
+                        (clave_punto_control(ruta),)).fetchone()
+    if fila is None or fila[0] > total:
+        return 0, 0  # Nunca importado, o el archivo se reemplazó por otro más corto
+    return fila
+
+
+def registros_desde(ruta, posicion):
+    """
+    Genera (posicion siguiente, registro) desde 'posicion': en el registro de
+    la aplicación la posición es un número de registros (con las evaluaciones
+    de su archivo de cambios aplicadas); en los demás archivos, un byte.
+    """
+    if es_registro_aplicacion(ruta):
+        return ((indice + 1, registro) for indice, registro in RegistroJSONL(ruta).enumerar(posicion))
+    return registros_archivo(ruta, posicion)
+
+
+def importar_archivo(conn, ruta, tamano_lote=TAMANO_LOTE, desde_cero=False):
+    """Importa un archivo por lotes desde su punto de control; devuelve (leídas, nuevas)."""
+    clave = clave_punto_control(ruta)
+    por_registros = es_registro_aplicacion(ruta)
+    total = len(RegistroJSONL(ruta)) if por_registros else os.path.getsize(ruta)
+    posicion, filas_previas = (0, 0) if desde_cero else punto_control(conn, ruta, total)
+    if posicion:
+        unidad = 'el registro' if por_registros else 'el byte'
+        print(f'{ruta}: se continúa desde {unidad} {posicion:,} ({filas_previas:,} filas ya importadas).')
+    registros = registros_desde(ruta, posicion)
+    leidas = nuevas = 0
+    inicio = time.perf_counter()
+    while True:
+        lote = list(islice(registros, tamano_lote))
+        if not lote:
+            break
+        antes = conn.total_changes
+        with conn:  # Una transacción por lote, junto con su punto de control
+            conn.executemany(SQL_INSERTAR, (fila_desde_registro(ruta, r) for _, r in lote))
+            nuevas += conn.total_changes - antes  # Las filas ignoradas por duplicadas no cuentan como cambios
+            leidas += len(lote)
+            conn.execute(SQL_PUNTO_CONTROL, (clave, lote[-1][0], filas_previas + leidas))
+        segundos = time.perf_counter() - inicio
+        print(f'\r{ruta}: {leidas:,} filas leídas ({leidas / max(segundos, 1e-9):,.0f} filas/s)', end='', flush=True)
+    if leidas:
+        print()
+    return leidas, nuevas
+
 
-# Función para verificar si una jugada ya existe en la base de datos, evitando duplicados
-def jugada_ya_existe(cursor, id_match, board, move, player):
-    # Ejecuta una consulta que busca una jugada específica con los parámetros dados
-    cursor.execute("""
-        SELECT 1 FROM jugadas
-        WHERE id_match = ? AND board = ? AND move = ? AND player = ?
-        LIMIT 1
-    """, (id_match, board, move, player))
-    # Retorna True si se encuentra una coincidencia, False en caso contrario
-    return cursor.fetchone() is not None
-
-# Función principal para importar jugadas desde un archivo JSON a la base de datos
-def importar_jugadas():
-    # Establece una conexión con la base de datos utilizando un contexto de manejo seguro
-    with sqlite3.connect(DB_PATH) as conn:
-        # Crea un cursor para ejecutar comandos SQL
-        c = conn.cursor()
-
-        # Abre el archivo JSON que contiene las jugadas
-        with open(JSON_PATH, 'r', encoding='utf-8') as f:
-            # Carga el contenido del archivo JSON en una lista de diccionarios
-            jugadas = json.load(f)
-
-        # Inicializa contadores para jugadas nuevas y duplicadas
-        nuevos = 0
-        duplicados = 0
-
-        # Itera sobre cada jugada en el archivo JSON
-        for row in jugadas:
-            # Extrae los datos de cada jugada del diccionario
-            id_match = row.get('id_match')
-            board = row.get('board')
-            move = row.get('move')
-            win = int(row.get('win', 0))  # Se convierte a entero, por defecto 0 si no existe
-            player = row.get('player')
-            model = row.get('model')
-            reason = row.get('reason')
-            timestamp = row.get('timestamp')
-            valid = int(row.get('valid', 1))  # Se convierte a entero, por defecto 1 (válido)
-            exec_time = float(row.get('execution_time', 0.0))  # Se convierte a float, por defecto 0.0
-
-            # Verifica si la jugada ya existe en la base de datos
-            if jugada_ya_existe(c, id_match, board, move, player):
-                # Incrementa el contador de duplicados y salta a la siguiente jugada
-                duplicados += 1
+# Función principal para importar jugadas a la base de datos
+def importar_jugadas(rutas=None, db_path=DB_PATH, tamano_lote=TAMANO_LOTE, desde_cero=False):
+    if rutas is None:
+        rutas = [CSV_PATH, JSONL_PATH if os.path.exists(JSONL_PATH) else JSON_PATH]
+    # Toma una conexión del pool de db_handler (la misma configuración que usa la aplicación)
+    with conexion(db_path) as conn:
+        preparar_base(conn)
+        for ruta in rutas:
+            if not os.path.exists(ruta):
+                print(f'{ruta}: no existe, se omite.')
                 continue
+            inicio = time.perf_counter()
+            leidas, nuevas = importar_archivo(conn, ruta, tamano_lote, desde_cero)
+            segundos = time.perf_counter() - inicio
+            # Muestra un resumen de la importación en consola
+            print(f'Importación de {ruta} completada: {nuevas} nuevas, {leidas - nuevas} duplicadas '
+                  f'en {segundos:.2f} s ({leidas / max(segundos, 1e-9):,.0f} filas/s).')
+        print(f'{migrar(conn, tamano_lote)} jugadas copiadas al esquema normalizado (migrar_esquema).')
 
-            # Inserta la nueva jugada en la tabla 'jugadas'
-            c.execute('''
-                INSERT INTO jugadas (id_match, board, move, win, player, model, reason, timestamp, valid, execution_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                id_match, board, move, win, player, model, reason, timestamp, valid, exec_time
-            ))
-            # Incrementa el contador de nuevas jugadas
-            nuevos += 1
-
-        # Guarda los cambios realizados en la base de datos
-        conn.commit()
-        # Muestra un resumen de la importación en consola
-        print(f'Importación completada: {nuevos} nuevas, {duplicados} duplicadas.')
 
 # Punto de entrada del programa: ejecuta la función de importación si se ejecuta este archivo directamente
 if __name__ == "__main__":
-    importar_jugadas()
+    parser = argparse.ArgumentParser(description="Importa jugadas de CSV/JSON/JSONL a la base de datos.")
+    parser.add_argument("rutas", nargs="*", help="Archivos a importar (por defecto dataset1.csv y el registro de jugadas)")
+    parser.add_argument("--db", default=DB_PATH, help="Ruta de la base de datos SQLite")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="Filas por lote de executemany")
+    parser.add_argument("--desde-cero", action="store_true", help="Ignora los puntos de control y relee los archivos")
+    args = parser.parse_args()
+    importar_jugadas(args.rutas or None, args.db, args.lote, args.desde_cero)
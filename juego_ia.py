@@ -1,42 +1,149 @@
-import pandas as pd  # Importa la biblioteca pandas para manipulación y análisis de datos
 import ast  # Importa la biblioteca ast para evaluar expresiones tipo string a estructuras de datos
-import google.generativeai as genai  # Importa el módulo de la API de Google Generative AI
-from transformers import pipeline  # Importa la función pipeline de HuggingFace Transformers para tareas de NLP
-
-# Cargar dataset
-df = pd.read_csv("dataset1.csv")  # Carga el archivo CSV 'dataset1.csv' en un DataFrame
-df["board"] = df["board"].apply(ast.literal_eval)  # Convierte los strings de la columna 'board' en listas de Python
-df["move"] = df["move"].apply(ast.literal_eval)  # Convierte los strings de la columna 'move' en listas de Python
-
-indice_actual = 0  # Variable global para llevar el seguimiento del índice actual en el dataset
+import threading  # Importa threading para que la carga diferida del dataset ocurra una sola vez
+import numpy as np  # Importa NumPy para construir y consultar el índice sobre las columnas de la caché
+import cache_dataset  # Caché binaria del dataset, mapeada en memoria y compartida entre procesos
+from codificacion_tablero import codificar_tablero  # Codificación compacta de tableros
+from resultado_tablero import ganador_codigo  # Tabla precalculada de ganador/empate por código de tablero
+from motor_minimax import mejor_jugada  # Motor de juego perfecto usado cuando el dataset no tiene jugada
+
+# El dataset se abre en el primer uso y no al importar el módulo, para arrancar rápido
+RUTA_DATASET = "dataset1.csv"  # Archivo CSV con las jugadas de los modelos
+dataset = None  # Caché compilada del dataset (cache_dataset.DatasetCompilado); se llena en cargar_dataset()
+partidas = None  # Jugadas del dataset agrupadas por id_match (construir_partidas); se llena junto con dataset
+_bloqueo_carga = threading.Lock()  # Evita que dos peticiones simultáneas carguen el dataset a la vez
+_movimientos = {}  # Caché de movimientos ya convertidos desde texto
+
+def cargar_dataset():
+    """Abre la caché del dataset (compilándola si hace falta) y agrupa sus partidas la primera vez."""
+    global dataset, partidas
+    if dataset is None:
+        with _bloqueo_carga:
+            if dataset is None:
+                datos = cache_dataset.cargar(RUTA_DATASET)  # Columnas mapeadas en memoria, sin parsear el CSV
+                partidas = construir_partidas(datos)
+                dataset = datos
+    return dataset
+
+def leer_movimiento(texto):
+    """Convierte el texto de la columna 'move' en lista de Python, una sola vez por texto distinto."""
+    movimiento = _movimientos.get(texto)
+    if movimiento is None:
+        movimiento = _movimientos[texto] = ast.literal_eval(texto)
+    return list(movimiento)  # Copia para que quien la reciba pueda modificarla
+
+# Cursor por defecto (compatibilidad con una sola partida por proceso); cada sesión lleva el suyo
+partida_actual = 0  # Número de partida del dataset (orden de construir_partidas)
+paso_actual = 0  # Filas de esa partida ya consumidas
 
 def buscar_jugada(tablero_actual, jugador):
-    global indice_actual  # Se indica que se usará la variable global 'indice_actual'
-
-    while indice_actual < len(df):  # Itera mientras queden filas por procesar en el dataset
-        row = df.iloc[indice_actual]  # Obtiene la fila actual del DataFrame
-        indice_actual += 1  # Incrementa el índice para pasar a la siguiente fila en la próxima iteración
-
-        if row["player"] != jugador:
-            continue  # Si el jugador de la fila no coincide con el actual, se omite esta fila
-
-        movimiento = row["move"]  # Extrae el movimiento de la fila actual
-
-        # Validar movimiento con try-except
-        try:
-            tablero_con_jugada = convertir_dataset_a_tablero(row["board"])  # Convierte los datos de 'board' a matriz
-            tablero_sin_jugada = remover_jugada(tablero_con_jugada, movimiento, jugador)  # Elimina la jugada del tablero
-        except Exception as e:
-            print(f"⚠️ Error al procesar jugada en índice {indice_actual - 1}: {e}")  # Imprime un error si ocurre
-            continue  # Salta a la siguiente fila del dataset si ocurre una excepción
-
-        if tablero_sin_jugada == tablero_actual:
-            if row["valid"] != 1:
-                return movimiento, "Movimiento inválido por IA detectado", row["model"]  # Retorna jugada inválida
-            return movimiento, row["reason"], row["model"]  # Retorna jugada válida con su razón y modelo usado
-
-    # Si no se encuentra una jugada válida en el dataset
-    return ["mark", 2, 2], "No se encontró una jugada válida restante en el dataset", "modelo_desconocido"
+    """Busca la jugada con el cursor global del módulo (una sola partida por proceso)."""
+    global paso_actual  # Se indica que se usará la variable global 'paso_actual'
+    movimiento, razon, modelo, paso_actual = buscar_jugada_en_partida(tablero_actual, jugador, partida_actual, paso_actual)
+    return movimiento, razon, modelo
+
+def total_partidas():
+    """Número de partidas (id_match distintos) del dataset."""
+    cargar_dataset()
+    return len(partidas["ids"])
+
+def buscar_jugada_en_partida(tablero_actual, jugador, partida, paso):
+    """
+    Busca la jugada para 'tablero_actual' en la partida número 'partida' del dataset,
+    a partir de su fila 'paso'. Solo se recorren filas de esa partida: una fila que no
+    coincide nunca consume filas de la siguiente. Devuelve (movimiento, razon, modelo,
+    nuevo_paso) sin modificar ningún estado global.
+    """
+    cargar_dataset()  # Carga el dataset y las partidas si aún no están en memoria
+    inicios = partidas["inicios"]
+    if 0 <= partida < len(partidas["ids"]):
+        inicio, fin = inicios[partida], inicios[partida + 1]  # Rango de la partida dentro de la secuencia
+    else:
+        inicio = fin = 0  # Partida inexistente: no hay filas
+    try:
+        codigo = codificar_tablero(tablero_actual)
+    except ValueError:
+        codigo = -1  # Un tablero con valores desconocidos no puede coincidir con ninguna fila
+    id_jugador = partidas["id_jugador"].get(jugador, -1)
+
+    # Normalmente coincide la fila siguiente (O(1)); si no, se saltan filas solo dentro de la partida
+    previos, jugadores = partidas["previos"], partidas["jugadores"]
+    k = inicio + paso
+    while k < fin and not (previos[k] == codigo and jugadores[k] == id_jugador):
+        k += 1
+
+    if k < fin:
+        row = dataset.fila(partidas["posiciones"][k])  # Un único acceso a la fila encontrada
+        movimiento = leer_movimiento(row["move"])  # Extrae el movimiento de la fila encontrada
+        paso = k - inicio + 1  # Avanza el cursor de la partida
+        if row["valid"] != 1:
+            return movimiento, "Movimiento inválido por IA detectado", row["model"], paso  # Retorna jugada inválida
+        return movimiento, row["reason"], row["model"], paso  # Retorna jugada válida con su razón y modelo usado
+
+    paso = fin - inicio  # Sin coincidencias: la partida del dataset queda agotada
+
+    # Si no se encuentra una jugada en el dataset, juega el motor minimax con juego perfecto
+    try:
+        jugada_optima = mejor_jugada(tablero_actual, jugador)
+    except (KeyError, ValueError):
+        jugada_optima = None  # Tablero o jugador con valores desconocidos
+    if jugada_optima is not None:
+        return jugada_optima, "Jugada óptima calculada por el motor minimax (sin jugadas restantes en el dataset)", "motor_minimax", paso
+
+    # Si ni el dataset ni el motor tienen jugada (partida terminada)
+    return ["mark", 2, 2], "No se encontró una jugada válida restante en el dataset", "modelo_desconocido", paso
+
+def matches():
+    """Recorre las partidas del dataset en orden: genera (id_match, filas ordenadas por timestamp)."""
+    cargar_dataset()
+    inicios, posiciones = partidas["inicios"], partidas["posiciones"]
+    for numero, id_match in enumerate(partidas["ids"]):
+        yield id_match, [dataset.fila(p) for p in posiciones[inicios[numero]:inicios[numero + 1]]]
+
+def jugar_turno(estado):
+    """
+    Juega el turno siguiente sobre el estado de una partida (claves tablero, turno_actual,
+    turno_numero, partida_dataset y paso, como en sesiones_juego) y lo actualiza. Devuelve la jugada
+    (mismo formato que /jugar_turno) o un diccionario con "error" si el modelo propuso
+    un movimiento ilegal; en ese caso el tablero no cambia.
+    """
+    tablero = estado["tablero"]
+    turno_actual = estado["turno_actual"]
+
+    # Obtiene jugada de IA y razón, avanzando el cursor (partida del dataset, paso) propio de la partida
+    movimiento, razon, modelo, estado["paso"] = buscar_jugada_en_partida(
+        tablero, turno_actual, estado["partida_dataset"], estado["paso"])
+
+    try:
+        fila = int(movimiento[1]) - 1  # Convierte coordenada fila a índice 0-based
+        col = int(movimiento[2]) - 1  # Convierte coordenada columna a índice 0-based
+    except (IndexError, ValueError):
+        return {"error": "Movimiento inválido.", "tablero": tablero}  # Formato de movimiento inválido
+
+    if not (0 <= fila < 3 and 0 <= col < 3):
+        return {"error": "Coordenadas fuera de rango.", "tablero": tablero}  # Fuera del tablero
+
+    if tablero[fila][col] != "b":  # La celda ya está ocupada
+        return {
+            "error": f"Jugada ilegal detectada por el modelo ({turno_actual}). Movimiento: {movimiento}",
+            "tablero": tablero
+        }
+
+    tablero[fila][col] = turno_actual  # Coloca la marca del jugador actual
+    ganador = revisar_ganador(tablero)  # Comprueba si hay ganador tras movimiento
+    jugada = {
+        "jugador": turno_actual,
+        "movimiento": movimiento,
+        "razon": razon,
+        "modelo": modelo,
+        "ganador": ganador,
+        "tablero": [row[:] for row in tablero],  # Copia profunda del tablero actual
+        "evaluada": False,
+        "match_id": estado["turno_numero"]
+    }
+    estado["turno_numero"] += 1  # Incrementa contador de turno
+    if not ganador:
+        estado["turno_actual"] = "o" if turno_actual == "x" else "x"  # Cambia turno entre "x" y "o"
+    return jugada
 
 def remover_jugada(tablero, movimiento, jugador):
     """Elimina del tablero una jugada dada, para comparar con el tablero antes de que el jugador actuara."""
@@ -55,27 +162,50 @@ def convertir_dataset_a_tablero(lista_celdas):
             tablero[f][c] = val  # Asigna el valor a la posición correspondiente en el tablero
     return tablero  # Devuelve el tablero construido a partir del dataset
 
+def construir_partidas(datos):
+    """
+    Agrupa las filas del dataset por id_match: partidas en el orden en que aparecen en
+    el CSV y, dentro de cada una, filas ordenadas por timestamp (a igualdad, por orden
+    del CSV). La secuencia de la partida n ocupa posiciones[inicios[n]:inicios[n + 1]].
+    """
+    partida = np.asarray(datos.partida, dtype=np.int64)
+    posiciones = np.arange(len(partida))
+    primera = np.full(len(datos.partidas), len(partida), dtype=np.int64)
+    np.minimum.at(primera, partida, posiciones)  # Primera fila de cada id_match
+    orden_partida = np.argsort(np.argsort(primera, kind="stable"))  # id interno -> número de partida
+    numero = orden_partida[partida]
+    orden = np.lexsort((posiciones, np.asarray(datos.timestamp), numero))  # Partida, timestamp y fila del CSV
+    inicios = np.searchsorted(numero[orden], np.arange(len(datos.partidas) + 1))
+    presentes = np.flatnonzero(primera < len(partida))  # id internos con al menos una fila
+    ids = [datos.partidas[i] for i in presentes[np.argsort(primera[presentes], kind="stable")].tolist()]
+    previos = np.asarray(datos.codigo_previo, dtype=np.int64)[orden]
+    errores = int((previos < 0).sum())  # Filas que nunca podrán coincidir
+    if errores:
+        print(f"⚠️ {errores} jugadas del dataset no se pudieron procesar y nunca se elegirán")  # Resumen único
+    return {
+        "ids": ids,  # id_match de cada partida, en orden
+        "inicios": inicios[:len(ids) + 1].tolist(),  # Inicio de cada partida dentro de la secuencia
+        "posiciones": orden.tolist(),  # Filas del dataset en el orden de la secuencia
+        "previos": previos.tolist(),  # Tablero antes de cada jugada (-1 si la fila no se pudo procesar)
+        "jugadores": np.asarray(datos.jugador, dtype=np.int64)[orden].tolist(),  # Id del jugador de cada fila
+        "id_jugador": {texto: i for i, texto in enumerate(datos.jugadores)},  # "x"/"o" -> id del jugador
+    }
+
 def reiniciar_indice():
-    global indice_actual  # Se refiere a la variable global
-    indice_actual = 0  # Reinicia el índice global a 0
+    global partida_actual, paso_actual  # Se refiere a las variables globales
+    partida_actual, paso_actual = 0, 0  # Vuelve al principio de la primera partida
+
+def siguiente_partida_dataset():
+    global partida_actual, paso_actual
+    partida_actual, paso_actual = partida_actual + 1, 0  # Pasa a la siguiente partida en O(1)
 
 def inicializar_tablero():
     return [["b" for _ in range(3)] for _ in range(3)]  # Devuelve un nuevo tablero vacío de 3x3
 
 def revisar_ganador(tablero):
-    lineas = []  # Lista para almacenar todas las combinaciones posibles de victoria
-    lineas.extend(tablero)  # Agrega todas las filas al conjunto de líneas
-    for c in range(3):
-        lineas.append([tablero[f][c] for f in range(3)])  # Agrega columnas al conjunto de líneas
-    lineas.append([tablero[i][i] for i in range(3)])  # Agrega la diagonal principal
-    lineas.append([tablero[i][2 - i] for i in range(3)])  # Agrega la diagonal secundaria
-    for linea in lineas:
-        if linea[0] != "b" and linea[0] == linea[1] == linea[2]:  # Verifica si hay tres iguales y no vacías
-            return linea[0]  # Retorna el jugador ganador
-    lleno = all(tablero[f][c] != "b" for f in range(3) for c in range(3))  # Verifica si el tablero está lleno
-    if lleno:
-        return "empate"  # Retorna empate si no hay ganador y el tablero está lleno
-    return None  # Retorna None si no hay ganador ni empate
+    # Acepta tanto la matriz 3x3 como su código compacto; el resultado sale de la tabla precalculada
+    codigo = tablero if isinstance(tablero, int) else codificar_tablero(tablero)
+    return ganador_codigo(codigo)  # Retorna "x", "o", "empate" o None si la partida sigue
 
 def obtener_ultima_jugada():
     # Simula un ejemplo, luego lo conectas con tu lógica real
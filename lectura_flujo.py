@@ -0,0 +1,128 @@
+"""
+lectura_flujo.py - Lectura en flujo de archivos CSV, JSON y JSON Lines
+
+Lectores que recorren un archivo de cualquier tamaño con memoria constante:
+nunca cargan el archivo completo (ni json.load ni pd.read_csv). Cada lector
+es un generador de (posicion, registro), donde 'posicion' es el byte del
+archivo en el que termina ese registro. Guardando la última posición
+procesada, una lectura interrumpida se retoma con desde=posicion.
+
+    registros_csv         filas de un CSV como diccionarios (admite campos con saltos de línea)
+    registros_jsonl       un objeto JSON por línea
+    registros_arreglo_json  elementos de un arreglo JSON, analizados uno a uno con raw_decode
+    registros_archivo     elige el lector según la extensión
+"""
+
+import codecs  # Importa codecs para decodificar UTF-8 por bloques sin partir caracteres
+import csv  # Importa csv para interpretar las filas del CSV
+import json  # Importa json para decodificar cada objeto por separado
+
+TAMANO_BLOQUE = 1 << 20  # Bytes que se leen de cada vez en los arreglos JSON
+_ESPACIOS = " \t\r\n"
+_FINALES = _ESPACIOS + ",]"  # Caracteres que pueden seguir a un elemento completo del arreglo
+
+
+def _lineas_con_posicion(f, posicion):
+    """Genera las líneas de un archivo binario decodificadas y guarda en posicion[0] el byte en que termina cada una."""
+    for linea in f:
+        posicion[0] += len(linea)
+        yield linea.decode("utf-8")
+
+
+def registros_csv(ruta, desde=0):
+    """Genera (posicion, fila) de un CSV con cabecera, empezando en el byte 'desde'."""
+    with open(ruta, "rb") as f:
+        posicion = [0]
+        lector = csv.reader(_lineas_con_posicion(f, posicion))
+        cabecera = next(lector, None)
+        if cabecera is None:
+            return  # Archivo vacío
+        if desde > posicion[0]:
+            f.seek(desde)  # Retoma tras la última fila procesada; la cabecera ya se leyó
+            posicion[0] = desde
+        for campos in lector:
+            if campos:
+                # csv.reader solo pide las líneas de la fila actual, así que posicion[0] es su final
+                yield posicion[0], dict(zip(cabecera, campos))
+
+
+def registros_jsonl(ruta, desde=0):
+    """Genera (posicion, objeto) de un archivo JSON Lines, empezando en el byte 'desde'."""
+    with open(ruta, "rb") as f:
+        f.seek(desde)
+        posicion = desde
+        for linea in f:
+            if not linea.endswith(b"\n"):
+                break  # Última línea a medio escribir: se leerá cuando esté completa
+            posicion += len(linea)
+            if linea.strip():
+                yield posicion, json.loads(linea)
+
+
+def registros_arreglo_json(ruta, desde=0, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Genera (posicion, elemento) de un archivo con un arreglo JSON, sin cargarlo
+    entero: lee bloques de 'tamano_bloque' bytes y decodifica cada elemento con
+    JSONDecoder.raw_decode. 'desde' debe ser 0 o una posición devuelta antes.
+    """
+    decodificador = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    with open(ruta, "rb") as f:
+        f.seek(desde)
+        texto = ""  # Texto leído y aún no consumido a partir de 'i'
+        i = 0
+        base = desde  # Byte del archivo que corresponde a texto[i]
+        fin_archivo = False
+        dentro = desde > 0  # Al retomar ya se pasó el '[' inicial
+
+        def leer_mas():
+            nonlocal texto, i, fin_archivo
+            bloque = f.read(tamano_bloque)
+            fin_archivo = not bloque
+            texto = texto[i:] + utf8.decode(bloque, final=fin_archivo)  # Solo se copia al leer un bloque nuevo
+            i = 0
+
+        while True:
+            # Salta espacios y separadores hasta el siguiente elemento
+            inicio = i
+            while i < len(texto) and (texto[i] in _ESPACIOS or (dentro and texto[i] == ",")):
+                i += 1
+            base += i - inicio  # Son caracteres ASCII: un byte cada uno
+            if i == len(texto):
+                if fin_archivo:
+                    if dentro:
+                        raise ValueError(f"{ruta}: el arreglo JSON no está cerrado")
+                    return  # Archivo vacío
+                leer_mas()
+                continue
+            if not dentro:
+                if texto[i] != "[":
+                    raise ValueError(f"{ruta}: se esperaba un arreglo JSON")
+                i += 1
+                base += 1
+                dentro = True
+                continue
+            if texto[i] == "]":
+                return
+            try:
+                elemento, fin = decodificador.raw_decode(texto, i)
+            except json.JSONDecodeError:
+                if fin_archivo:
+                    raise
+                leer_mas()  # El elemento continúa en el bloque siguiente
+                continue
+            if not fin_archivo and (fin == len(texto) or texto[fin] not in _FINALES):
+                leer_mas()  # Un número cortado ("2.5e" de "2.5e3") continúa en el bloque siguiente
+                continue
+            base += len(texto[i:fin].encode("utf-8"))
+            i = fin
+            yield base, elemento
+
+
+def registros_archivo(ruta, desde=0):
+    """Elige el lector según la extensión (.csv, .jsonl; cualquier otra se trata como arreglo JSON)."""
+    if ruta.endswith(".csv"):
+        return registros_csv(ruta, desde)
+    if ruta.endswith(".jsonl"):
+        return registros_jsonl(ruta, desde)
+    return registros_arreglo_json(ruta, desde)
@@ -0,0 +1,165 @@
+"""
+migrar_esquema.py - Esquema normalizado de jugadas en tres_raya.db
+
+La tabla 'jugadas' guarda el tablero, el movimiento y el modelo como
+textos (repr de listas de Python) y no tiene más índice que el id. Esta
+migración los copia a tres tablas normalizadas e indexadas:
+
+    modelos      id, nombre
+    partidas     id, id_match, inicio, movimientos, ganador
+    movimientos  id (el mismo de 'jugadas'), partida_id, turno, jugador,
+                 modelo_id, tablero (código del tablero después de la jugada,
+                 codificacion_tablero), tablero_previo (antes de la jugada,
+                 -1 si la fila no se puede procesar), celda (0-8, NULL si el
+                 movimiento está mal formado), win, valid, razon, timestamp,
+                 execution_time
+
+Los índices de filtro de 'movimientos' terminan en id, de modo que las
+jugadas de un modelo, jugador o posición se pueden paginar por id sin
+ordenar; idx_movimientos_posicion e idx_movimientos_resumen cubren las
+agregaciones de consulta_jugadas sin leer la tabla.
+
+La migración es incremental: solo copia las jugadas con id mayor que el
+último migrado, así que se puede repetir tras cada importación
+(import_csv.py la ejecuta al terminar). La tabla 'jugadas' no se modifica.
+
+USO:
+    $ python migrar_esquema.py [--db tres_raya.db] [--lote 5000]
+"""
+
+import argparse  # Importa argparse para las opciones de línea de comandos
+import time  # Importa time para medir la migración
+
+from codificacion_tablero import celda_de_movimiento, codificar_texto_dataset, quitar_jugada
+from db_handler import DB_PATH, conexion  # Pool de conexiones compartido con el resto de la aplicación
+
+TAMANO_LOTE = 5000  # Jugadas leídas y escritas por lote
+
+ESQUEMA = '''
+CREATE TABLE IF NOT EXISTS modelos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS partidas (
+    id INTEGER PRIMARY KEY,
+    id_match TEXT NOT NULL UNIQUE,
+    inicio TEXT,
+    movimientos INTEGER NOT NULL DEFAULT 0,
+    ganador TEXT
+);
+CREATE TABLE IF NOT EXISTS movimientos (
+    id INTEGER PRIMARY KEY,
+    partida_id INTEGER NOT NULL REFERENCES partidas(id),
+    turno INTEGER NOT NULL,
+    jugador TEXT,
+    modelo_id INTEGER REFERENCES modelos(id),
+    tablero INTEGER NOT NULL,
+    tablero_previo INTEGER NOT NULL,
+    celda INTEGER,
+    win INTEGER,
+    valid INTEGER,
+    razon TEXT,
+    timestamp TEXT,
+    execution_time REAL
+);
+CREATE INDEX IF NOT EXISTS idx_movimientos_partida ON movimientos(partida_id, turno);
+CREATE INDEX IF NOT EXISTS idx_movimientos_modelo ON movimientos(modelo_id, id);
+CREATE INDEX IF NOT EXISTS idx_movimientos_jugador ON movimientos(jugador, id);
+CREATE INDEX IF NOT EXISTS idx_movimientos_tablero ON movimientos(tablero, id);
+CREATE INDEX IF NOT EXISTS idx_movimientos_tablero_previo ON movimientos(tablero_previo, id);
+CREATE INDEX IF NOT EXISTS idx_movimientos_posicion ON movimientos(tablero_previo, modelo_id, celda, win);
+CREATE INDEX IF NOT EXISTS idx_movimientos_resumen ON movimientos(modelo_id, win, valid, celda, execution_time);
+'''
+
+
+def crear_esquema(conn):
+    """Crea las tablas normalizadas y sus índices si no existen."""
+    conn.executescript(ESQUEMA)
+
+
+def _movimiento_normalizado(board, move, jugador):
+    """Devuelve (tablero, tablero_previo, celda) a partir de los textos de la tabla 'jugadas'."""
+    tablero = codificar_texto_dataset(board or '')
+    try:
+        celda = celda_de_movimiento(move)
+    except (TypeError, ValueError):
+        return tablero, -1, None  # Movimiento con otro formato (['o', '2', '2'], índices 0): no se interpreta
+    fila, columna = divmod(celda, 3)
+    return tablero, quitar_jugada(tablero, ('mark', fila + 1, columna + 1), jugador), celda
+
+
+class _Identificadores:
+    """Ids de modelos y partidas ya migrados, con inserción de los nuevos."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.modelos = dict(conn.execute('SELECT nombre, id FROM modelos'))
+        self.partidas = {}  # id_match -> [id, movimientos]
+        for id_partida, id_match, total in conn.execute('SELECT id, id_match, movimientos FROM partidas'):
+            self.partidas[id_match] = [id_partida, total]
+
+    def modelo(self, nombre):
+        if nombre is None:
+            return None
+        identificador = self.modelos.get(nombre)
+        if identificador is None:
+            identificador = self.modelos[nombre] = self.conn.execute(
+                'INSERT INTO modelos (nombre) VALUES (?)', (nombre,)).lastrowid
+        return identificador
+
+    def siguiente_turno(self, id_match, timestamp):
+        """Devuelve (partida_id, turno) de la próxima jugada de la partida, creándola si es nueva."""
+        partida = self.partidas.get(id_match)
+        if partida is None:
+            partida = self.partidas[id_match] = [self.conn.execute(
+                'INSERT INTO partidas (id_match, inicio) VALUES (?, ?)', (id_match, timestamp)).lastrowid, 0]
+        partida[1] += 1
+        return partida[0], partida[1]
+
+
+def migrar(conn, tamano_lote=TAMANO_LOTE):
+    """Copia a 'movimientos' las jugadas aún no migradas. Devuelve cuántas copió."""
+    crear_esquema(conn)
+    ultimo = conn.execute('SELECT COALESCE(MAX(id), 0) FROM movimientos').fetchone()[0]
+    ids = _Identificadores(conn)
+    jugadas = conn.execute('''
+        SELECT id, id_match, board, move, win, player, model, reason, timestamp, valid, execution_time
+        FROM jugadas WHERE id > ? AND id_match IS NOT NULL ORDER BY id
+    ''', (ultimo,))
+    total = 0
+    while True:
+        lote = jugadas.fetchmany(tamano_lote)
+        if not lote:
+            break
+        filas, ganadores, tocadas = [], [], set()
+        for id_jugada, id_match, board, move, win, jugador, modelo, razon, timestamp, valid, tiempo in lote:
+            partida_id, turno = ids.siguiente_turno(id_match, timestamp)
+            tablero, previo, celda = _movimiento_normalizado(board, move, jugador)
+            filas.append((id_jugada, partida_id, turno, jugador, ids.modelo(modelo), tablero, previo, celda,
+                          win, valid, razon, timestamp, tiempo))
+            tocadas.add(id_match)
+            if win == 1:
+                ganadores.append((jugador, partida_id))
+        conn.executemany('INSERT INTO movimientos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', filas)
+        conn.executemany('UPDATE partidas SET ganador = ? WHERE id = ?', ganadores)
+        conn.executemany('UPDATE partidas SET movimientos = ? WHERE id = ?',
+                         [(ids.partidas[m][1], ids.partidas[m][0]) for m in tocadas])
+        total += len(filas)
+    conn.commit()  # Toda la migración en una transacción: o se copia completa o no se copia nada
+    return total
+
+
+def migrar_base(db_path=DB_PATH, tamano_lote=TAMANO_LOTE):
+    """Abre la base de datos, migra las jugadas pendientes y devuelve cuántas copió."""
+    with conexion(db_path) as conn:
+        return migrar(conn, tamano_lote)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra la tabla 'jugadas' al esquema normalizado e indexado.")
+    parser.add_argument("--db", default=DB_PATH, help="Ruta de la base de datos SQLite")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="Jugadas leídas por lote")
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    total = migrar_base(args.db, args.lote)
+    print(f"{total} jugadas migradas al esquema normalizado en {time.perf_counter() - inicio:.2f} s")
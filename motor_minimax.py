@@ -0,0 +1,203 @@
+"""
+motor_minimax.py - Motor de juego perfecto para Tres en Raya
+
+Resuelve todas las posiciones con un negamax memoizado cuya tabla de
+transposición se indexa por la forma canónica del tablero (mínimo código
+entre sus 8 simetrías: rotaciones y reflexiones). El resultado se guarda
+en disco (RUTA_SOLUCION) como dos arreglos de 3**9 valores, uno por cada
+jugador con el turno, de modo que los arranques siguientes solo cargan el
+archivo y cualquier consulta es una búsqueda O(1).
+
+Los valores son siempre desde el punto de vista del jugador que mueve:
+1 = gana con juego perfecto, 0 = tablas, -1 = pierde.
+
+USO:
+    $ python motor_minimax.py
+    Recalcula la solución y la guarda en disco.
+"""
+
+import os  # Importa os para comprobar y reemplazar el archivo de la solución
+from functools import lru_cache  # Memoriza la duración de cada posición con juego perfecto
+
+import numpy as np  # Importa NumPy para guardar y cargar la solución en formato .npy
+
+from codificacion_tablero import POTENCIAS, TOTAL_CODIGOS, VALORES, codificar_tablero, valor_en
+from resultado_tablero import EMPATE, EN_JUEGO, resultado_codigo
+
+RUTA_SOLUCION = "solucion_tres_raya.npy"  # Archivo donde se persiste la tabla de valores
+JUGADORES = ("x", "o")  # Orden de las filas de la tabla de valores
+OPONENTE = {"x": "o", "o": "x"}  # Jugador que mueve después de cada uno
+
+
+def _simetrias():
+    """Devuelve las 8 permutaciones de celdas del grupo de simetrías del tablero."""
+    permutaciones = []
+    for reflejar in (False, True):
+        for giros in range(4):
+            permutacion = []
+            for posicion in range(9):
+                f, c = divmod(posicion, 3)
+                if reflejar:
+                    c = 2 - c  # Reflexión horizontal
+                for _ in range(giros):
+                    f, c = c, 2 - f  # Rotación de 90 grados
+                permutacion.append(f * 3 + c)
+            permutaciones.append(tuple(permutacion))
+    return permutaciones
+
+
+SIMETRIAS = _simetrias()
+
+
+def forma_canonica(codigo):
+    """Devuelve el menor código entre las 8 simetrías del tablero."""
+    digitos = [valor_en(codigo, p) for p in range(9)]
+    return min(sum(digitos[p] * POTENCIAS[destino[p]] for p in range(9)) for destino in SIMETRIAS)
+
+
+def _valor_terminal(resultado, jugador):
+    """Valor de una posición terminal para el jugador que tendría el turno."""
+    if resultado == EMPATE:
+        return 0
+    return 1 if resultado == VALORES[jugador] else -1
+
+
+def resolver():
+    """Resuelve todas las posiciones con negamax y devuelve un arreglo int8 de forma (2, 3**9)."""
+    transposiciones = {}  # (forma canónica, jugador) -> valor para el jugador que mueve
+
+    def negamax(codigo, jugador):
+        # Las posiciones terminales se resuelven con la tabla de resultados antes de consultar la
+        # tabla de transposición: en tableros inalcanzables con líneas de ambos jugadores el
+        # ganador depende del orden de las líneas y no es invariante por simetría.
+        resultado = resultado_codigo(codigo)
+        if resultado != EN_JUEGO:
+            return _valor_terminal(resultado, jugador)
+        clave = (forma_canonica(codigo), jugador)
+        if clave in transposiciones:
+            return transposiciones[clave]
+        valor = -1
+        marca = VALORES[jugador]
+        for posicion in range(9):
+            if valor_en(codigo, posicion) == 0:
+                valor = max(valor, -negamax(codigo + marca * POTENCIAS[posicion], OPONENTE[jugador]))
+                if valor == 1:
+                    break  # No se puede mejorar una victoria
+        transposiciones[clave] = valor
+        return valor
+
+    valores = np.zeros((2, TOTAL_CODIGOS), dtype=np.int8)
+    for fila, jugador in enumerate(JUGADORES):
+        for codigo in range(TOTAL_CODIGOS):
+            valores[fila, codigo] = negamax(codigo, jugador)
+    return valores
+
+
+def cargar_solucion(ruta=RUTA_SOLUCION):
+    """Carga la solución desde disco o la calcula y la guarda si falta o está dañada."""
+    if os.path.exists(ruta):
+        try:
+            valores = np.load(ruta)
+            if valores.shape == (2, TOTAL_CODIGOS):
+                return valores
+        except (OSError, ValueError):
+            pass  # Archivo dañado: se vuelve a calcular
+    valores = resolver()
+    try:
+        temporal = f"{ruta}.{os.getpid()}.tmp"  # Propio de cada proceso: varios pueden resolver a la vez al arrancar
+        with open(temporal, "wb") as f:
+            np.save(f, valores)
+        os.replace(temporal, ruta)  # Reemplazo atómico para no dejar archivos a medias
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar la solución en {ruta}: {e}")
+    return valores
+
+
+SOLUCION = cargar_solucion()  # Tabla de valores por (jugador con el turno, código)
+_VALORES = {jugador: SOLUCION[fila].tolist() for fila, jugador in enumerate(JUGADORES)}  # Listas para consultas O(1)
+
+
+def _codigo(tablero):
+    """Acepta la matriz 3x3 o el código compacto."""
+    return tablero if isinstance(tablero, int) else codificar_tablero(tablero)
+
+
+def valor_posicion(tablero, jugador):
+    """Valor (1, 0, -1) de la posición para 'jugador', que tiene el turno."""
+    return _VALORES[jugador][_codigo(tablero)]
+
+
+def valores_jugadas(tablero, jugador):
+    """
+    Devuelve {celda: valor} para cada jugada legal de 'jugador' (celdas 0..8).
+    El valor es el resultado con juego perfecto tras esa jugada, desde el
+    punto de vista de quien mueve. Si la partida ya terminó devuelve {}.
+    """
+    codigo = _codigo(tablero)
+    if resultado_codigo(codigo) != EN_JUEGO:
+        return {}
+    marca = VALORES[jugador]
+    valores_oponente = _VALORES[OPONENTE[jugador]]
+    return {
+        posicion: -valores_oponente[codigo + marca * POTENCIAS[posicion]]
+        for posicion in range(9)
+        if valor_en(codigo, posicion) == 0
+    }
+
+
+def mejores_jugadas(tablero, jugador):
+    """Lista de celdas (0..8) que conservan el mejor valor posible para 'jugador'."""
+    valores = valores_jugadas(tablero, jugador)
+    if not valores:
+        return []
+    mejor = max(valores.values())
+    return [posicion for posicion, valor in valores.items() if valor == mejor]
+
+
+def movimiento_desde_celda(posicion):
+    """Convierte una celda 0..8 en el formato de movimiento ["mark", fila, columna] (base 1)."""
+    return ["mark", posicion // 3 + 1, posicion % 3 + 1]
+
+
+@lru_cache(maxsize=None)
+def _jugadas_restantes(codigo, jugador):
+    """
+    Jugadas que faltan para terminar la partida con juego perfecto: quien va
+    a ganar termina cuanto antes y quien va a perder (o empatar) resiste todo
+    lo posible.
+    """
+    valores = valores_jugadas(codigo, jugador)
+    if not valores:
+        return 0  # La partida ya terminó
+    mejor = max(valores.values())
+    marca = VALORES[jugador]
+    duraciones = [_jugadas_restantes(codigo + marca * POTENCIAS[posicion], OPONENTE[jugador])
+                  for posicion, valor in valores.items() if valor == mejor]
+    return 1 + (min(duraciones) if mejor == 1 else max(duraciones))
+
+
+def mejor_jugada(tablero, jugador):
+    """
+    Devuelve una jugada óptima como ["mark", fila, columna], o None si no
+    quedan jugadas. Entre las de igual valor elige la victoria más rápida o
+    la derrota más lenta (ganar ya antes que bloquear y ganar después).
+    """
+    codigo = _codigo(tablero)
+    valores = valores_jugadas(codigo, jugador)
+    if not valores:
+        return None
+    mejor = max(valores.values())
+    marca = VALORES[jugador]
+
+    def duracion(posicion):
+        restantes = _jugadas_restantes(codigo + marca * POTENCIAS[posicion], OPONENTE[jugador])
+        return restantes if mejor == 1 else -restantes
+
+    return movimiento_desde_celda(min((p for p, v in valores.items() if v == mejor), key=duracion))
+
+
+if __name__ == "__main__":
+    if os.path.exists(RUTA_SOLUCION):
+        os.remove(RUTA_SOLUCION)  # Fuerza el recálculo
+    solucion = cargar_solucion()
+    print(f"Solución guardada en {RUTA_SOLUCION}: valor del tablero vacío para x = {solucion[0, 0]}")
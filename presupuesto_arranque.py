@@ -0,0 +1,70 @@
+"""
+presupuesto_arranque.py - Control del tiempo de importación en frío
+
+Importa cada módulo de PRESUPUESTOS en un intérprete nuevo, mide el tiempo
+de importación (mejor de varias repeticiones) y comprueba que ninguna
+dependencia pesada de DEPENDENCIAS_DIFERIDAS se haya cargado al importar.
+Termina con código 1 si algún módulo supera su presupuesto, de modo que
+puede ejecutarse en CI o antes de cada despliegue.
+
+USO:
+    $ python presupuesto_arranque.py
+"""
+
+import json  # Importa json para recibir las mediciones del subproceso
+import subprocess  # Importa subprocess para medir cada importación en un intérprete limpio
+import sys  # Importa sys para reutilizar el mismo intérprete y devolver el código de salida
+
+# Segundos máximos de importación en frío por módulo
+PRESUPUESTOS = {
+    "juego_ia": 0.5,
+    "app": 1.0,
+}
+
+# Módulos que solo deben cargarse en el primer uso, nunca al importar
+DEPENDENCIAS_DIFERIDAS = ("pandas", "matplotlib", "transformers", "google.generativeai")
+
+REPETICIONES = 3  # Se toma el mejor tiempo para reducir el ruido del sistema
+
+_SCRIPT = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+transcurrido = time.perf_counter() - inicio
+print(json.dumps({{"segundos": transcurrido, "cargados": [m for m in {diferidas!r} if m in sys.modules]}}))
+"""
+
+
+def medir(modulo):
+    """Devuelve (mejor tiempo en segundos, dependencias diferidas cargadas) para un módulo."""
+    mejor, cargados = None, []
+    for _ in range(REPETICIONES):
+        salida = subprocess.run(
+            [sys.executable, "-c", _SCRIPT.format(modulo=modulo, diferidas=DEPENDENCIAS_DIFERIDAS)],
+            capture_output=True, text=True, check=True,
+        )
+        medicion = json.loads(salida.stdout.strip().splitlines()[-1])
+        if mejor is None or medicion["segundos"] < mejor:
+            mejor = medicion["segundos"]
+        cargados = medicion["cargados"]
+    return mejor, cargados
+
+
+def main():
+    fallos = 0
+    for modulo, presupuesto in PRESUPUESTOS.items():
+        try:
+            segundos, cargados = medir(modulo)
+        except subprocess.CalledProcessError as e:
+            print(f"✗ {modulo}: error al importar\n{e.stderr}")
+            fallos += 1
+            continue
+        correcto = segundos <= presupuesto and not cargados
+        fallos += not correcto
+        detalle = f" (cargó {', '.join(cargados)})" if cargados else ""
+        print(f"{'✓' if correcto else '✗'} {modulo}: {segundos * 1000:.0f} ms de {presupuesto * 1000:.0f} ms{detalle}")
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+prueba_carga.py - Prueba de carga HTTP para comparar el modo síncrono y el ASGI
+
+Lanza 'conexiones' clientes concurrentes (HTTP/1.1 con keep-alive) que
+repiten una petición hasta completar 'peticiones' y muestra peticiones por
+segundo y latencias (p50, p95, p99). Con --suscriptores mantiene además
+abiertas esas conexiones a /eventos durante la prueba, como páginas del
+juego abiertas en otras pestañas. Solo usa la biblioteca estándar.
+
+USO:
+    $ gunicorn app:app -w 1 --threads 8 -b 127.0.0.1:8000              # modo síncrono
+    $ uvicorn asgi:aplicacion --port 8001                              # modo ASGI
+    $ python prueba_carga.py http://127.0.0.1:8000/estado --suscriptores 50
+    $ python prueba_carga.py http://127.0.0.1:8001/estado --suscriptores 50
+    $ python prueba_carga.py http://127.0.0.1:8001/jugar_turno --metodo POST --conexiones 100
+    $ python prueba_carga.py "http://127.0.0.1:8001/evaluaciones_historial?limite=1" --conexiones 40
+
+La última carga una respuesta que Flask envía por partes (stream_template):
+con muchas a la vez, cada trozo se genera en un hilo distinto del ejecutor,
+y cualquier error o respuesta cortada cuenta en "errores".
+"""
+
+import argparse  # Importa argparse para las opciones de línea de comandos
+import asyncio  # Importa asyncio para los clientes concurrentes
+import statistics  # Importa statistics para los percentiles
+import time  # Importa time para medir latencias
+from urllib.parse import urlsplit  # Para separar servidor y ruta de la URL
+
+
+async def leer_respuesta(lector):
+    """Lee una respuesta HTTP/1.1 completa y devuelve (estado, cabeceras)."""
+    linea = await lector.readline()
+    if not linea:
+        raise ConnectionError("El servidor cerró la conexión")
+    estado = int(linea.split()[1])
+    cabeceras = {}
+    while True:
+        linea = await lector.readline()
+        if linea in (b"\r\n", b"\n", b""):
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        cabeceras[nombre.strip().lower()] = valor.strip()
+    if cabeceras.get("transfer-encoding") == "chunked":
+        while True:
+            linea = await lector.readline()
+            if not linea.strip():
+                raise ConnectionError("El servidor cortó la respuesta por partes")
+            tamano = int(linea.split(b";")[0], 16)
+            await lector.readexactly(tamano + 2)  # Trozo y su \r\n
+            if tamano == 0:
+                break
+    else:
+        await lector.readexactly(int(cabeceras.get("content-length", 0)))
+    return estado, cabeceras
+
+
+def peticion(metodo, ruta, servidor, cookie, extra=""):
+    return (f"{metodo} {ruta} HTTP/1.1\r\nHost: {servidor}\r\nCookie: {cookie}\r\n"
+            f"Content-Length: 0\r\n{extra}\r\n").encode("latin-1")
+
+
+async def obtener_cookie(host, puerto, servidor):
+    """Abre una sesión (y su partida) con una primera petición y devuelve la cookie."""
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    escritor.write(peticion("POST", "/reiniciar", servidor, ""))
+    _, cabeceras = await leer_respuesta(lector)
+    escritor.close()
+    return cabeceras.get("set-cookie", "").split(";")[0]
+
+
+async def cliente(host, puerto, servidor, metodo, ruta, cookie, pendientes, latencias, errores, espera):
+    """Repite la petición por la misma conexión mientras queden peticiones por hacer."""
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    try:
+        while pendientes[0] > 0:
+            pendientes[0] -= 1
+            inicio = time.perf_counter()
+            escritor.write(peticion(metodo, ruta, servidor, cookie))
+            estado, cabeceras = await asyncio.wait_for(leer_respuesta(lector), espera)
+            latencias.append(time.perf_counter() - inicio)
+            if estado >= 400:
+                errores[0] += 1
+            if cabeceras.get("connection", "").lower() == "close":
+                escritor.close()
+                lector, escritor = await asyncio.open_connection(host, puerto)
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, OSError):
+        errores[0] += 1  # Sin respuesta a tiempo (servidor saturado) o conexión cortada: el cliente se retira
+    finally:
+        escritor.close()
+
+
+async def suscriptor(host, puerto, servidor, cookie, conectados):
+    """Mantiene abierta una conexión a /eventos leyendo lo que llegue."""
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    escritor.write(peticion("GET", "/eventos", servidor, cookie, "Accept: text/event-stream\r\n"))
+    await lector.readline()  # Línea de estado: el servidor ya atiende la suscripción
+    conectados[0] += 1
+    try:
+        while await lector.read(4096):
+            pass
+    finally:
+        escritor.close()
+
+
+async def prueba(url, metodo, conexiones, peticiones, suscriptores, espera):
+    partes = urlsplit(url)
+    host, puerto = partes.hostname, partes.port or 80
+    servidor = partes.netloc
+    ruta = partes.path + (f"?{partes.query}" if partes.query else "")
+    cookie = await obtener_cookie(host, puerto, servidor)
+
+    conectados = [0]
+    tareas_suscriptores = [asyncio.ensure_future(suscriptor(host, puerto, servidor, cookie, conectados))
+                           for _ in range(suscriptores)]
+    await asyncio.sleep(1)  # Da tiempo a que se establezcan las suscripciones
+
+    pendientes, latencias, errores = [peticiones], [], [0]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(host, puerto, servidor, metodo, ruta, cookie, pendientes, latencias, errores, espera)
+                           for _ in range(conexiones)))
+    duracion = time.perf_counter() - inicio
+
+    for tarea in tareas_suscriptores:
+        tarea.cancel()
+    await asyncio.gather(*tareas_suscriptores, return_exceptions=True)
+
+    print(f"{metodo} {url}: {len(latencias)} respuestas en {duracion:.2f} s con {conexiones} conexiones "
+          f"y {conectados[0]}/{suscriptores} suscriptores a /eventos")
+    print(f"  {len(latencias) / duracion:.0f} peticiones/s, errores: {errores[0]}")
+    if latencias:
+        cortes = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else latencias * 99
+        print(f"  latencia p50 {cortes[49] * 1000:.1f} ms, p95 {cortes[94] * 1000:.1f} ms, "
+              f"p99 {cortes[98] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP (modo síncrono frente a ASGI).")
+    parser.add_argument("url", help="URL a cargar, p. ej. http://127.0.0.1:8000/estado")
+    parser.add_argument("--metodo", default="GET", help="Método HTTP")
+    parser.add_argument("--conexiones", type=int, default=50, help="Clientes concurrentes")
+    parser.add_argument("--peticiones", type=int, default=2000, help="Peticiones en total")
+    parser.add_argument("--suscriptores", type=int, default=0, help="Conexiones a /eventos abiertas durante la prueba")
+    parser.add_argument("--espera", type=float, default=10, help="Segundos máximos por respuesta")
+    args = parser.parse_args()
+    asyncio.run(prueba(args.url, args.metodo.upper(), args.conexiones, args.peticiones, args.suscriptores, args.espera))
@@ -0,0 +1,222 @@
+"""
+puntuar_optimalidad.py - Puntuación por lotes de jugadas contra el juego perfecto
+
+Recorre todas las filas de dataset1.csv y de la tabla 'jugadas' de
+tres_raya.db y, para cada jugada, compara su valor teórico con el de la
+mejor jugada posible según motor_minimax:
+
+    valor_optimo  valor de la posición antes de mover (1 gana, 0 tablas, -1 pierde)
+    valor_jugada  valor de la posición que deja la jugada, para quien movió
+    perdida       valor_optimo - valor_jugada (0 = jugada óptima)
+    categoria     'ganadora', 'tablas', 'perdedora' o 'invalida'
+
+Los tableros se decodifican sin ast.literal_eval y todo el cálculo de
+valores se hace con operaciones vectorizadas de NumPy sobre las tablas
+precalculadas; con muchas filas la decodificación se reparte en varios
+procesos. Los resultados se guardan en la tabla indexada
+'optimalidad_jugadas'.
+
+USO:
+    $ python puntuar_optimalidad.py [--csv dataset1.csv] [--db tres_raya.db]
+"""
+
+import argparse  # Importa argparse para las opciones de línea de comandos
+import csv  # Importa csv para leer el dataset fila por fila
+import sqlite3  # Importa sqlite3 para leer jugadas y guardar los resultados
+import time  # Importa time para medir el rendimiento
+from concurrent.futures import ProcessPoolExecutor  # Reparte la decodificación en varios procesos
+
+import numpy as np  # Importa NumPy para el cálculo vectorizado
+
+from codificacion_tablero import POTENCIAS, VALORES, celda_de_movimiento, codificar_texto_dataset
+from motor_minimax import SOLUCION
+from resultado_tablero import EMPATE, EN_JUEGO, TABLA_RESULTADOS
+
+DB_PATH = 'tres_raya.db'  # Base de datos donde están las jugadas y donde se guardan los resultados
+CSV_PATH = 'dataset1.csv'  # Dataset original de partidas
+FILAS_POR_PROCESO = 50000  # A partir de este tamaño la decodificación se reparte en procesos
+CATEGORIAS = {1: "ganadora", 0: "tablas", -1: "perdedora"}  # Nombre de cada valor de jugada
+_POTENCIAS = np.array(POTENCIAS, dtype=np.int64)
+
+
+def crear_tabla_optimalidad(conn):
+    """Crea la tabla de resultados y sus índices si aún no existen."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS optimalidad_jugadas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        origen TEXT NOT NULL,
+        referencia INTEGER NOT NULL,
+        id_match TEXT,
+        model TEXT,
+        player TEXT,
+        tablero_previo INTEGER,
+        celda INTEGER,
+        valor_optimo INTEGER,
+        valor_jugada INTEGER,
+        perdida INTEGER,
+        es_optima INTEGER,
+        categoria TEXT NOT NULL,
+        UNIQUE(origen, referencia)
+    )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_optimalidad_model ON optimalidad_jugadas(model)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_optimalidad_match ON optimalidad_jugadas(id_match)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_optimalidad_categoria ON optimalidad_jugadas(categoria)')
+
+
+def _celda_o_invalida(move):
+    """Celda 0..8 de un movimiento en texto, o -1 si no tiene el formato ['mark', fila, columna]."""
+    try:
+        return celda_de_movimiento(move or "")
+    except ValueError:
+        return -1
+
+
+def _decodificar_bloque(bloque):
+    """Convierte pares (board, move) de texto en (código del tablero tras la jugada, celda o -1)."""
+    codigos, celdas = [], []
+    boards_vistos, moves_vistos = {}, {}  # Los mismos textos se repiten mucho: se decodifican una vez
+    for board, move in bloque:
+        codigo = boards_vistos.get(board)
+        if codigo is None:
+            codigo = boards_vistos[board] = codificar_texto_dataset(board or "")
+        celda = moves_vistos.get(move)
+        if celda is None:
+            celda = moves_vistos[move] = _celda_o_invalida(move)
+        codigos.append(codigo)
+        celdas.append(celda)
+    return codigos, celdas
+
+
+def decodificar(boards, moves, procesos=None):
+    """Decodifica columnas de texto; reparte el trabajo en procesos si hay muchas filas."""
+    pares = list(zip(boards, moves))
+    if len(pares) < FILAS_POR_PROCESO or procesos == 1:
+        codigos, celdas = _decodificar_bloque(pares)
+    else:
+        bloques = [pares[i:i + FILAS_POR_PROCESO] for i in range(0, len(pares), FILAS_POR_PROCESO)]
+        codigos, celdas = [], []
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            for parte_codigos, parte_celdas in ejecutor.map(_decodificar_bloque, bloques):
+                codigos.extend(parte_codigos)
+                celdas.extend(parte_celdas)
+    return np.array(codigos, dtype=np.int64), np.array(celdas, dtype=np.int64)
+
+
+def puntuar(codigos_post, celdas, jugadores):
+    """
+    Calcula de forma vectorizada el valor óptimo, el valor de la jugada, la pérdida y la
+    categoría de cada jugada. 'codigos_post' son los tableros después de mover, 'celdas'
+    la celda jugada (0..8, o -1 si el movimiento no se pudo leer) y 'jugadores' "x"/"o".
+    """
+    jugadores = np.asarray(jugadores)
+    marca = np.where(jugadores == "x", VALORES["x"], np.where(jugadores == "o", VALORES["o"], 0))
+    fila_jugador = np.where(marca == VALORES["o"], 1, 0)  # Fila de SOLUCION del jugador que movió
+    celda_segura = np.where(celdas >= 0, celdas, 0)
+    peso = _POTENCIAS[celda_segura]
+
+    # La jugada es legible si la celda jugada contiene la marca de quien movió
+    valida = (celdas >= 0) & (marca > 0) & ((codigos_post // peso) % 3 == marca)
+    codigos_previos = np.where(valida, codigos_post - marca * peso, 0)
+    valida &= TABLA_RESULTADOS[codigos_previos] == EN_JUEGO  # No se puede mover en una partida terminada
+
+    valor_optimo = SOLUCION[fila_jugador, codigos_previos].astype(np.int64)
+
+    # Valor tras la jugada: terminal según la tabla de resultados o el negamax del oponente
+    resultado_post = TABLA_RESULTADOS[codigos_post]
+    valor_terminal = np.where(resultado_post == EMPATE, 0, np.where(resultado_post == marca, 1, -1))
+    valor_jugada = np.where(resultado_post == EN_JUEGO,
+                            -SOLUCION[1 - fila_jugador, codigos_post].astype(np.int64), valor_terminal)
+
+    perdida = valor_optimo - valor_jugada
+    return {
+        "valida": valida,
+        "tablero_previo": codigos_previos,
+        "valor_optimo": valor_optimo,
+        "valor_jugada": valor_jugada,
+        "perdida": perdida,
+        "es_optima": valida & (perdida == 0),
+    }
+
+
+def _filas_resultado(origen, referencias, id_matches, modelos, jugadores, celdas, puntos):
+    """Genera las tuplas a insertar en 'optimalidad_jugadas'."""
+    valida = puntos["valida"].tolist()
+    previo = puntos["tablero_previo"].tolist()
+    optimo = puntos["valor_optimo"].tolist()
+    jugada = puntos["valor_jugada"].tolist()
+    perdida = puntos["perdida"].tolist()
+    es_optima = puntos["es_optima"].tolist()
+    celdas = celdas.tolist()
+    for i, referencia in enumerate(referencias):
+        if valida[i]:
+            yield (origen, referencia, id_matches[i], modelos[i], jugadores[i], previo[i], celdas[i],
+                   optimo[i], jugada[i], perdida[i], int(es_optima[i]), CATEGORIAS[jugada[i]])
+        else:
+            yield (origen, referencia, id_matches[i], modelos[i], jugadores[i], None, None,
+                   None, None, None, 0, "invalida")
+
+
+def puntuar_columnas(conn, origen, referencias, id_matches, boards, moves, jugadores, modelos, procesos=None):
+    """Puntúa un conjunto de jugadas dadas por columnas y guarda los resultados en una transacción."""
+    codigos, celdas = decodificar(boards, moves, procesos)
+    puntos = puntuar(codigos, celdas, jugadores)
+    with conn:
+        conn.executemany('''
+            INSERT OR REPLACE INTO optimalidad_jugadas
+                (origen, referencia, id_match, model, player, tablero_previo, celda,
+                 valor_optimo, valor_jugada, perdida, es_optima, categoria)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', _filas_resultado(origen, referencias, id_matches, modelos, jugadores, celdas, puntos))
+    return puntos
+
+
+def puntuar_dataset(conn, ruta=CSV_PATH, procesos=None):
+    """Puntúa todas las filas del CSV; la referencia es la posición de la fila (base 0)."""
+    with open(ruta, newline="", encoding="utf-8") as f:
+        filas = list(csv.DictReader(f))
+    return puntuar_columnas(
+        conn, "dataset", list(range(len(filas))),
+        [fila["id_match"] for fila in filas], [fila["board"] for fila in filas],
+        [fila["move"] for fila in filas], [fila["player"] for fila in filas],
+        [fila["model"] for fila in filas], procesos,
+    )
+
+
+def puntuar_tabla_jugadas(conn, procesos=None):
+    """Puntúa todas las filas de la tabla 'jugadas'; la referencia es su id."""
+    filas = conn.execute('SELECT id, id_match, board, move, player, model FROM jugadas ORDER BY id').fetchall()
+    columnas = list(zip(*filas)) if filas else [[] for _ in range(6)]
+    ids, id_matches, boards, moves, jugadores, modelos = (list(columna) for columna in columnas)
+    return puntuar_columnas(conn, "jugadas", ids, id_matches, boards, moves, jugadores, modelos, procesos)
+
+
+def _resumen(nombre, puntos, segundos):
+    """Imprime un resumen de la puntuación de un origen."""
+    total = len(puntos["valida"])
+    validas = int(puntos["valida"].sum())
+    optimas = int(puntos["es_optima"].sum())
+    velocidad = total / segundos if segundos > 0 else float("inf")
+    print(f"{nombre}: {total} jugadas ({validas} legibles, {optimas} óptimas) "
+          f"en {segundos:.3f} s ({velocidad:,.0f} jugadas/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Puntúa jugadas contra el juego perfecto.")
+    parser.add_argument("--csv", default=CSV_PATH, help="Ruta del dataset CSV")
+    parser.add_argument("--db", default=DB_PATH, help="Ruta de la base de datos SQLite")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos para decodificar lotes grandes")
+    args = parser.parse_args()
+
+    with sqlite3.connect(args.db) as conn:
+        crear_tabla_optimalidad(conn)
+        inicio = time.perf_counter()
+        puntos = puntuar_dataset(conn, args.csv, args.procesos)
+        _resumen("dataset", puntos, time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        puntos = puntuar_tabla_jugadas(conn, args.procesos)
+        _resumen("jugadas", puntos, time.perf_counter() - inicio)
+
+
+if __name__ == "__main__":
+    main()
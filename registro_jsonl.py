@@ -0,0 +1,299 @@
+"""
+registro_jsonl.py - Registro de solo anexado en formato JSON Lines
+
+Cada registro es una línea JSON añadida al final del archivo, de modo que
+guardar uno nuevo cuesta O(1) sin importar cuántos haya. Junto al archivo
+se mantienen:
+
+    <ruta>.idx      desplazamiento en bytes de cada registro (uint64, 8 bytes
+                    por registro) para leer el registro i en O(1)
+    <ruta>.cambios  actualizaciones parciales {"i": indice, "c": {...}} que se
+                    aplican al leer (p. ej. marcar una jugada como evaluada)
+                    sin reescribir el archivo principal
+
+compactar() incorpora los cambios al archivo principal y vacía el archivo
+de cambios. Como cambia los desplazamientos de los registros, debe
+ejecutarse con la aplicación detenida (los lectores de otros procesos no
+toman el bloqueo); el archivo de cambios solo crece mientras tanto, una
+línea por evaluación. Las escrituras se serializan con un bloqueo de hilo y, en
+POSIX, con flock para que varios workers puedan compartir el registro.
+
+USO:
+    $ python registro_jsonl.py migrar jugadas.json jugadas.jsonl
+    $ python registro_jsonl.py compactar jugadas.jsonl
+"""
+
+import json  # Importa json para serializar cada registro
+import os  # Importa os para tamaños de archivo y reemplazos atómicos
+import struct  # Importa struct para leer y escribir los desplazamientos del índice
+import sys  # Importa sys para los argumentos de línea de comandos
+import threading  # Importa threading para serializar escrituras dentro del proceso
+
+try:
+    import fcntl  # Bloqueo entre procesos (solo POSIX)
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+_ENTRADA = struct.Struct("<Q")  # Formato de cada desplazamiento del índice
+
+
+def anexar(ruta, datos):
+    """
+    Añade 'datos' (bytes) al final de 'ruta' por completo o, si la escritura
+    falla, deja el archivo como estaba y relanza el error, para que un
+    reintento no deje líneas a medias ni duplicadas. Devuelve la posición
+    en la que empezaron los datos.
+    """
+    with open(ruta, "ab", buffering=0) as f:  # Sin búfer: nada queda pendiente de escribir al cerrar
+        inicio = f.seek(0, os.SEEK_END)
+        try:
+            vista = memoryview(datos)
+            while vista:
+                vista = vista[f.write(vista):]
+        except BaseException:
+            f.truncate(inicio)
+            raise
+    return inicio
+
+
+def _truncar(ruta, tamano):
+    with open(ruta, "r+b") as f:
+        f.truncate(tamano)
+
+
+class _BloqueoArchivo:
+    """Bloqueo exclusivo entre procesos sobre un archivo auxiliar (no hace nada si no hay fcntl)."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.archivo = None
+
+    def __enter__(self):
+        if fcntl:
+            self.archivo = open(self.ruta, "a")
+            fcntl.flock(self.archivo, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.archivo:
+            self.archivo.close()  # Cerrar el archivo libera el bloqueo
+            self.archivo = None
+
+
+class RegistroJSONL:
+    """Registro JSON Lines de solo anexado con índice de desplazamientos y cambios laterales."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.ruta_indice = ruta + ".idx"
+        self.ruta_cambios = ruta + ".cambios"
+        self._bloqueo = threading.RLock()
+        self._cambios = {}  # indice -> cambios acumulados leídos del archivo de cambios
+        self._cambios_leidos = 0  # Bytes del archivo de cambios ya incorporados a self._cambios
+        with self._bloqueo, self._bloqueo_procesos():
+            self._reparar_indice()
+
+    def _bloqueo_procesos(self):
+        return _BloqueoArchivo(self.ruta + ".lock")
+
+    # --- Índice ---
+
+    def _reparar_indice(self):
+        """Reconstruye el índice si no cubre exactamente el archivo principal (p. ej. tras una caída)."""
+        tamano_datos = os.path.getsize(self.ruta) if os.path.exists(self.ruta) else 0
+        tamano_indice = os.path.getsize(self.ruta_indice) if os.path.exists(self.ruta_indice) else 0
+        if tamano_indice % _ENTRADA.size == 0:
+            if tamano_indice == 0 and tamano_datos == 0:
+                return
+            if tamano_indice:
+                with open(self.ruta_indice, "rb") as fi:
+                    fi.seek(tamano_indice - _ENTRADA.size)
+                    ultimo = _ENTRADA.unpack(fi.read(_ENTRADA.size))[0]
+                with open(self.ruta, "rb") as f:
+                    f.seek(ultimo)
+                    linea = f.readline()
+                if linea.endswith(b"\n") and ultimo + len(linea) == tamano_datos:
+                    return  # El índice está al día
+        offsets = []
+        with open(self.ruta, "rb") as f:
+            posicion = 0
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break  # Línea incompleta de una escritura interrumpida: se descarta
+                if linea.strip():
+                    offsets.append(posicion)
+                posicion += len(linea)
+        if posicion != tamano_datos:
+            with open(self.ruta, "r+b") as f:
+                f.truncate(posicion)
+        temporal = self.ruta_indice + ".tmp"
+        with open(temporal, "wb") as fi:
+            fi.write(b"".join(_ENTRADA.pack(o) for o in offsets))
+        os.replace(temporal, self.ruta_indice)
+
+    def __len__(self):
+        if not os.path.exists(self.ruta_indice):
+            return 0
+        return os.path.getsize(self.ruta_indice) // _ENTRADA.size
+
+    # --- Escritura ---
+
+    def agregar(self, registro):
+        """Añade un registro al final y devuelve su índice."""
+        return self.agregar_lote([registro])[0]
+
+    def agregar_lote(self, registros):
+        """Añade varios registros con una sola escritura y devuelve la lista de sus índices."""
+        return self._agregar_lote(registros, solo_si_vacio=False)
+
+    def agregar_lote_si_vacio(self, registros):
+        """
+        Como agregar_lote(), pero solo si el registro está vacío; la
+        comprobación y la escritura ocurren bajo el mismo bloqueo entre
+        procesos. Devuelve la lista de índices, o None si ya tenía registros.
+        """
+        return self._agregar_lote(registros, solo_si_vacio=True)
+
+    def _agregar_lote(self, registros, solo_si_vacio):
+        lineas = [(json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in registros]
+        with self._bloqueo, self._bloqueo_procesos():
+            if solo_si_vacio and len(self):
+                return None  # Otro proceso se adelantó
+            if not lineas:
+                return []
+            inicio = anexar(self.ruta, b"".join(lineas))
+            offsets, posicion = [], inicio
+            for linea in lineas:
+                offsets.append(posicion)
+                posicion += len(linea)
+            try:
+                primero = anexar(self.ruta_indice, b"".join(_ENTRADA.pack(o) for o in offsets)) // _ENTRADA.size
+            except BaseException:
+                _truncar(self.ruta, inicio)  # Sin índice, las líneas se retiran: el lote se escribe entero o nada
+                raise
+        return list(range(primero, primero + len(lineas)))
+
+    def actualizar(self, indice, cambios):
+        """Registra cambios parciales para el registro 'indice' sin reescribir el archivo principal."""
+        if not 0 <= indice < len(self):
+            raise IndexError(f"Registro {indice} fuera de rango")
+        linea = (json.dumps({"i": indice, "c": cambios}, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._bloqueo, self._bloqueo_procesos():
+            anexar(self.ruta_cambios, linea)
+
+    # --- Lectura ---
+
+    def _refrescar_cambios(self):
+        """Incorpora las líneas nuevas del archivo de cambios (también las escritas por otros procesos)."""
+        tamano = os.path.getsize(self.ruta_cambios) if os.path.exists(self.ruta_cambios) else 0
+        if tamano < self._cambios_leidos:
+            self._cambios, self._cambios_leidos = {}, 0  # Se compactó: los cambios ya están en el archivo principal
+        if tamano == self._cambios_leidos:
+            return
+        with open(self.ruta_cambios, "rb") as f:
+            f.seek(self._cambios_leidos)
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break  # Línea a medio escribir: se leerá en la próxima llamada
+                self._cambios_leidos += len(linea)
+                cambio = json.loads(linea)
+                self._cambios.setdefault(cambio["i"], {}).update(cambio["c"])
+
+    def _aplicar(self, indice, registro):
+        cambios = self._cambios.get(indice)
+        if cambios:
+            registro.update(cambios)
+        return registro
+
+    def leer(self, indice):
+        """Devuelve el registro 'indice' (con sus cambios aplicados) en O(1)."""
+        total = len(self)
+        if indice < 0:
+            indice += total
+        if not 0 <= indice < total:
+            raise IndexError(f"Registro {indice} fuera de rango")
+        with self._bloqueo:
+            self._refrescar_cambios()
+            with open(self.ruta, "rb") as f:
+                f.seek(self._offset(indice))
+                return self._aplicar(indice, json.loads(f.readline()))
+
+    def ultimo(self):
+        """Devuelve el último registro o None si el registro está vacío."""
+        return self.leer(-1) if len(self) else None
+
+    def _offset(self, indice):
+        """Desplazamiento en bytes del registro 'indice' según el índice."""
+        with open(self.ruta_indice, "rb") as fi:
+            fi.seek(indice * _ENTRADA.size)
+            return _ENTRADA.unpack(fi.read(_ENTRADA.size))[0]
+
+    def enumerar(self, desde=0):
+        """Recorre (indice, registro) en orden a partir de 'desde', con los cambios aplicados."""
+        total = len(self)  # Solo los registros ya indexados al empezar la lectura
+        with self._bloqueo:
+            self._refrescar_cambios()
+        if desde >= total:
+            return
+        with open(self.ruta, "rb") as f:
+            f.seek(self._offset(desde) if desde > 0 else 0)
+            for indice in range(max(desde, 0), total):
+                linea = f.readline()
+                while linea and not linea.strip():
+                    linea = f.readline()
+                yield indice, self._aplicar(indice, json.loads(linea))
+
+    def todos(self):
+        """Devuelve la lista completa de registros con los cambios aplicados."""
+        return [registro for _, registro in self.enumerar()]
+
+    # --- Mantenimiento ---
+
+    def compactar(self):
+        """Reescribe el archivo principal con los cambios incorporados y vacía el archivo de cambios."""
+        with self._bloqueo, self._bloqueo_procesos():
+            registros = self.todos()
+            temporal = self.ruta + ".tmp"
+            temporal_indice = self.ruta_indice + ".tmp"
+            offsets, posicion = [], 0
+            with open(temporal, "wb") as f:
+                for registro in registros:
+                    linea = (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+                    offsets.append(posicion)
+                    posicion += len(linea)
+                    f.write(linea)
+            with open(temporal_indice, "wb") as fi:
+                fi.write(b"".join(_ENTRADA.pack(o) for o in offsets))
+            os.replace(temporal, self.ruta)  # Si el proceso cae aquí, _reparar_indice reconstruye el índice
+            os.replace(temporal_indice, self.ruta_indice)
+            if os.path.exists(self.ruta_cambios):
+                os.remove(self.ruta_cambios)  # Reaplicar cambios ya incorporados sería inocuo
+            self._cambios, self._cambios_leidos = {}, 0
+        return len(registros)
+
+
+def migrar_desde_json(ruta_json, registro):
+    """
+    Copia un arreglo JSON (formato antiguo) a un registro vacío. Devuelve
+    cuántos registros migró. Es seguro aunque varios workers arranquen a la
+    vez: solo migra el primero que encuentra el registro vacío bajo el bloqueo.
+    """
+    if len(registro) or not os.path.exists(ruta_json):
+        return 0
+    with open(ruta_json, "r", encoding="utf-8") as f:
+        try:
+            datos = json.load(f)
+        except json.JSONDecodeError:
+            return 0
+    if not isinstance(datos, list):
+        return 0
+    return 0 if registro.agregar_lote_si_vacio(datos) is None else len(datos)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "migrar":
+        print(f"{migrar_desde_json(sys.argv[2], RegistroJSONL(sys.argv[3]))} registros migrados a {sys.argv[3]}")
+    elif len(sys.argv) == 3 and sys.argv[1] == "compactar":
+        print(f"{RegistroJSONL(sys.argv[2]).compactar()} registros compactados en {sys.argv[2]}")
+    else:
+        print(__doc__)
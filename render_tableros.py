@@ -0,0 +1,153 @@
+"""
+render_tableros.py - Imágenes de tableros en SVG con caché por contenido
+
+Sustituye a matplotlib para dibujar los tableros: cada imagen se compone
+concatenando fragmentos SVG precalculados (la cuadrícula y una "X" o "O"
+por celda), lo que cuesta microsegundos y no necesita dependencias.
+
+Las imágenes se guardan en DIRECTORIO_TABLEROS con el código del tablero
+como nombre (tableros/00042.svg). Un mismo tablero se dibuja una sola vez
+aunque aparezca en muchas partidas, y ninguna partida sobrescribe las
+imágenes de otra. Hay como mucho 5478 posiciones legales alcanzables.
+
+El dibujo se hace fuera de la petición: encolar_tablero() solo añade el
+código a una cola que atiende un hilo en segundo plano.
+
+USO:
+    $ python render_tableros.py
+    Dibuja de antemano todas las posiciones alcanzables.
+"""
+
+import os  # Importa os para rutas y reemplazos atómicos
+import queue  # Importa queue para la cola de trabajos del hilo de dibujo
+import threading  # Importa threading para el hilo en segundo plano
+
+from codificacion_tablero import POTENCIAS, VALORES, codificar_tablero, valor_en
+from resultado_tablero import EN_JUEGO, resultado_codigo
+
+DIRECTORIO_TABLEROS = "tableros"  # Carpeta de imágenes (antes tableros/turno_NN.png)
+TAMANO = 300  # Lado de la imagen en píxeles
+_CELDA = TAMANO // 3
+_MARGEN = 22  # Separación entre la marca y el borde de la celda
+COLORES = {"x": "#e74c3c", "o": "#2980b9"}  # Mismos colores que usaba matplotlib
+
+_CABECERA = (
+    f'<svg xmlns="http://www.w3.org/2000/svg" width="{TAMANO}" height="{TAMANO}" '
+    f'viewBox="0 0 {TAMANO} {TAMANO}"><rect width="{TAMANO}" height="{TAMANO}" fill="#fff"/>'
+    + "".join(
+        f'<line x1="{i * _CELDA}" y1="0" x2="{i * _CELDA}" y2="{TAMANO}" stroke="#b0b0b0" stroke-width="2"/>'
+        f'<line x1="0" y1="{i * _CELDA}" x2="{TAMANO}" y2="{i * _CELDA}" stroke="#b0b0b0" stroke-width="2"/>'
+        for i in (1, 2)
+    )
+)
+_PIE = "</svg>"
+
+
+def _glifo(posicion, simbolo):
+    """Fragmento SVG de la marca 'simbolo' en la celda 'posicion'."""
+    fila, columna = divmod(posicion, 3)
+    x0, y0 = columna * _CELDA + _MARGEN, fila * _CELDA + _MARGEN
+    x1, y1 = (columna + 1) * _CELDA - _MARGEN, (fila + 1) * _CELDA - _MARGEN
+    trazo = f'stroke="{COLORES[simbolo]}" stroke-width="10" stroke-linecap="round"'
+    if simbolo == "x":
+        return (f'<line x1="{x0}" y1="{y0}" x2="{x1}" y2="{y1}" {trazo}/>'
+                f'<line x1="{x1}" y1="{y0}" x2="{x0}" y2="{y1}" {trazo}/>')
+    radio = (x1 - x0) // 2
+    return f'<circle cx="{x0 + radio}" cy="{y0 + radio}" r="{radio}" fill="none" {trazo}/>'
+
+
+# Fragmentos precompuestos: _GLIFOS[posicion][valor de la celda] ("" para una celda vacía)
+_GLIFOS = [("", _glifo(p, "x"), _glifo(p, "o")) for p in range(9)]
+
+
+def svg_tablero(codigo):
+    """Devuelve el SVG del tablero con código 'codigo'."""
+    return _CABECERA + "".join(_GLIFOS[p][valor_en(codigo, p)] for p in range(9)) + _PIE
+
+
+def ruta_imagen(codigo, directorio=DIRECTORIO_TABLEROS):
+    """Ruta de la imagen de un tablero (su nombre es el código del tablero)."""
+    return os.path.join(directorio, f"{codigo:05d}.svg")
+
+
+def renderizar(codigo, directorio=DIRECTORIO_TABLEROS):
+    """Dibuja el tablero si aún no está en la caché y devuelve la ruta de la imagen."""
+    ruta = ruta_imagen(codigo, directorio)
+    if not os.path.exists(ruta):
+        os.makedirs(directorio, exist_ok=True)
+        temporal = f"{ruta}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(svg_tablero(codigo))
+        os.replace(temporal, ruta)  # Reemplazo atómico: nunca se sirve una imagen a medias
+    return ruta
+
+
+# --- Dibujo en segundo plano ---
+
+_cola = queue.Queue()  # Códigos pendientes de dibujar
+_conocidos = set()  # Códigos ya dibujados o en la cola (evita trabajo repetido)
+_bloqueo = threading.Lock()
+_hilo = None
+
+
+def _trabajador():
+    """Atiende la cola de dibujo mientras viva el proceso."""
+    while True:
+        codigo, directorio = _cola.get()
+        try:
+            renderizar(codigo, directorio)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la imagen del tablero {codigo}: {e}")
+            with _bloqueo:
+                _conocidos.discard((codigo, directorio))  # Se reintentará en la próxima petición
+        finally:
+            _cola.task_done()
+
+
+def encolar_tablero(tablero, directorio=DIRECTORIO_TABLEROS):
+    """
+    Pide dibujar un tablero (matriz 3x3 o código) sin bloquear la petición y
+    devuelve la ruta donde estará la imagen.
+    """
+    global _hilo
+    codigo = tablero if isinstance(tablero, int) else codificar_tablero(tablero)
+    with _bloqueo:
+        if (codigo, directorio) not in _conocidos:
+            _conocidos.add((codigo, directorio))
+            if _hilo is None:
+                _hilo = threading.Thread(target=_trabajador, name="render_tableros", daemon=True)
+                _hilo.start()
+            _cola.put((codigo, directorio))
+    return ruta_imagen(codigo, directorio)
+
+
+def esperar_pendientes():
+    """Bloquea hasta que la cola de dibujo quede vacía."""
+    _cola.join()
+
+
+def posiciones_alcanzables():
+    """Códigos de todos los tableros alcanzables en partidas legales (empieza "x")."""
+    vistos = {0}
+    frontera = [0]
+    for turno in range(9):
+        marca = VALORES["x" if turno % 2 == 0 else "o"]
+        siguiente = []
+        for codigo in frontera:
+            if resultado_codigo(codigo) != EN_JUEGO:
+                continue  # La partida terminó: no hay más jugadas desde aquí
+            for posicion in range(9):
+                if valor_en(codigo, posicion) == 0:
+                    nuevo = codigo + marca * POTENCIAS[posicion]
+                    if nuevo not in vistos:
+                        vistos.add(nuevo)
+                        siguiente.append(nuevo)
+        frontera = siguiente
+    return sorted(vistos)
+
+
+if __name__ == "__main__":
+    codigos = posiciones_alcanzables()
+    for codigo in codigos:
+        renderizar(codigo)
+    print(f"{len(codigos)} tableros dibujados en {DIRECTORIO_TABLEROS}/")
@@ -0,0 +1,113 @@
+"""
+reproduccion_lote.py - Reproducción de todas las partidas del dataset sin HTTP
+
+Juega de principio a fin cada id_match de dataset1.csv llamando
+directamente a juego_ia.jugar_turno (la misma lógica que /jugar_turno),
+sin navegador ni peticiones. Cada partida usa el cursor de su propio
+id_match (juego_ia.construir_partidas), y las partidas se reparten entre
+varios procesos.
+
+Cada jugada producida tiene el mismo formato que las de /jugar_turno (con
+la evaluación automática de evaluacion_rubrica) y 'partida' = id_match. Se
+guardan en un registro JSON Lines (registro_jsonl) con una escritura por
+partida.
+
+USO:
+    $ python reproduccion_lote.py [--procesos N] [--salida reproduccion_jugadas.jsonl] [--limite N]
+    Con --salida jugadas.jsonl las jugadas se añaden al registro que usa la aplicación.
+"""
+
+import argparse  # Importa argparse para las opciones de línea de comandos
+import os  # Importa os para saber cuántos procesadores hay
+import time  # Importa time para medir el rendimiento
+from concurrent.futures import ProcessPoolExecutor  # Reparte las partidas entre procesos
+
+import juego_ia  # Lógica del juego y acceso al dataset
+from evaluacion_rubrica import evaluar_jugada_rubrica
+from registro_jsonl import RegistroJSONL
+from sesiones_juego import estado_inicial
+
+RUTA_SALIDA = "reproduccion_jugadas.jsonl"  # Registro donde se guardan las jugadas reproducidas
+MAX_TURNOS = 9  # Una partida de Tres en Raya no puede tener más jugadas
+PARTIDAS_POR_TAREA = 16  # Partidas que recibe cada proceso por envío (reduce la comunicación)
+
+
+def partidas_dataset():
+    """Lista de (id_match, número de partida) de cada partida del dataset, en el orden del CSV."""
+    juego_ia.cargar_dataset()
+    return [(id_match, numero) for numero, id_match in enumerate(juego_ia.partidas["ids"])]
+
+
+def reproducir_partida(id_match, numero):
+    """
+    Juega completa la partida número 'numero' del dataset.
+    Devuelve (jugadas, error): la lista de jugadas y el mensaje de error si
+    el modelo propuso un movimiento ilegal (la partida se detiene ahí, igual
+    que en el navegador).
+    """
+    estado = estado_inicial()
+    estado["partida_dataset"] = numero
+    jugadas = []
+    for _ in range(MAX_TURNOS):
+        jugada = juego_ia.jugar_turno(estado)
+        if "error" in jugada:
+            return jugadas, jugada["error"]
+        jugada["partida"] = id_match
+        jugada["evaluacion"] = evaluar_jugada_rubrica(jugada)  # Misma evaluación automática que la app
+        jugadas.append(jugada)
+        if jugada["ganador"]:
+            break
+    return jugadas, None
+
+
+def _reproducir_lote(trabajos):
+    """Reproduce una lista de (id_match, número de partida) dentro de un proceso."""
+    return [(id_match,) + reproducir_partida(id_match, numero) for id_match, numero in trabajos]
+
+
+def reproducir_todas(procesos=None, limite=None):
+    """
+    Reproduce todas las partidas del dataset (o las 'limite' primeras) y genera
+    (id_match, jugadas, error) en el orden del CSV.
+    """
+    trabajos = partidas_dataset()[:limite]
+    lotes = [trabajos[i:i + PARTIDAS_POR_TAREA] for i in range(0, len(trabajos), PARTIDAS_POR_TAREA)]
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1:
+        for lote in lotes:
+            yield from _reproducir_lote(lote)
+        return
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        for resultados in ejecutor.map(_reproducir_lote, lotes):
+            yield from resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduce todas las partidas del dataset sin HTTP.")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos a usar (por defecto, uno por CPU)")
+    parser.add_argument("--salida", default=RUTA_SALIDA, help="Registro JSON Lines donde guardar las jugadas")
+    parser.add_argument("--limite", type=int, default=None, help="Reproducir solo las N primeras partidas")
+    args = parser.parse_args()
+
+    registro = RegistroJSONL(args.salida)
+    inicio = time.perf_counter()
+    partidas = jugadas_totales = errores = 0
+    ganadores = {}
+    for id_match, jugadas, error in reproducir_todas(args.procesos, args.limite):
+        registro.agregar_lote(jugadas)  # Una escritura por partida
+        partidas += 1
+        jugadas_totales += len(jugadas)
+        errores += error is not None
+        resultado = jugadas[-1]["ganador"] if jugadas and not error else None
+        ganadores[resultado or "sin terminar"] = ganadores.get(resultado or "sin terminar", 0) + 1
+    segundos = time.perf_counter() - inicio
+
+    velocidad = partidas / segundos if segundos > 0 else float("inf")
+    print(f"{partidas} partidas, {jugadas_totales} jugadas ({errores} detenidas por jugada ilegal) "
+          f"en {segundos:.2f} s: {velocidad:,.1f} partidas/s")
+    print("Resultados: " + ", ".join(f"{clave}: {total}" for clave, total in sorted(ganadores.items())))
+    print(f"Jugadas guardadas en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
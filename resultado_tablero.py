@@ -0,0 +1,105 @@
+"""
+resultado_tablero.py - Tabla precalculada de resultados de Tres en Raya
+
+Para cada uno de los 3**9 códigos de tablero (ver codificacion_tablero.py)
+se precalcula una sola vez si ganó "x", ganó "o", hay empate o la partida
+sigue en juego. Así la detección de ganador es una consulta O(1) y, con
+NumPy, se pueden clasificar arreglos completos de tableros de una vez.
+
+Los códigos inalcanzables en una partida real (p. ej. ambos jugadores con
+tres en raya) también tienen entrada: gana la primera línea encontrada en
+el mismo orden que usa revisar_ganador.
+
+USO:
+    $ python resultado_tablero.py [ruta_csv]
+    Revalida la columna 'win' de dataset1.csv contra la tabla.
+"""
+
+import csv  # Importa csv para leer el dataset sin depender de pandas
+import sys  # Importa sys para leer argumentos de línea de comandos
+import time  # Importa time para medir el tiempo de la revalidación
+
+import numpy as np  # Importa NumPy para construir la tabla y clasificar tableros en bloque
+
+from codificacion_tablero import LINEAS, POTENCIAS, TOTAL_CODIGOS, codificar_tablero, codificar_texto_dataset
+
+EN_JUEGO, GANA_X, GANA_O, EMPATE = 0, 1, 2, 3  # Valores almacenados en la tabla de resultados
+GANADORES = (None, "x", "o", "empate")  # Equivalencia con los valores que devuelve revisar_ganador
+
+
+def _construir_tabla():
+    """Calcula el resultado de los 19683 códigos de forma vectorizada."""
+    codigos = np.arange(TOTAL_CODIGOS)
+    digitos = (codigos[:, None] // np.array(POTENCIAS)) % 3  # Matriz (19683, 9) con el valor de cada celda
+    tabla = np.full(TOTAL_CODIGOS, EN_JUEGO, dtype=np.uint8)
+    tabla[(digitos != 0).all(axis=1)] = EMPATE  # Tablero lleno sin línea: empate
+    # Se recorre al revés para que, si hay varias líneas, prevalezca la primera de LINEAS
+    for a, b, c in reversed(LINEAS):
+        linea = (digitos[:, a] != 0) & (digitos[:, a] == digitos[:, b]) & (digitos[:, b] == digitos[:, c])
+        tabla[linea] = digitos[linea, a]  # 1 = "x", 2 = "o"
+    tabla.setflags(write=False)  # La tabla es de solo lectura
+    return tabla
+
+
+TABLA_RESULTADOS = _construir_tabla()  # Arreglo uint8 indexado por código de tablero
+_TABLA_LISTA = TABLA_RESULTADOS.tolist()  # Copia en lista de Python: la consulta escalar más rápida
+
+
+def resultado_codigo(codigo):
+    """Devuelve EN_JUEGO, GANA_X, GANA_O o EMPATE para un código de tablero."""
+    return _TABLA_LISTA[codigo]
+
+
+def ganador_codigo(codigo):
+    """Devuelve "x", "o", "empate" o None, igual que revisar_ganador."""
+    return GANADORES[_TABLA_LISTA[codigo]]
+
+
+def ganador_tablero(tablero):
+    """Igual que ganador_codigo, pero recibe la matriz 3x3 de "x"/"o"/"b"."""
+    return GANADORES[_TABLA_LISTA[codificar_tablero(tablero)]]
+
+
+def clasificar_codigos(codigos):
+    """Clasifica un arreglo de códigos de una sola vez; devuelve un arreglo uint8 de resultados."""
+    return TABLA_RESULTADOS[np.asarray(codigos, dtype=np.intp)]
+
+
+def revalidar_ganadores(codigos, jugadores, win):
+    """
+    Compara la columna 'win' del dataset con la tabla de resultados.
+    'codigos' son los tableros después de cada jugada, 'jugadores' el jugador
+    que movió ("x"/"o") y 'win' el valor registrado (0/1).
+    Devuelve un arreglo booleano con las filas donde el registro no coincide.
+    """
+    resultados = clasificar_codigos(codigos)
+    jugadores = np.asarray(jugadores)
+    ganador_esperado = np.where(jugadores == "x", GANA_X, np.where(jugadores == "o", GANA_O, -1))
+    gano = resultados == ganador_esperado  # El jugador que movió completó una línea
+    return gano != (np.asarray(win, dtype=np.int64) == 1)
+
+
+def revalidar_dataset(ruta="dataset1.csv"):
+    """Revalida todo el historial de ganadores de un CSV con el formato de dataset1.csv."""
+    with open(ruta, newline="", encoding="utf-8") as f:
+        filas = list(csv.DictReader(f))
+    inicio = time.perf_counter()
+    codigos = np.fromiter((codificar_texto_dataset(fila["board"]) for fila in filas), dtype=np.int32, count=len(filas))
+    jugadores = np.array([fila["player"] for fila in filas])
+    win = np.array([int(fila["win"] or 0) for fila in filas])
+    discrepancias = revalidar_ganadores(codigos, jugadores, win)
+    transcurrido = time.perf_counter() - inicio
+    return {
+        "filas": len(filas),
+        "discrepancias": int(discrepancias.sum()),
+        "filas_discrepantes": np.flatnonzero(discrepancias).tolist(),
+        "segundos": transcurrido,
+    }
+
+
+if __name__ == "__main__":
+    reporte = revalidar_dataset(sys.argv[1] if len(sys.argv) > 1 else "dataset1.csv")
+    print(f"{reporte['filas']} filas revalidadas en {reporte['segundos'] * 1000:.1f} ms; "
+          f"{reporte['discrepancias']} no coinciden con la columna 'win'.")
+    if reporte["filas_discrepantes"]:
+        print("Filas discrepantes:", reporte["filas_discrepantes"])
@@ -0,0 +1,184 @@
+"""
+sesiones_juego.py - Estado de cada partida guardado por identificador
+
+Sustituye a las variables globales de app.py (tablero, turno_actual,
+turno_numero, historial) y al cursor global de juego_ia: cada partida
+tiene su propio estado, de modo que un mismo proceso puede atender miles
+de reproducciones simultáneas y varios workers pueden compartirlas.
+
+Estado de una partida (diccionario serializable en JSON):
+    tablero          matriz 3x3 de "x"/"o"/"b"
+    turno_actual     jugador que mueve
+    turno_numero     número de la próxima jugada (se usa como match_id)
+    historial        jugadas de la partida en curso
+    partida_dataset  partida del dataset que se está reproduciendo (juego_ia.construir_partidas)
+    paso             filas de esa partida ya consumidas (juego_ia.buscar_jugada_en_partida)
+    partidas         partidas jugadas en esta sesión (/contador_partidas)
+
+Almacenes disponibles:
+    AlmacenMemoria  diccionario del proceso con expulsión LRU de las partidas inactivas
+    AlmacenSQLite   tabla 'sesiones_juego', compartida por todos los workers; cada
+                    PURGAR_CADA partidas guardadas borra las que llevan más de
+                    INACTIVIDAD_MAXIMA segundos sin actividad
+
+transaccion(partida_id) entrega una copia del estado y la guarda solo al
+salir sin error (si algo falla a mitad de un turno, la partida queda como
+estaba, igual en memoria que en SQLite);
+las peticiones concurrentes a una misma partida se serializan (bloqueo por
+partida en memoria, BEGIN IMMEDIATE en SQLite).
+
+Se elige con la variable de entorno SESIONES_BACKEND ("memoria" o "sqlite").
+"""
+
+import copy  # Importa copy para que los lectores nunca vean un estado a medio modificar
+import json  # Importa json para guardar el estado en SQLite
+import os  # Importa os para leer la configuración del entorno
+import threading  # Importa threading para los bloqueos por partida
+import time  # Importa time para registrar la última actividad
+import uuid  # Importa uuid para generar identificadores de partida
+from itertools import count  # Contador de guardados para purgar periódicamente
+from collections import OrderedDict  # Diccionario ordenado para la política LRU
+from contextlib import contextmanager  # Para definir transacciones con 'with'
+
+from db_handler import DB_PATH, conexion  # Misma base de datos y mismo pool de conexiones que el resto de la aplicación
+from juego_ia import inicializar_tablero
+
+CAPACIDAD_MEMORIA = 10000  # Partidas que se conservan en memoria antes de expulsar las más antiguas
+INACTIVIDAD_MAXIMA = 24 * 3600  # Segundos sin actividad tras los que una partida en SQLite se puede purgar
+PURGAR_CADA = 1000  # Partidas guardadas en SQLite (por proceso) entre dos purgas de las inactivas
+_BLOQUEOS = 64  # Bloqueos repartidos por partida: peticiones de partidas distintas no se esperan
+
+
+def estado_inicial():
+    """Estado de una partida recién creada."""
+    return {
+        "tablero": inicializar_tablero(),
+        "turno_actual": "x",
+        "turno_numero": 1,
+        "historial": [],
+        "partida_dataset": 0,
+        "paso": 0,
+        "partidas": 0,
+    }
+
+
+def nuevo_id():
+    """Identificador aleatorio para una partida nueva."""
+    return uuid.uuid4().hex
+
+
+class AlmacenMemoria:
+    """Estados en un diccionario del proceso, con expulsión LRU de las partidas inactivas."""
+
+    def __init__(self, capacidad=CAPACIDAD_MEMORIA):
+        self.capacidad = capacidad
+        self._estados = OrderedDict()  # partida_id -> estado, de la menos a la más reciente
+        self._bloqueo = threading.Lock()  # Protege el diccionario
+        self._bloqueos = [threading.Lock() for _ in range(_BLOQUEOS)]  # Serializan cada partida
+
+    def __len__(self):
+        return len(self._estados)
+
+    def _leer(self, partida_id):
+        with self._bloqueo:
+            estado = self._estados.get(partida_id)
+            if estado is not None:
+                self._estados.move_to_end(partida_id)
+            return estado
+
+    def leer(self, partida_id):
+        """Copia del estado de la partida o None si no existe (o fue expulsada)."""
+        estado = self._leer(partida_id)
+        return copy.deepcopy(estado) if estado is not None else None
+
+    def guardar(self, partida_id, estado):
+        with self._bloqueo:
+            self._estados[partida_id] = estado
+            self._estados.move_to_end(partida_id)
+            while len(self._estados) > self.capacidad:
+                self._estados.popitem(last=False)  # Expulsa la partida usada hace más tiempo
+
+    @contextmanager
+    def transaccion(self, partida_id):
+        with self._bloqueos[hash(partida_id) % _BLOQUEOS]:
+            # Se modifica una copia: el estado guardado solo se sustituye si el bloque termina sin error,
+            # y mientras tanto /estado y /eventos leen el anterior completo
+            estado = self.leer(partida_id) or estado_inicial()
+            yield estado
+            self.guardar(partida_id, estado)
+
+
+class AlmacenSQLite:
+    """Estados en la tabla 'sesiones_juego' de SQLite, compartidos por todos los workers."""
+
+    def __init__(self, ruta, inactividad_maxima=INACTIVIDAD_MAXIMA, purgar_cada=PURGAR_CADA):
+        self.ruta = ruta
+        self.inactividad_maxima = inactividad_maxima
+        self.purgar_cada = purgar_cada
+        self._guardados = count(1)  # next() es atómico con el GIL: no hace falta bloqueo
+        with conexion(self.ruta) as conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS sesiones_juego (
+                partida_id TEXT PRIMARY KEY,
+                estado TEXT NOT NULL,
+                actualizado REAL NOT NULL
+            )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sesiones_actualizado ON sesiones_juego(actualizado)')
+            conn.commit()
+
+    def __len__(self):
+        with conexion(self.ruta) as conn:
+            return conn.execute('SELECT COUNT(*) FROM sesiones_juego').fetchone()[0]
+
+    @staticmethod
+    def _leer(conn, partida_id):
+        fila = conn.execute('SELECT estado FROM sesiones_juego WHERE partida_id = ?', (partida_id,)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    @staticmethod
+    def _guardar(conn, partida_id, estado):
+        conn.execute('INSERT OR REPLACE INTO sesiones_juego (partida_id, estado, actualizado) VALUES (?, ?, ?)',
+                     (partida_id, json.dumps(estado), time.time()))
+
+    def leer(self, partida_id):
+        with conexion(self.ruta) as conn:
+            return self._leer(conn, partida_id)
+
+    def guardar(self, partida_id, estado):
+        with conexion(self.ruta) as conn:
+            self._guardar(conn, partida_id, estado)
+            conn.commit()
+
+    @contextmanager
+    def transaccion(self, partida_id):
+        with conexion(self.ruta) as conn:  # La misma conexión del pool durante toda la transacción
+            conn.execute('BEGIN IMMEDIATE')  # Bloquea la escritura: otro worker espera a que terminemos
+            try:
+                estado = self._leer(conn, partida_id) or estado_inicial()
+                yield estado
+                self._guardar(conn, partida_id, estado)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        if next(self._guardados) % self.purgar_cada == 0:
+            self.purgar()  # Fuera de la transacción: la partida ya está guardada
+
+    def purgar(self):
+        """Borra las partidas sin actividad reciente y devuelve cuántas eliminó."""
+        limite = time.time() - self.inactividad_maxima
+        with conexion(self.ruta) as conn:
+            borradas = conn.execute('DELETE FROM sesiones_juego WHERE actualizado < ?', (limite,)).rowcount
+            conn.commit()
+        return borradas
+
+
+def crear_almacen(backend=None, ruta=None):
+    """Crea el almacén indicado o el de la variable de entorno SESIONES_BACKEND."""
+    backend = backend or os.environ.get("SESIONES_BACKEND", "memoria")
+    if backend == "sqlite":
+        return AlmacenSQLite(ruta or os.environ.get("SESIONES_DB", DB_PATH))
+    if backend == "memoria":
+        return AlmacenMemoria(int(os.environ.get("SESIONES_CAPACIDAD", CAPACIDAD_MEMORIA)))
+    raise ValueError(f"Backend de sesiones desconocido: {backend}")
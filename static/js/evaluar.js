@@ -78,75 +78,60 @@ function renderTablero(tablero, movimiento) {
   contenedor.appendChild(table); // Agrega el tablero al contenedor
 }
 
-// Carga la información de la jugada actual desde el backend
-function cargarInfoJugada() {
-  fetch("/info_jugada_sesion")
-    .then((res) => res.json())
-    .then((data) => {
-      const contenedor = document.getElementById("info-jugada");
-
-      if (data.error) {
-        // Si no hay jugadas disponibles
-        contenedor.innerHTML = "<p>No hay jugadas aún.</p>";
-      } else {
-        // Muestra la información del jugador, modelo y movimiento
-        contenedor.innerHTML = `
-          <p><strong>Jugador:</strong> ${data.jugador.toUpperCase()}</p>
-          <p><strong>Modelo:</strong> ${data.modelo}</p>
-          <p><strong>Movimiento:</strong> 
-            ${
-              Array.isArray(data.movimiento) && data.movimiento[0] === "mark"
-                ? `Marcar fila ${data.movimiento[1]}, columna ${data.movimiento[2]}`
-                : JSON.stringify(data.movimiento)
-            }
-          </p>
-        `;
-
-        // Actualiza el tablero en sessionStorage si existe estado previo
-        const estadoGuardado = sessionStorage.getItem("estado_tres_en_raya");
-        if (estadoGuardado) {
-          try {
-            const estado = JSON.parse(estadoGuardado);
-            estado.tablero = data.tablero; // Actualiza el tablero
-            sessionStorage.setItem("estado_tres_en_raya", JSON.stringify(estado));
-          } catch (e) {
-            console.warn("No se pudo actualizar sessionStorage desde /evaluar");
-          }
-        }
+// Muestra la información de la última jugada (jugador, modelo y movimiento)
+function mostrarInfoJugada(data) {
+  const contenedor = document.getElementById("info-jugada");
+
+  if (!data.jugador) {
+    // Si no hay jugadas en la partida
+    contenedor.innerHTML = "<p>No hay jugadas aún.</p>";
+    return;
+  }
+
+  contenedor.innerHTML = `
+    <p><strong>Jugador:</strong> ${data.jugador.toUpperCase()}</p>
+    <p><strong>Modelo:</strong> ${data.modelo}</p>
+    <p><strong>Movimiento:</strong> 
+      ${
+        Array.isArray(data.movimiento) && data.movimiento[0] === "mark"
+          ? `Marcar fila ${data.movimiento[1]}, columna ${data.movimiento[2]}`
+          : JSON.stringify(data.movimiento)
       }
-    })
-    .catch((err) => {
-      console.error("Error al cargar info de la jugada:", err);
-      const contenedor = document.getElementById("info-jugada");
-      contenedor.innerHTML = "<p class='text-danger'>Error al cargar información de la jugada.</p>";
-    });
+    </p>
+  `;
+}
+
+// Guarda el tablero recibido en sessionStorage para que index.js lo restaure
+function guardarTablero(tablero) {
+  const estadoGuardado = sessionStorage.getItem("estado_tres_en_raya");
+  if (estadoGuardado) {
+    try {
+      const estado = JSON.parse(estadoGuardado);
+      estado.tablero = tablero;
+      sessionStorage.setItem("estado_tres_en_raya", JSON.stringify(estado));
+    } catch (e) {
+      console.warn("No se pudo guardar el tablero en sessionStorage");
+    }
+  }
+}
+
+// Muestra un estado o jugada recibido por /eventos
+function actualizarDesdeEvento(evento) {
+  const data = JSON.parse(evento.data);
+  renderTablero(data.tablero, data.movimiento); // Renderiza el tablero actual
+  mostrarInfoJugada(data);
+  guardarTablero(data.tablero);
 }
 
 // Evento que se ejecuta cuando la página ha cargado completamente
 document.addEventListener("DOMContentLoaded", () => {
-  // Obtiene el estado inicial del juego desde el servidor
-  fetch("/estado")
-    .then((res) => res.json())
-    .then((data) => {
-      renderTablero(data.tablero, data.movimiento); // Renderiza el tablero actual
-
-      // Guarda el estado en sessionStorage para persistencia local
-      const estadoGuardado = sessionStorage.getItem("estado_tres_en_raya");
-      if (estadoGuardado) {
-        try {
-          const estado = JSON.parse(estadoGuardado);
-          estado.tablero = data.tablero;
-          sessionStorage.setItem("estado_tres_en_raya", JSON.stringify(estado));
-        } catch (e) {
-          console.warn("No se pudo guardar el tablero en sessionStorage");
-        }
-      }
-
-      // Carga la información de la jugada
-      cargarInfoJugada();
-    })
-    .catch((err) => {
-      console.error("Error al obtener el estado:", err);
-    });
+  // Una sola conexión a /eventos: primero llega el estado de la partida y después cada cambio,
+  // sin volver a consultar /estado ni /info_jugada_sesion
+  const eventos = new EventSource("/eventos");
+  eventos.addEventListener("estado", actualizarDesdeEvento);
+  eventos.addEventListener("jugada", actualizarDesdeEvento);
+  eventos.addEventListener("partida", actualizarDesdeEvento);
+  eventos.onerror = () => {
+    console.error("Conexión con /eventos interrumpida; el navegador reintentará.");
+  };
 });
-
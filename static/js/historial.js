@@ -5,18 +5,92 @@ function toggleRubrica() {
   panel.setAttribute('aria-hidden', !expanded); // Accesibilidad: oculta o muestra para lectores de pantalla
 }
 
+// ---------- PAGINACIÓN DEL HISTORIAL ----------
+
+// Descripción de cada etiqueta de evaluación (igual que en la plantilla)
+const DESCRIPCIONES_EVALUACION = {
+  Buena: 'Buena: movimiento estratégico y correcto',
+  Mala: 'Mala: movimiento erróneo o sin sentido',
+  Creativa: 'Creativa: movimiento original o inesperado'
+};
+
+// Crea un elemento con clase y texto (textContent evita inyectar HTML de las razones)
+function crearElemento(etiqueta, clase, texto) {
+  const el = document.createElement(etiqueta);
+  if (clase) el.className = clase;
+  if (texto !== undefined) el.textContent = texto;
+  return el;
+}
+
+// Construye una fila de la tabla con el mismo formato que genera evaluaciones_historial.html
+function filaEvaluacion(ev) {
+  const tr = document.createElement('tr');
+  tr.dataset.id = ev.id;
+  tr.appendChild(crearElemento('td', '', ev.timestamp));
+  tr.appendChild(crearElemento('td', '', String(ev.jugador).toUpperCase()));
+  tr.appendChild(crearElemento('td', '', ev.modelo));
+  tr.appendChild(crearElemento('td', '', ev.movimiento_legible));
+
+  // Etiqueta de evaluación con el color de su tipo
+  const tdEval = crearElemento('td', 'text-center');
+  const contenedor = crearElemento('div');
+  contenedor.style.cssText = 'display: flex; flex-direction: column; align-items: center;';
+  const tipo = DESCRIPCIONES_EVALUACION[ev.evaluacion] ? ev.evaluacion : 'Pudo';
+  const badge = crearElemento('span', `badge badge-eval badge-${tipo}`, ev.evaluacion_texto);
+  badge.title = DESCRIPCIONES_EVALUACION[ev.evaluacion] || 'Puede mejorar: movimiento válido pero con errores';
+  contenedor.appendChild(badge);
+  tdEval.appendChild(contenedor);
+  tr.appendChild(tdEval);
+
+  // Razón y tablero (texto o miniatura)
+  const tdRazon = crearElemento('td');
+  const razonTablero = crearElemento('div', 'razon-tablero');
+  razonTablero.appendChild(crearElemento('pre', '', ev.razon_texto || 'Sin explicación'));
+  if (typeof ev.tablero === 'string') {
+    razonTablero.appendChild(crearElemento('pre', '', ev.tablero));
+  } else {
+    const mini = crearElemento('div', 'tablero-mini');
+    ev.tablero.forEach(fila => {
+      const div = crearElemento('div');
+      fila.forEach(celda => div.appendChild(crearElemento('span', '', celda !== 'b' ? celda : '-')));
+      mini.appendChild(div);
+    });
+    razonTablero.appendChild(mini);
+  }
+  tdRazon.appendChild(razonTablero);
+  tr.appendChild(tdRazon);
+  return tr;
+}
+
+// Pide a /api/evaluaciones la página siguiente con los mismos filtros y la añade a la tabla
+async function cargarMas(boton) {
+  const parametros = new URLSearchParams(window.location.search); // Filtros de la página actual
+  parametros.set('despues_de', boton.dataset.siguiente);
+  boton.disabled = true;
+  try {
+    const respuesta = await fetch(`/api/evaluaciones?${parametros}`);
+    const datos = await respuesta.json();
+    const cuerpo = document.getElementById('cuerpoHistorial');
+    datos.evaluaciones.forEach(ev => cuerpo.appendChild(filaEvaluacion(ev)));
+    if (datos.siguiente === null) {
+      boton.hidden = true; // No quedan más evaluaciones
+    } else {
+      boton.dataset.siguiente = datos.siguiente;
+    }
+  } catch (error) {
+    console.error('No se pudo cargar la página siguiente del historial:', error);
+  } finally {
+    boton.disabled = false;
+  }
+}
+
 // Ejecuta cuando el DOM ha sido completamente cargado
 document.addEventListener('DOMContentLoaded', () => {
-  // Filtro en tiempo real para la tabla
-  const filtroInput = document.getElementById("filtro");
-  filtroInput.addEventListener("input", function () {
-    const val = this.value.toLowerCase(); // Texto del input en minúsculas
-    // Itera por cada fila del cuerpo de la tabla
-    document.querySelectorAll("tbody tr").forEach(row => {
-      // Muestra u oculta la fila dependiendo si incluye el texto del filtro
-      row.style.display = row.textContent.toLowerCase().includes(val) ? "" : "none";
-    });
-  });
+  // Botón "Cargar más": las páginas siguientes se piden solo cuando el usuario las quiere ver
+  const botonCargarMas = document.getElementById('cargarMas');
+  if (botonCargarMas) {
+    botonCargarMas.addEventListener('click', () => cargarMas(botonCargarMas));
+  }
 
   // ---------- GRÁFICO DE RADAR ----------
 
@@ -71,48 +71,48 @@ function cargarEstado() {
   }
 }
 
+// ----- Mostrar una jugada recibida del servidor -----
+// Devuelve false si la jugada trae un error o termina la partida
+function mostrarJugada(data) {
+  if (data.error) {
+    mostrarError("Jugada inválida: " + data.error);
+    jugando = false;
+    return false;
+  }
+
+  renderTablero(data.tablero);
+
+  // Mostrar razonamiento del modelo
+  document.getElementById("razon").innerHTML = `Jugador <b>${data.jugador.toUpperCase()}</b> (${data.modelo}): ${data.razon}`;
+
+  // Añadir al historial
+  historial.push({
+    jugador: data.jugador,
+    razon: data.razon,
+    modelo: data.modelo,
+  });
+  renderHistorial();
+
+  // Verificar si hay ganador o empate
+  if (data.ganador === "empate") {
+    document.getElementById("razon").innerHTML += "<br><b>¡Empate!</b>";
+    jugando = false;
+  } else if (data.ganador) {
+    document.getElementById("razon").innerHTML += `<br><b>Ganador: ${data.ganador.toUpperCase()}</b>`;
+    jugando = false;
+  }
+
+  guardarEstado(data.tablero);
+  return jugando;
+}
+
 // ----- Ejecutar un turno (modelo realiza una jugada) -----
 function jugarTurno() {
   if (!jugando) return;
 
   fetch("/jugar_turno", { method: "POST" })
     .then((res) => res.json())
-    .then((data) => {
-      if (data.error) {
-        mostrarError("Jugada inválida: " + data.error);
-        jugando = false;
-        return;
-      }
-
-      renderTablero(data.tablero);
-
-      // Mostrar razonamiento del modelo
-      document.getElementById("razon").innerHTML = `Jugador <b>${data.jugador.toUpperCase()}</b> (${data.modelo}): ${data.razon}`;
-
-      // Añadir al historial
-      historial.push({
-        jugador: data.jugador,
-        razon: data.razon,
-        modelo: data.modelo,
-      });
-      renderHistorial();
-
-      // Verificar si hay ganador o empate
-      if (data.ganador === "empate") {
-        document.getElementById("razon").innerHTML += "<br><b>¡Empate!</b>";
-        jugando = false;
-      } else if (data.ganador) {
-        document.getElementById("razon").innerHTML += `<br><b>Ganador: ${data.ganador.toUpperCase()}</b>`;
-        jugando = false;
-      }
-
-      guardarEstado(data.tablero);
-
-      // Si el modo automático está activo, repetir turno automáticamente
-      if (modoAuto && jugando) {
-        setTimeout(jugarTurno, 150); // Espera 150 ms
-      }
-    })
+    .then(mostrarJugada)
     .catch((err) => {
       mostrarError("Error en la comunicación con el servidor.");
       console.error(err);
@@ -120,11 +120,42 @@ function jugarTurno() {
     });
 }
 
+const esperar = (ms) => new Promise((resolver) => setTimeout(resolver, ms));
+
 // ----- Activar modo automático -----
-function jugarAuto() {
+// Una sola petición a /jugar_turnos juega el resto de la partida; las jugadas llegan
+// una por línea (NDJSON) y se muestran con 150 ms entre ellas
+async function jugarAuto() {
   if (!jugando) return;
   modoAuto = true;
-  jugarTurno(); // Empieza a jugar automáticamente
+
+  try {
+    const respuesta = await fetch("/jugar_turnos?flujo=1", { method: "POST" });
+    const lector = respuesta.body.getReader();
+    const decodificador = new TextDecoder();
+    let pendiente = "";
+    while (true) {
+      const { value, done } = await lector.read();
+      if (done) break;
+      pendiente += decodificador.decode(value, { stream: true });
+      const lineas = pendiente.split("\n");
+      pendiente = lineas.pop(); // La última puede estar incompleta
+      for (const linea of lineas) {
+        if (!linea.trim()) continue;
+        const data = JSON.parse(linea);
+        if (data.fin) {
+          if (data.error) mostrarJugada(data); // El modelo propuso una jugada ilegal
+          continue;
+        }
+        mostrarJugada(data);
+        await esperar(150);
+      }
+    }
+  } catch (err) {
+    mostrarError("Error en la comunicación con el servidor.");
+    console.error(err);
+    jugando = false;
+  }
 }
 
 // ----- Iniciar nueva partida (resetea tablero e historial) -----
@@ -141,11 +172,7 @@ function siguientePartida() {
       document.getElementById("historial").innerText = "";
 
       sessionStorage.removeItem("estado_tres_en_raya");
-
-      // Obtener nuevo estado desde el servidor
-      fetch("/estado")
-        .then((res) => res.json())
-        .then((data) => renderTablero(data.tablero));
+      // El tablero nuevo llega por /eventos (evento "partida")
     })
     .catch((err) => {
       mostrarError("No se pudo reiniciar la partida.");
@@ -168,7 +195,7 @@ function ocultarError() {
 
 // ----- Reiniciar completamente el juego (desde cero) -----
 function reiniciar() {
-  fetch("/reiniciar", { method: "POST" })
+  return fetch("/reiniciar", { method: "POST" })
     .then(() => {
       jugando = true;
       modoAuto = false;
@@ -179,10 +206,7 @@ function reiniciar() {
       ocultarError();
 
       sessionStorage.removeItem("estado_tres_en_raya");
-
-      fetch("/estado")
-        .then((res) => res.json())
-        .then((data) => renderTablero(data.tablero));
+      // El tablero vacío llega por /eventos (evento "partida")
     })
     .catch((err) => {
       mostrarError("No se pudo reiniciar el juego.");
@@ -190,9 +214,24 @@ function reiniciar() {
     });
 }
 
+// ----- Suscripción a los eventos de la partida -----
+// Una sola conexión a /eventos sustituye las consultas a /estado: al conectarse llega el
+// estado actual y después un evento "partida" cada vez que se reinicia o cambia de partida
+function suscribirEventos() {
+  const eventos = new EventSource("/eventos");
+  const mostrarTablero = (evento) => renderTablero(JSON.parse(evento.data).tablero);
+  eventos.addEventListener("estado", mostrarTablero);
+  eventos.addEventListener("partida", mostrarTablero);
+  eventos.onerror = () => console.error("Conexión con /eventos interrumpida; el navegador reintentará.");
+}
+
 // ----- Cuando carga la página: intenta restaurar estado anterior -----
 window.addEventListener("DOMContentLoaded", () => {
   const cargado = cargarEstado(); // Intenta restaurar el estado anterior
-  if (!cargado) reiniciar();     // Si no hay, reinicia desde cero
+  if (cargado) {
+    suscribirEventos();
+  } else {
+    reiniciar().then(suscribirEventos); // Si no hay, reinicia desde cero (y así la sesión ya tiene partida)
+  }
 });
 